@@ -15,6 +15,7 @@ SUBCOMMANDS = [
     "version",
     "plots",
     "netspace",
+    "db",
     "run_daemon",
     "wallet",
     "configure",
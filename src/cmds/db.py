@@ -0,0 +1,133 @@
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+import aiosqlite
+
+from src.consensus.constants import ConsensusConstants
+from src.consensus.default_constants import DEFAULT_CONSTANTS
+from src.util.config import load_config
+from src.full_node.snapshot import export_snapshot, import_snapshot
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.db_migration import migrate_db
+from src.util.logging import initialize_logging
+from src.util.path import mkdir, path_from_root
+
+command_list = ["migrate", "snapshot", "restore"]
+
+DB_VERSION = "v29"
+PREVIOUS_DB_VERSION = "v28"
+
+
+def help_message():
+    print("usage: chia db command")
+    print(f"command can be any of {command_list}")
+    print("")
+    print("chia db migrate -i [input db] -o [output db] (converts a database to the current schema)")
+    print(f"  Default: migrates the {PREVIOUS_DB_VERSION} full node database to the {DB_VERSION} one of the config")
+    print("  Wallet databases must be given with -i and -o")
+    print("chia db snapshot -o [snapshot file] --height [height] (exports the unspent coins at a height)")
+    print("  Default: exports the full node database of the config at its peak; stop the node first")
+    print("chia db restore -i [snapshot file] (loads a snapshot into a new full node database)")
+    print("  Default: loads into the full node database of the config, which must not exist; -o to change it")
+
+
+def make_parser(parser):
+    parser.add_argument("-i", "--input", help="Database to migrate or snapshot, or snapshot to restore", type=Path)
+    parser.add_argument("-o", "--output", help="Migrated or restored database, or snapshot file", type=Path)
+    parser.add_argument("--height", help="Height of the snapshot, defaults to the peak", type=int, default=None)
+    parser.add_argument(
+        "command",
+        help=f"Command can be any one of {command_list}",
+        type=str,
+        nargs="?",
+    )
+
+    parser.set_defaults(function=handler)
+    parser.print_help = lambda self=parser: help_message()
+
+
+def network_constants(root_path: Path) -> ConsensusConstants:
+    config = load_config(root_path, "config.yaml", "full_node")
+    overrides = config["network_overrides"][config["selected_network"]]
+    return DEFAULT_CONSTANTS.replace_str_to_bytes(**overrides)
+
+
+def genesis_challenge(root_path: Path) -> bytes32:
+    return network_constants(root_path).GENESIS_CHALLENGE
+
+
+def default_full_node_db_path(root_path: Path) -> Path:
+    config = load_config(root_path, "config.yaml", "full_node")
+    db_path_replaced: str = config["database_path"].replace("CHALLENGE", genesis_challenge(root_path)[:8].hex())
+    return path_from_root(root_path, db_path_replaced)
+
+
+def migrate(args, root_path: Path) -> None:
+    out_path: Path = args.output if args.output is not None else default_full_node_db_path(root_path)
+    if args.input is not None:
+        in_path: Path = args.input
+    else:
+        in_path = out_path.parent / out_path.name.replace(f"_{DB_VERSION}_", f"_{PREVIOUS_DB_VERSION}_")
+    if in_path == out_path:
+        raise RuntimeError(f"Input and output databases are the same file: {in_path}")
+    print(f"Migrating {in_path} to {out_path}")
+    asyncio.run(migrate_db(in_path, out_path))
+    print(f"Done, {in_path} can be deleted once the node runs with {out_path}")
+
+
+async def snapshot_async(
+    db_path: Path, snapshot_path: Path, constants: ConsensusConstants, height: Optional[int]
+) -> None:
+    connection = await aiosqlite.connect(db_path)
+    try:
+        header = await export_snapshot(connection, snapshot_path, constants, height)
+    finally:
+        await connection.close()
+    print(f"Wrote snapshot of height {header.height}, peak {header.peak_hash}, to {snapshot_path}")
+
+
+def snapshot(args, root_path: Path) -> None:
+    db_path: Path = args.input if args.input is not None else default_full_node_db_path(root_path)
+    if args.output is None:
+        raise RuntimeError("Please give the snapshot file with -o")
+    if not db_path.exists():
+        raise RuntimeError(f"Database {db_path} does not exist")
+    asyncio.run(snapshot_async(db_path, args.output, network_constants(root_path), args.height))
+
+
+async def restore_async(snapshot_path: Path, db_path: Path, challenge: bytes32) -> None:
+    connection = await aiosqlite.connect(db_path)
+    try:
+        header = await import_snapshot(connection, snapshot_path, challenge)
+    finally:
+        await connection.close()
+    print(f"Loaded snapshot of height {header.height}, peak {header.peak_hash}, into {db_path}")
+
+
+def restore(args, root_path: Path) -> None:
+    db_path: Path = args.output if args.output is not None else default_full_node_db_path(root_path)
+    if args.input is None:
+        raise RuntimeError("Please give the snapshot file with -i")
+    if db_path.exists():
+        raise RuntimeError(f"Database {db_path} already exists, not overwriting it")
+    mkdir(db_path.parent)
+    asyncio.run(restore_async(args.input, db_path, genesis_challenge(root_path)))
+
+
+def handler(args, parser):
+    if args.command is None or args.command not in command_list:
+        help_message()
+        parser.exit(1)
+
+    root_path: Path = args.root_path
+    if not root_path.is_dir():
+        raise RuntimeError("Please initialize (or migrate) your config directory with chia init.")
+
+    initialize_logging("", {"log_stdout": True}, root_path)
+    if args.command == "migrate":
+        migrate(args, root_path)
+    elif args.command == "snapshot":
+        snapshot(args, root_path)
+    elif args.command == "restore":
+        restore(args, root_path)
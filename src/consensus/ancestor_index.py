@@ -0,0 +1,106 @@
+from typing import Dict, Optional
+
+from src.consensus.block_record import BlockRecord
+from src.consensus.blockchain_interface import BlockchainInterface
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.ints import uint32
+
+
+def _invert_lowest_one(n: int) -> int:
+    return n & (n - 1)
+
+
+def get_skip_height(height: int) -> int:
+    """
+    Height of the ancestor that the skip pointer of a block at this height points to. The heights are chosen like in
+    Bitcoin, so that any ancestor is reached in O(log n) jumps.
+    """
+    if height < 2:
+        return 0
+    # Odd heights jump a bit less far than even heights, so both kinds of jumps can be combined
+    if height & 1:
+        return _invert_lowest_one(_invert_lowest_one(height - 1)) + 1
+    return _invert_lowest_one(height)
+
+
+def is_in_main_chain(blocks: BlockchainInterface, block_record: BlockRecord) -> bool:
+    # The heights above the peak can be left from the previous chain, if the heavier one has fewer blocks
+    peak_height: Optional[uint32] = blocks.get_peak_height()
+    return (
+        peak_height is not None
+        and block_record.height <= peak_height
+        and blocks.height_to_hash(block_record.height) == block_record.header_hash
+    )
+
+
+class AncestorIndex:
+    """
+    Skip pointers of the block records of a blockchain, each to an ancestor at get_skip_height of its height, so that
+    the ancestor of a block at any height is found in O(log n) block records instead of walking prev_hash one block
+    at a time. Ancestors of blocks in the heaviest chain are found directly with the heights of the chain.
+    """
+
+    def __init__(self):
+        self.skip_hashes: Dict[bytes32, bytes32] = {}
+
+    def __len__(self) -> int:
+        return len(self.skip_hashes)
+
+    def add(self, blocks: BlockchainInterface, block_record: BlockRecord) -> None:
+        """
+        Adds the skip pointer of block_record. If its previous block or the block it would point to is not in blocks,
+        it has no skip pointer, and get_ancestor steps through prev_hash.
+        """
+        if block_record.height < 2:
+            return
+        prev: Optional[BlockRecord] = blocks.try_block_record(block_record.prev_hash)
+        if prev is None:
+            return
+        skip: Optional[BlockRecord] = self.try_get_ancestor(blocks, prev, uint32(get_skip_height(block_record.height)))
+        if skip is not None:
+            self.skip_hashes[block_record.header_hash] = skip.header_hash
+
+    def remove(self, header_hash: bytes32) -> None:
+        self.skip_hashes.pop(header_hash, None)
+
+    def try_get_ancestor(
+        self, blocks: BlockchainInterface, block_record: BlockRecord, height: uint32
+    ) -> Optional[BlockRecord]:
+        """
+        Returns the ancestor of block_record at height, which must not be above it, or None if the ancestor or a
+        block record on the way to it is not in blocks, since older block records are removed from the cache.
+        """
+        assert height <= block_record.height
+        curr: BlockRecord = block_record
+        while curr.height > height:
+            if is_in_main_chain(blocks, curr):
+                ancestor_hash: Optional[bytes32] = blocks.height_to_hash(height)
+                assert ancestor_hash is not None
+                return blocks.try_block_record(ancestor_hash)
+            skip_height = get_skip_height(curr.height)
+            # Only jumps if the skip pointer of the previous block would not get closer to height
+            skip_height_prev = get_skip_height(curr.height - 1)
+            skip_hash: Optional[bytes32] = self.skip_hashes.get(curr.header_hash)
+            if skip_hash is not None and not blocks.contains_block(skip_hash):
+                # The block it points to was removed from the cache
+                skip_hash = None
+            next_hash: bytes32 = curr.prev_hash
+            if skip_hash is not None and (
+                skip_height == height
+                or (skip_height > height and not (skip_height_prev < skip_height - 2 and skip_height_prev >= height))
+            ):
+                next_hash = skip_hash
+            next_record: Optional[BlockRecord] = blocks.try_block_record(next_hash)
+            if next_record is None:
+                return None
+            curr = next_record
+        return curr
+
+    def get_ancestor(self, blocks: BlockchainInterface, block_record: BlockRecord, height: uint32) -> BlockRecord:
+        """
+        Returns the ancestor of block_record at height, which must not be above it, and must be in blocks.
+        """
+        ancestor: Optional[BlockRecord] = self.try_get_ancestor(blocks, block_record, height)
+        if ancestor is None:
+            raise KeyError(f"Ancestor at height {height} of block {block_record.header_hash} is not in the cache")
+        return ancestor
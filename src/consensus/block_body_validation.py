@@ -1,7 +1,7 @@
 import collections
 from typing import Union, Optional, Set, List, Dict, Tuple
 
-from blspy import AugSchemeMPL, G2Element
+from blspy import AugSchemeMPL, G1Element, G2Element
 from chiabip158 import PyBIP158
 from clvm.casts import int_from_bytes
 
@@ -13,9 +13,11 @@ from src.consensus.blockchain_interface import BlockchainInterface
 from src.consensus.coinbase import create_pool_coin, create_farmer_coin
 from src.consensus.constants import ConsensusConstants
 from src.consensus.find_fork_point import find_fork_point_in_chain
+from src.consensus.fork_coin_deltas import ForkCoinDeltas, ForkCoinDeltasCache
 from src.consensus.block_root_validation import validate_block_merkle_roots
 from src.full_node.block_store import BlockStore
 from src.consensus.blockchain_check_conditions import blockchain_check_conditions_dict
+from src.consensus.signature_verification import SignatureVerifier
 from src.full_node.coin_store import CoinStore
 from src.consensus.cost_calculator import calculate_cost_of_program, CostResult
 from src.consensus.block_record import BlockRecord
@@ -24,7 +26,9 @@ from src.types.coin_record import CoinRecord
 from src.types.announcement import Announcement
 from src.types.condition_opcodes import ConditionOpcode
 from src.types.condition_var_pair import ConditionVarPair
-from src.types.full_block import FullBlock, additions_for_npc, announcements_for_npc
+from src.types.blockchain_format.foliage import FoliageTransactionBlock, TransactionsInfo
+from src.types.blockchain_format.program import SerializedProgram
+from src.types.full_block import FullBlock, additions_for_npc, announcements_for_npc, reward_coins_list
 from src.types.name_puzzle_condition import NPC
 from src.types.blockchain_format.sized_bytes import bytes32
 from src.types.unfinished_block import UnfinishedBlock
@@ -48,11 +52,18 @@ async def validate_block_body(
     height: uint32,
     cached_cost_result: Optional[CostResult] = None,
     fork_point_with_peak: Optional[uint32] = None,
+    signature_verifier: Optional[SignatureVerifier] = None,
+    fork_coin_deltas: Optional[ForkCoinDeltasCache] = None,
+    body_pre_validated: bool = False,
+    signature_pre_validated: bool = False,
 ) -> Optional[Err]:
     """
     This assumes the header block has been completely validated.
     Validates the transactions and body of the block. Returns None if everything
     validates correctly, or an Err if something does not validate.
+    The coin changes of the fork of the block are taken from fork_coin_deltas if they are cached there.
+    If body_pre_validated, validate_block_body_context_free passed in pre-validation, with the aggregated signature
+    if signature_pre_validated, so only the checks that need the blockchain and the coin set are left.
     """
     if isinstance(block, FullBlock):
         assert height == block.height
@@ -80,10 +91,6 @@ async def validate_block_body(
     # keeps track of the reward coins that need to be incorporated
     expected_reward_coins: Set[Coin] = set()
 
-    # 3. The transaction info hash in the Foliage block must match the transaction info
-    if block.foliage_transaction_block.transactions_info_hash != std_hash(block.transactions_info):
-        return Err.INVALID_TRANSACTIONS_INFO_HASH
-
     # 4. The foliage block hash in the foliage block must match the foliage block
     if block.foliage.foliage_transaction_block_hash != std_hash(block.foliage_transaction_block):
         return Err.INVALID_FOLIAGE_BLOCK_HASH
@@ -91,14 +98,6 @@ async def validate_block_body(
     # 5. The prev generators root must be valid
     # TODO(straya): implement prev generators
 
-    # 6. The generator root must be the tree-hash of the generator (or zeroes if no generator)
-    if block.transactions_generator is not None:
-        if block.transactions_generator.get_tree_hash() != block.transactions_info.generator_root:
-            return Err.INVALID_TRANSACTIONS_GENERATOR_ROOT
-    else:
-        if block.transactions_info.generator_root != bytes([0] * 32):
-            return Err.INVALID_TRANSACTIONS_GENERATOR_ROOT
-
     # 7. The reward claims must be valid for the previous blocks, and current block fees
     if height > 0:
         # Add reward claims for all blocks from the prev prev block, until the prev block (including the latter)
@@ -149,26 +148,33 @@ async def validate_block_body(
     announcements: List[Announcement] = []
     npc_list: List[NPC] = []
     removals_puzzle_dic: Dict[bytes32, bytes32] = {}
-    cost: uint64 = uint64(0)
 
     if height <= constants.INITIAL_FREEZE_PERIOD and block.transactions_generator is not None:
         return Err.INITIAL_TRANSACTION_FREEZE
 
+    result: Optional[CostResult] = None
     if block.transactions_generator is not None:
         # Get List of names removed, puzzles hashes for removed coins and conditions crated
         if cached_cost_result is not None:
-            result: CostResult = cached_cost_result
+            result = cached_cost_result
         else:
             result = calculate_cost_of_program(block.transactions_generator, constants.CLVM_COST_RATIO_CONSTANT)
-        cost = result.cost
-        npc_list = result.npc_list
 
-        # 8. Check that cost <= MAX_BLOCK_COST_CLVM
-        if cost > constants.MAX_BLOCK_COST_CLVM:
-            return Err.BLOCK_COST_EXCEEDS_MAX
-        if result.error is not None:
-            return Err(result.error)
+    # 3, 6, 8 to 14. The checks that only depend on the block, unless they were done in pre-validation
+    if not body_pre_validated:
+        error = validate_block_body_context_free(
+            constants,
+            block.foliage_transaction_block,
+            block.transactions_info,
+            block.transactions_generator,
+            result,
+            False,
+        )
+        if error is not None:
+            return error
 
+    if result is not None:
+        npc_list = result.npc_list
         for npc in npc_list:
             removals.append(npc.coin_name)
             removals_puzzle_dic[npc.coin_name] = npc.puzzle_hash
@@ -176,54 +182,7 @@ async def validate_block_body(
         additions = additions_for_npc(npc_list)
         announcements = announcements_for_npc(npc_list)
 
-    # 9. Check that the correct cost is in the transactions info
-    if block.transactions_info.cost != cost:
-        return Err.INVALID_BLOCK_COST
-
-    additions_dic: Dict[bytes32, Coin] = {}
-    # 10. Check additions for max coin amount
-    # Be careful to check for 64 bit overflows in other languages. This is the max 64 bit unsigned integer
-    for coin in additions + coinbase_additions:
-        additions_dic[coin.name()] = coin
-        if coin.amount > constants.MAX_COIN_AMOUNT:
-            return Err.COIN_AMOUNT_EXCEEDS_MAXIMUM
-
-    # 11. Validate addition and removal roots
-    root_error = validate_block_merkle_roots(
-        block.foliage_transaction_block.additions_root,
-        block.foliage_transaction_block.removals_root,
-        additions + coinbase_additions,
-        removals,
-    )
-    if root_error:
-        return root_error
-
-    # 12. The additions and removals must result in the correct filter
-    byte_array_tx: List[bytes32] = []
-
-    for coin in additions + coinbase_additions:
-        byte_array_tx.append(bytearray(coin.puzzle_hash))
-    for coin_name in removals:
-        byte_array_tx.append(bytearray(coin_name))
-
-    bip158: PyBIP158 = PyBIP158(byte_array_tx)
-    encoded_filter = bytes(bip158.GetEncoded())
-    filter_hash = std_hash(encoded_filter)
-
-    if filter_hash != block.foliage_transaction_block.filter_hash:
-        return Err.INVALID_TRANSACTIONS_FILTER_HASH
-
-    # 13. Check for duplicate outputs in additions
-    addition_counter = collections.Counter(_.name() for _ in additions + coinbase_additions)
-    for k, v in addition_counter.items():
-        if v > 1:
-            return Err.DUPLICATE_OUTPUT
-
-    # 14. Check for duplicate spends inside block
-    removal_counter = collections.Counter(removals)
-    for k, v in removal_counter.items():
-        if v > 1:
-            return Err.DOUBLE_SPEND
+    additions_dic: Dict[bytes32, Coin] = {coin.name(): coin for coin in additions + coinbase_additions}
 
     # 15. Check if removals exist and were not previously spent. (unspent_db + diff_store + this_block)
     if peak is None or height == 0:
@@ -231,7 +190,7 @@ async def validate_block_body(
     elif fork_point_with_peak is not None:
         fork_sub_h = fork_point_with_peak
     else:
-        fork_sub_h = find_fork_point_in_chain(blocks, peak, blocks.block_record(block.prev_header_hash))
+        fork_sub_h = await find_fork_point_in_chain(blocks, peak, blocks.block_record(block.prev_header_hash))
 
     if fork_sub_h == -1:
         coin_store_reorg_height = -1
@@ -241,28 +200,16 @@ async def validate_block_body(
         coin_store_reorg_height = last_sb_in_common.height
 
     # Get additions and removals since (after) fork_h but not including this block
-    additions_since_fork: Dict[bytes32, Tuple[Coin, uint32]] = {}
-    removals_since_fork: Set[bytes32] = set()
-    coinbases_since_fork: Dict[bytes32, uint32] = {}
-
-    if height > 0:
-        curr: Optional[FullBlock] = await block_store.get_full_block(block.prev_header_hash)
-        assert curr is not None
-
-        while curr.height > fork_sub_h:
-            removals_in_curr, additions_in_curr = curr.tx_removals_and_additions()
-            for c_name in removals_in_curr:
-                removals_since_fork.add(c_name)
-            for c in additions_in_curr:
-                additions_since_fork[c.name()] = (c, curr.height)
-
-            for coinbase_coin in curr.get_included_reward_coins():
-                additions_since_fork[coinbase_coin.name()] = (coinbase_coin, curr.height)
-                coinbases_since_fork[coinbase_coin.name()] = curr.height
-            if curr.height == 0:
-                break
-            curr = await block_store.get_full_block(curr.prev_header_hash)
-            assert curr is not None
+    fork_deltas: Optional[ForkCoinDeltas] = None
+    if height > 0 and fork_coin_deltas is not None:
+        fork_deltas = fork_coin_deltas.get(block.prev_header_hash, fork_sub_h)
+    if fork_deltas is None:
+        fork_deltas = await _get_fork_coin_deltas(blocks, block_store, block.prev_header_hash, height, fork_sub_h)
+        if fork_coin_deltas is not None and height > 0 and height - 1 > fork_sub_h:
+            fork_coin_deltas.put(block.prev_header_hash, fork_deltas)
+    additions_since_fork: Dict[bytes32, Tuple[Coin, uint32]] = fork_deltas.additions_since_fork
+    removals_since_fork: Set[bytes32] = fork_deltas.removals_since_fork
+    coinbases_since_fork: Dict[bytes32, uint32] = fork_deltas.coinbases_since_fork
 
     removal_coin_records: Dict[bytes32, CoinRecord] = {}
     for rem in removals:
@@ -366,18 +313,24 @@ async def validate_block_body(
         )
         if error:
             return error
-        for pk, m in pkm_pairs_for_conditions_dict(npc.condition_dict, npc.coin_name):
-            pairs_pks.append(pk)
-            pairs_msgs.append(m)
-
-    # 22. Verify aggregated signature
-    # TODO: move this to pre_validate_blocks_multiprocessing so we can sync faster
+        if not signature_pre_validated:
+            for pk, m in pkm_pairs_for_conditions_dict(npc.condition_dict, npc.coin_name):
+                pairs_pks.append(pk)
+                pairs_msgs.append(m)
+
+    # 22. Verify aggregated signature, unless it was verified in pre-validation
+    if signature_pre_validated:
+        return None
     if not block.transactions_info.aggregated_signature:
         return Err.BAD_AGGREGATE_SIGNATURE
 
     if len(pairs_pks) == 0:
         if len(pairs_msgs) != 0 or block.transactions_info.aggregated_signature != G2Element.infinity():
             return Err.BAD_AGGREGATE_SIGNATURE
+    elif signature_verifier is not None:
+        # Off the event loop, and without pairing checks for the spend bundles verified by the mempool
+        if not await signature_verifier.verify(pairs_pks, pairs_msgs, block.transactions_info.aggregated_signature):
+            return Err.BAD_AGGREGATE_SIGNATURE
     else:
         # noinspection PyTypeChecker
         validates = AugSchemeMPL.aggregate_verify(pairs_pks, pairs_msgs, block.transactions_info.aggregated_signature)
@@ -385,3 +338,141 @@ async def validate_block_body(
             return Err.BAD_AGGREGATE_SIGNATURE
 
     return None
+
+
+def validate_block_body_context_free(
+    constants: ConsensusConstants,
+    foliage_transaction_block: FoliageTransactionBlock,
+    transactions_info: TransactionsInfo,
+    transactions_generator: Optional[SerializedProgram],
+    cost_result: Optional[CostResult],
+    validate_signature: bool,
+) -> Optional[Err]:
+    """
+    The checks of validate_block_body that only depend on the transaction block itself, so they can run in the
+    processes of pre-validation. cost_result is the result of running the generator, if there is one. The reward
+    coins are taken from transactions_info, validate_block_body checks that they are the expected ones.
+    """
+    # 3. The transaction info hash in the Foliage block must match the transaction info
+    if foliage_transaction_block.transactions_info_hash != std_hash(transactions_info):
+        return Err.INVALID_TRANSACTIONS_INFO_HASH
+
+    # 6. The generator root must be the tree-hash of the generator (or zeroes if no generator)
+    if transactions_generator is not None:
+        if transactions_generator.get_tree_hash() != transactions_info.generator_root:
+            return Err.INVALID_TRANSACTIONS_GENERATOR_ROOT
+    else:
+        if transactions_info.generator_root != bytes([0] * 32):
+            return Err.INVALID_TRANSACTIONS_GENERATOR_ROOT
+
+    removals: List[bytes32] = []
+    coinbase_additions: List[Coin] = reward_coins_list(transactions_info)
+    additions: List[Coin] = []
+    npc_list: List[NPC] = []
+    cost: uint64 = uint64(0)
+
+    if cost_result is not None:
+        cost = cost_result.cost
+        npc_list = cost_result.npc_list
+
+        # 8. Check that cost <= MAX_BLOCK_COST_CLVM
+        if cost > constants.MAX_BLOCK_COST_CLVM:
+            return Err.BLOCK_COST_EXCEEDS_MAX
+        if cost_result.error is not None:
+            return Err(cost_result.error)
+
+        removals = [npc.coin_name for npc in npc_list]
+        additions = additions_for_npc(npc_list)
+
+    # 9. Check that the correct cost is in the transactions info
+    if transactions_info.cost != cost:
+        return Err.INVALID_BLOCK_COST
+
+    # 10. Check additions for max coin amount
+    # Be careful to check for 64 bit overflows in other languages. This is the max 64 bit unsigned integer
+    for coin in additions + coinbase_additions:
+        if coin.amount > constants.MAX_COIN_AMOUNT:
+            return Err.COIN_AMOUNT_EXCEEDS_MAXIMUM
+
+    # 11. Validate addition and removal roots
+    root_error = validate_block_merkle_roots(
+        foliage_transaction_block.additions_root,
+        foliage_transaction_block.removals_root,
+        additions + coinbase_additions,
+        removals,
+    )
+    if root_error:
+        return root_error
+
+    # 12. The additions and removals must result in the correct filter
+    byte_array_tx: List[bytes32] = []
+
+    for coin in additions + coinbase_additions:
+        byte_array_tx.append(bytearray(coin.puzzle_hash))
+    for coin_name in removals:
+        byte_array_tx.append(bytearray(coin_name))
+
+    bip158: PyBIP158 = PyBIP158(byte_array_tx)
+    encoded_filter = bytes(bip158.GetEncoded())
+    filter_hash = std_hash(encoded_filter)
+
+    if filter_hash != foliage_transaction_block.filter_hash:
+        return Err.INVALID_TRANSACTIONS_FILTER_HASH
+
+    # 13. Check for duplicate outputs in additions
+    addition_counter = collections.Counter(_.name() for _ in additions + coinbase_additions)
+    for k, v in addition_counter.items():
+        if v > 1:
+            return Err.DUPLICATE_OUTPUT
+
+    # 14. Check for duplicate spends inside block
+    removal_counter = collections.Counter(removals)
+    for k, v in removal_counter.items():
+        if v > 1:
+            return Err.DOUBLE_SPEND
+
+    # 22. Verify aggregated signature
+    if validate_signature:
+        if not transactions_info.aggregated_signature:
+            return Err.BAD_AGGREGATE_SIGNATURE
+        pairs_pks: List[G1Element] = []
+        pairs_msgs: List[bytes] = []
+        for npc in npc_list:
+            for pk, m in pkm_pairs_for_conditions_dict(npc.condition_dict, npc.coin_name):
+                pairs_pks.append(pk)
+                pairs_msgs.append(m)
+        if len(pairs_pks) == 0:
+            if transactions_info.aggregated_signature != G2Element.infinity():
+                return Err.BAD_AGGREGATE_SIGNATURE
+        elif not AugSchemeMPL.aggregate_verify(pairs_pks, pairs_msgs, transactions_info.aggregated_signature):
+            return Err.BAD_AGGREGATE_SIGNATURE
+
+    return None
+
+
+async def _get_fork_coin_deltas(
+    blocks: BlockchainInterface,
+    block_store: BlockStore,
+    prev_header_hash: bytes32,
+    height: uint32,
+    fork_sub_h: int,
+) -> ForkCoinDeltas:
+    """
+    Reads the coin changes of the blocks after fork_sub_h up to and including prev_header_hash. Only the block records
+    are read, and the coin changes of transaction blocks, stored when they were validated.
+    """
+    fork_deltas = ForkCoinDeltas(fork_sub_h)
+    if height == 0:
+        return fork_deltas
+    curr: Optional[BlockRecord] = await blocks.get_block_record_from_db(prev_header_hash)
+    assert curr is not None
+    while curr.height > fork_sub_h:
+        if curr.is_transaction_block:
+            coin_changes = await block_store.get_coin_changes_by_hash(curr.header_hash)
+            assert coin_changes is not None
+            fork_deltas.add_block(curr.height, coin_changes)
+        if curr.height == 0:
+            break
+        curr = await blocks.get_block_record_from_db(curr.prev_hash)
+        assert curr is not None
+    return fork_deltas
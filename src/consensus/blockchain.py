@@ -1,9 +1,12 @@
 import asyncio
 import dataclasses
 import logging
-from concurrent.futures.process import ProcessPoolExecutor
 
-from src.consensus.multiprocess_validation import pre_validate_blocks_multiprocessing, PreValidationResult
+from src.consensus.multiprocess_validation import (
+    PreValidationPool,
+    PreValidationResult,
+    pre_validate_blocks_multiprocessing,
+)
 from src.types.header_block import HeaderBlock
 from src.types.weight_proof import SubEpochChallengeSegment
 from src.util.streamable import recurse_jsonify
@@ -14,6 +17,7 @@ from typing import Dict, List, Optional, Tuple, Set
 from src.consensus.blockchain_interface import BlockchainInterface
 from src.consensus.constants import ConsensusConstants
 from src.consensus.block_body_validation import validate_block_body
+from src.consensus.signature_verification import SignatureVerifier
 from src.full_node.block_store import BlockStore
 from src.full_node.coin_store import CoinStore
 from src.consensus.difficulty_adjustment import (
@@ -30,7 +34,9 @@ from src.types.blockchain_format.sub_epoch_summary import SubEpochSummary
 from src.types.unfinished_block import UnfinishedBlock
 from src.util.errors import Err
 from src.util.ints import uint32, uint64, uint128
+from src.consensus.ancestor_index import AncestorIndex
 from src.consensus.find_fork_point import find_fork_point_in_chain
+from src.consensus.fork_coin_deltas import ForkCoinDeltasCache
 from src.consensus.block_header_validation import (
     validate_finished_header_block,
     validate_unfinished_header_block,
@@ -64,6 +70,8 @@ class Blockchain(BlockchainInterface):
     __block_records: Dict[bytes32, BlockRecord]
     # all hashes of blocks in block_record by height, used for garbage collection
     __heights_in_cache: Dict[uint32, Set[bytes32]]
+    # Skip pointers of the blocks in block_record, to find their ancestors in O(log n)
+    ancestor_index: AncestorIndex
     # Defines the path from genesis to the peak, no orphan blocks
     __height_to_hash: Dict[uint32, bytes32]
     # All sub-epoch summaries that have been included in the blockchain from the beginning until and including the peak
@@ -74,7 +82,11 @@ class Blockchain(BlockchainInterface):
     # Store
     block_store: BlockStore
     # Used to verify blocks in parallel
-    pool: ProcessPoolExecutor
+    pool: PreValidationPool
+    # Verifies aggregated signatures off the event loop, shared with the mempool
+    signature_verifier: SignatureVerifier
+    # Coin changes of the chains that are not the heaviest since their fork, by tip
+    fork_coin_deltas: ForkCoinDeltasCache
 
     # Whether blockchain is shut down or not
     _shut_down: bool
@@ -99,20 +111,23 @@ class Blockchain(BlockchainInterface):
         if cpu_count > 61:
             cpu_count = 61  # Windows Server 2016 has an issue https://bugs.python.org/issue26903
         num_workers = max(cpu_count - 2, 1)
-        self.pool = ProcessPoolExecutor(max_workers=num_workers)
+        self.constants = consensus_constants
+        self.constants_json = recurse_jsonify(dataclasses.asdict(self.constants))
+        self.pool = PreValidationPool(self.constants_json, num_workers)
         log.info(f"Started {num_workers} processes for block validation")
+        self.signature_verifier = SignatureVerifier()
+        self.fork_coin_deltas = ForkCoinDeltasCache()
 
-        self.constants = consensus_constants
         self.coin_store = coin_store
         self.block_store = block_store
-        self.constants_json = recurse_jsonify(dataclasses.asdict(self.constants))
         self._shut_down = False
         await self._load_chain_from_store()
         return self
 
     def shut_down(self):
         self._shut_down = True
-        self.pool.shutdown(wait=True)
+        self.pool.shut_down()
+        self.signature_verifier.shut_down()
 
     async def _load_chain_from_store(self) -> None:
         """
@@ -123,8 +138,10 @@ class Blockchain(BlockchainInterface):
         self.__sub_epoch_summaries = sub_epoch_summaries
         self.__block_records = {}
         self.__heights_in_cache = {}
+        self.ancestor_index = AncestorIndex()
         block_records, peak = await self.block_store.get_block_records_close_to_peak(self.constants.BLOCKS_CACHE_SIZE)
-        for block in block_records.values():
+        # Ordered by height, so the previous block of each block is indexed before it
+        for block in sorted(block_records.values(), key=lambda b: b.height):
             self.add_block_record(block)
 
         if len(block_records) == 0:
@@ -172,7 +189,7 @@ class Blockchain(BlockchainInterface):
         fork_point_with_peak: Optional[uint32] = None,
     ) -> Tuple[ReceiveBlockResult, Optional[Err], Optional[uint32]]:
         """
-        This method must be called under the blockchain lock
+        This method must be called under the blockchain lock, the block can be pre-validated outside of it
         Adds a new block into the blockchain, if it's valid and connected to the current
         blockchain, regardless of whether it is the child of a head, or another block.
         Returns a header if block is added to head. Returns an error if the block is
@@ -191,6 +208,7 @@ class Blockchain(BlockchainInterface):
             )
 
         if pre_validation_result is None:
+            coin_changes = block.get_coin_changes()
             if block.height == 0:
                 prev_b: Optional[BlockRecord] = None
             else:
@@ -199,7 +217,7 @@ class Blockchain(BlockchainInterface):
             required_iters, error = validate_finished_header_block(
                 self.constants,
                 self,
-                block.get_block_header(),
+                block.get_block_header(coin_changes),
                 False,
                 difficulty,
                 sub_slot_iters,
@@ -210,6 +228,9 @@ class Blockchain(BlockchainInterface):
         else:
             required_iters = pre_validation_result.required_iters
             assert pre_validation_result.error is None
+            # The NPC list of pre-validation saves running the transactions generator again
+            cost_result = pre_validation_result.cost_result
+            coin_changes = block.get_coin_changes(cost_result.npc_list if cost_result is not None else None)
         assert required_iters is not None
         error_code = await validate_block_body(
             self.constants,
@@ -221,6 +242,10 @@ class Blockchain(BlockchainInterface):
             block.height,
             pre_validation_result.cost_result if pre_validation_result is not None else None,
             fork_point_with_peak,
+            self.signature_verifier,
+            self.fork_coin_deltas,
+            pre_validation_result is not None and pre_validation_result.body_validated,
+            pre_validation_result is not None and pre_validation_result.signature_validated,
         )
         if error_code is not None:
             return ReceiveBlockResult.INVALID_BLOCK, error_code, None
@@ -233,7 +258,7 @@ class Blockchain(BlockchainInterface):
             None,
         )
         # Always add the block to the database
-        await self.block_store.add_full_block(block, block_record)
+        await self.block_store.add_full_block(block, block_record, coin_changes)
 
         self.add_block_record(block_record)
 
@@ -242,6 +267,17 @@ class Blockchain(BlockchainInterface):
         if fork_height is not None:
             return ReceiveBlockResult.NEW_PEAK, None, fork_height
         else:
+            peak = self.get_peak()
+            if not genesis and peak is not None:
+                # The next block of this fork is validated without reading the blocks back to the fork point
+                self.fork_coin_deltas.extend(
+                    block.prev_header_hash,
+                    uint32(block.height - 1),
+                    block.header_hash,
+                    block.height,
+                    await find_fork_point_in_chain(self, peak, block_record),
+                    coin_changes,
+                )
             return ReceiveBlockResult.ADDED_AS_ORPHAN, None, None
 
     async def _reconsider_peak(
@@ -263,13 +299,14 @@ class Blockchain(BlockchainInterface):
                 # in sync.
                 await self.block_store.begin_transaction()
                 try:
-                    await self.coin_store.new_block(block)
+                    await self.coin_store.new_block(block, await self.block_store.get_coin_changes(block))
                     self.__height_to_hash[uint32(0)] = block.header_hash
                     self._peak_height = uint32(0)
                     await self.block_store.set_peak(block.header_hash)
                     await self.block_store.commit_transaction()
                 except Exception:
                     await self.block_store.rollback_transaction()
+                    await self.coin_store.reset_after_rollback()
                     raise
                 return uint32(0)
             return None
@@ -281,7 +318,7 @@ class Blockchain(BlockchainInterface):
             if fork_point_with_peak is not None:
                 fork_height: int = fork_point_with_peak
             else:
-                fork_height = find_fork_point_in_chain(self, block_record, peak)
+                fork_height = await find_fork_point_in_chain(self, block_record, peak)
 
             # Begins a transaction, because we want to ensure that the coin store and block store are only updated
             # in sync.
@@ -303,25 +340,28 @@ class Blockchain(BlockchainInterface):
                     log.info(f"remove segments for se above {fork_height}")
                     await self.block_store.delete_sub_epoch_challenge_segments(uint32(fork_height))
 
-                # Collect all blocks from fork point to new peak
-                blocks_to_add: List[Tuple[FullBlock, BlockRecord]] = []
+                # Collect all blocks from fork point to new peak. Only their records and coin changes are read, not
+                # the full blocks
+                blocks_to_add: List[BlockRecord] = []
                 curr = block_record.header_hash
 
                 while fork_height < 0 or curr != self.height_to_hash(uint32(fork_height)):
-                    fetched_full_block: Optional[FullBlock] = await self.block_store.get_full_block(curr)
                     fetched_block_record: Optional[BlockRecord] = await self.block_store.get_block_record(curr)
-                    assert fetched_full_block is not None
                     assert fetched_block_record is not None
-                    blocks_to_add.append((fetched_full_block, fetched_block_record))
-                    if fetched_full_block.height == 0:
+                    blocks_to_add.append(fetched_block_record)
+                    if fetched_block_record.height == 0:
                         # Doing a full reorg, starting at height 0
                         break
                     curr = fetched_block_record.prev_hash
 
-                for fetched_full_block, fetched_block_record in reversed(blocks_to_add):
+                for fetched_block_record in reversed(blocks_to_add):
                     self.__height_to_hash[fetched_block_record.height] = fetched_block_record.header_hash
                     if fetched_block_record.is_transaction_block:
-                        await self.coin_store.new_block(fetched_full_block)
+                        coin_changes = await self.block_store.get_coin_changes_by_hash(fetched_block_record.header_hash)
+                        assert coin_changes is not None and fetched_block_record.timestamp is not None
+                        await self.coin_store.apply_coin_changes(
+                            fetched_block_record.height, fetched_block_record.timestamp, coin_changes
+                        )
                     if fetched_block_record.sub_epoch_summary_included is not None:
                         self.__sub_epoch_summaries[
                             fetched_block_record.height
@@ -333,6 +373,7 @@ class Blockchain(BlockchainInterface):
                 await self.block_store.commit_transaction()
             except Exception:
                 await self.block_store.rollback_transaction()
+                await self.coin_store.reset_after_rollback()
                 raise
 
             return uint32(max(fork_height, 0))
@@ -493,6 +534,8 @@ class Blockchain(BlockchainInterface):
             block,
             uint32(prev_height + 1),
             None,
+            signature_verifier=self.signature_verifier,
+            fork_coin_deltas=self.fork_coin_deltas,
         )
 
         if error_code is not None:
@@ -501,10 +544,12 @@ class Blockchain(BlockchainInterface):
         return required_iters, None
 
     async def pre_validate_blocks_multiprocessing(
-        self,
-        blocks: List[FullBlock],
+        self, blocks: List[FullBlock], validate_signatures: bool = False
     ) -> Optional[List[PreValidationResult]]:
-        return await pre_validate_blocks_multiprocessing(self.constants, self.constants_json, self, blocks, self.pool)
+        """
+        Does not need the blockchain lock, see pre_validate_blocks_multiprocessing.
+        """
+        return await pre_validate_blocks_multiprocessing(self.constants, self, blocks, self.pool, validate_signatures)
 
     def contains_block(self, header_hash: bytes32) -> bool:
         """
@@ -564,6 +609,7 @@ class Blockchain(BlockchainInterface):
         while blocks_to_remove is not None and height >= 0:
             for header_hash in blocks_to_remove:
                 del self.__block_records[header_hash]  # remove from blocks
+                self.ancestor_index.remove(header_hash)
             del self.__heights_in_cache[uint32(height)]  # remove height from heights in cache
 
             height = height - 1
@@ -599,22 +645,33 @@ class Blockchain(BlockchainInterface):
         sbr = self.block_record(header_hash)
         del self.__block_records[header_hash]
         self.__heights_in_cache[sbr.height].remove(header_hash)
+        self.ancestor_index.remove(header_hash)
 
     def add_block_record(self, block_record: BlockRecord):
         """
-        Adds a block record to the cache.
+        Adds a block record to the cache, and its skip pointer to the ancestor index.
         """
 
         self.__block_records[block_record.header_hash] = block_record
         if block_record.height not in self.__heights_in_cache.keys():
             self.__heights_in_cache[block_record.height] = set()
         self.__heights_in_cache[block_record.height].add(block_record.header_hash)
+        self.ancestor_index.add(self, block_record)
+
+    def get_ancestor(self, header_hash: bytes32, height: uint32) -> BlockRecord:
+        return self.ancestor_index.get_ancestor(self, self.block_record(header_hash), height)
+
+    def try_get_ancestor(self, header_hash: bytes32, height: uint32) -> Optional[BlockRecord]:
+        block_record: Optional[BlockRecord] = self.try_block_record(header_hash)
+        if block_record is None:
+            return None
+        return self.ancestor_index.try_get_ancestor(self, block_record, height)
 
     async def get_header_block(self, header_hash: bytes32) -> Optional[HeaderBlock]:
         block = await self.block_store.get_full_block(header_hash)
         if block is None:
             return None
-        return block.get_block_header()
+        return block.get_block_header(await self.block_store.get_coin_changes(block))
 
     async def persist_sub_epoch_challenge_segments(
         self, sub_epoch_summary_height: uint32, segments: List[SubEpochChallengeSegment]
@@ -51,6 +51,27 @@ class BlockchainInterface:
     async def get_header_blocks_in_range(self, start: int, stop: int) -> Dict[bytes32, HeaderBlock]:
         pass
 
+    def try_get_ancestor(self, header_hash: bytes32, height: uint32) -> Optional[BlockRecord]:
+        """
+        Returns the ancestor at height of the block with header_hash, which must not be below height, or None if a
+        block record on the way to it is not loaded.
+        """
+        curr: Optional[BlockRecord] = self.try_block_record(header_hash)
+        assert curr is None or height <= curr.height
+        while curr is not None and curr.height > height:
+            curr = self.try_block_record(curr.prev_hash)
+        return curr
+
+    def get_ancestor(self, header_hash: bytes32, height: uint32) -> BlockRecord:
+        """
+        Returns the ancestor at height of the block with header_hash, which must not be below height.
+        """
+        curr: BlockRecord = self.block_record(header_hash)
+        assert height <= curr.height
+        while curr.height > height:
+            curr = self.block_record(curr.prev_hash)
+        return curr
+
     def try_block_record(self, header_hash: bytes32) -> Optional[BlockRecord]:
         if self.contains_block(header_hash):
             return self.block_record(header_hash)
@@ -24,8 +24,8 @@ def _get_blocks_at_height(
 ) -> List[BlockRecord]:
     """
     Return a consecutive list of BlockRecords starting at target_height, returning a maximum of
-    max_num_blocks. Assumes all block records are present. Does a slot linear search, if the blocks are not
-    in the path of the peak.
+    max_num_blocks. Assumes all block records are present. Finds the last block with get_ancestor, if the blocks are
+    not in the path of the peak.
 
     Args:
         blocks: dict from header hash to BlockRecord.
@@ -43,8 +43,11 @@ def _get_blocks_at_height(
                 assert blocks.contains_height(uint32(h))
                 block_list.append(blocks.height_to_block_record(uint32(h)))
             return block_list
-        # slow fetching, goes back one by one
+        # slower fetching, jumps to the last block to fetch, and goes back one by one from there
+    last_height = min(prev_b.height, target_height + max_num_blocks - 1)
     curr_b: BlockRecord = prev_b
+    if prev_b.height > last_height:
+        curr_b = blocks.get_ancestor(prev_b.prev_hash, uint32(last_height))
     target_blocks = []
     while curr_b.height >= target_height:
         if curr_b.height < target_height + max_num_blocks:
@@ -1,11 +1,46 @@
-from typing import Union
+from typing import Dict, Optional, Union
 
+from src.consensus.ancestor_index import is_in_main_chain
 from src.consensus.blockchain_interface import BlockchainInterface
 from src.consensus.block_record import BlockRecord
+from src.types.blockchain_format.sized_bytes import bytes32
 from src.types.header_block import HeaderBlock
+from src.util.ints import uint32
 
 
-def find_fork_point_in_chain(
+async def _ancestor_hash(
+    blocks: BlockchainInterface,
+    block: Union[BlockRecord, HeaderBlock],
+    height: int,
+    records_from_db: Dict[bytes32, BlockRecord],
+) -> bytes32:
+    if block.height == height:
+        return block.header_hash
+    # A header block that was not added yet starts from its previous block
+    curr_hash: bytes32 = block.header_hash if blocks.contains_block(block.header_hash) else block.prev_hash
+    ancestor: Optional[BlockRecord] = blocks.try_get_ancestor(curr_hash, uint32(height))
+    if ancestor is not None:
+        return ancestor.header_hash
+
+    # The ancestor is not loaded, so the chain is walked back through the database, until it joins the heaviest chain,
+    # whose block hashes are known at every height
+    while True:
+        curr: Optional[BlockRecord] = records_from_db.get(curr_hash)
+        if curr is None:
+            curr = await blocks.get_block_record_from_db(curr_hash)
+            if curr is None:
+                raise KeyError(f"Block {curr_hash} is not in the database")
+            records_from_db[curr_hash] = curr
+        if curr.height == height:
+            return curr.header_hash
+        if is_in_main_chain(blocks, curr):
+            ancestor_hash: Optional[bytes32] = blocks.height_to_hash(uint32(height))
+            assert ancestor_hash is not None
+            return ancestor_hash
+        curr_hash = curr.prev_hash
+
+
+async def find_fork_point_in_chain(
     blocks: BlockchainInterface,
     block_1: Union[BlockRecord, HeaderBlock],
     block_2: Union[BlockRecord, HeaderBlock],
@@ -13,21 +48,39 @@ def find_fork_point_in_chain(
     """Tries to find height where new chain (block_2) diverged from block_1 (assuming prev blocks
     are all included in chain)
     Returns -1 if chains have no common ancestor
-    * assumes the fork point is loaded in blocks
+    The ancestors of both blocks are compared at exponentially further heights below the lowest block, and then
+    the fork is found by bisection, so with the skip pointers of get_ancestor it takes O(log^2 n) block records.
+    Ancestors that are not loaded, below a deep fork, are read from the database.
     """
-    while block_2.height > 0 or block_1.height > 0:
-        if block_2.height > block_1.height:
-            block_2 = blocks.block_record(block_2.prev_hash)
-        elif block_1.height > block_2.height:
-            block_1 = blocks.block_record(block_1.prev_hash)
-        else:
-            if block_2.header_hash == block_1.header_hash:
-                return block_2.height
-            block_2 = blocks.block_record(block_2.prev_hash)
-            block_1 = blocks.block_record(block_1.prev_hash)
-    if block_2 != block_1:
+    records_from_db: Dict[bytes32, BlockRecord] = {}
+
+    async def same_ancestor(height: int) -> bool:
+        ancestor_1: bytes32 = await _ancestor_hash(blocks, block_1, height, records_from_db)
+        ancestor_2: bytes32 = await _ancestor_hash(blocks, block_2, height, records_from_db)
+        return ancestor_1 == ancestor_2
+
+    differ: int = min(block_1.height, block_2.height)
+    if await same_ancestor(differ):
+        return differ
+
+    # The ancestors differ at differ, find a height where they are the same
+    common: int = -1
+    step = 1
+    while differ > 0:
+        height = max(differ - step, 0)
+        if await same_ancestor(height):
+            common = height
+            break
+        differ = height
+        step *= 2
+    if common == -1:
         # All blocks are different
         return -1
 
-    # First block is the same
-    return 0
+    while differ - common > 1:
+        height = (common + differ) // 2
+        if await same_ancestor(height):
+            common = height
+        else:
+            differ = height
+    return common
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from src.types.block_coin_changes import BlockCoinChanges
+from src.types.blockchain_format.coin import Coin
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.ints import uint32
+
+# Number of fork tips whose coin changes are remembered
+DEFAULT_FORK_COIN_DELTAS_SIZE = 16
+
+
+class ForkCoinDeltas:
+    """
+    The coins added, spent and rewarded in the blocks of a chain after its fork with the heaviest chain, up to and
+    including its tip. These are the coins that validate_block_body cannot find in the coin store.
+    """
+
+    def __init__(self, fork_height: int):
+        self.fork_height = fork_height
+        self.additions_since_fork: Dict[bytes32, Tuple[Coin, uint32]] = {}
+        self.removals_since_fork: Set[bytes32] = set()
+        self.coinbases_since_fork: Dict[bytes32, uint32] = {}
+
+    def copy(self) -> "ForkCoinDeltas":
+        deltas = ForkCoinDeltas(self.fork_height)
+        deltas.additions_since_fork = dict(self.additions_since_fork)
+        deltas.removals_since_fork = set(self.removals_since_fork)
+        deltas.coinbases_since_fork = dict(self.coinbases_since_fork)
+        return deltas
+
+    def add_block(self, height: uint32, coin_changes: BlockCoinChanges) -> None:
+        for coin_name in coin_changes.removals:
+            self.removals_since_fork.add(coin_name)
+        for coin in coin_changes.additions:
+            self.additions_since_fork[coin.name()] = (coin, height)
+        for coinbase_coin in coin_changes.reward_coins:
+            self.additions_since_fork[coinbase_coin.name()] = (coinbase_coin, height)
+            self.coinbases_since_fork[coinbase_coin.name()] = height
+
+
+class ForkCoinDeltasCache:
+    """
+    LRU cache of the ForkCoinDeltas of the tips of the chains that are not the heaviest, by tip header hash. When an
+    orphan block is added, it takes over the deltas of its previous block, with its own coin changes, so validating
+    the next block of a fork does not read the blocks back to the fork point again.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_FORK_COIN_DELTAS_SIZE):
+        self.capacity = capacity
+        self.deltas: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.deltas)
+
+    def get(self, tip_hash: bytes32, fork_height: int) -> Optional[ForkCoinDeltas]:
+        """
+        Returns the deltas of the tip, if they are cached and relative to fork_height. The deltas of a tip stay valid
+        while its fork with the heaviest chain does not move, whatever the peak is.
+        """
+        deltas: Optional[ForkCoinDeltas] = self.deltas.get(tip_hash)
+        if deltas is None or deltas.fork_height != fork_height:
+            self.misses += 1
+            return None
+        self.deltas.move_to_end(tip_hash)
+        self.hits += 1
+        return deltas
+
+    def put(self, tip_hash: bytes32, deltas: ForkCoinDeltas) -> None:
+        self.deltas[tip_hash] = deltas
+        self.deltas.move_to_end(tip_hash)
+        while len(self.deltas) > self.capacity:
+            self.deltas.popitem(last=False)
+
+    def extend(
+        self,
+        prev_hash: bytes32,
+        prev_height: uint32,
+        header_hash: bytes32,
+        height: uint32,
+        fork_height: int,
+        coin_changes: BlockCoinChanges,
+    ) -> None:
+        """
+        Called when a block that is not in the heaviest chain is added, with its fork with the heaviest chain. Does
+        nothing if the deltas of the previous block are not known, they are rebuilt by the next validation.
+        """
+        if prev_height == fork_height:
+            deltas = ForkCoinDeltas(fork_height)
+        else:
+            prev_deltas: Optional[ForkCoinDeltas] = self.deltas.pop(prev_hash, None)
+            if prev_deltas is None or prev_deltas.fork_height != fork_height:
+                return
+            # Copied, since a validation of another block on the previous block can still be reading them. They are
+            # not kept for the previous block, which is rarely extended twice
+            deltas = prev_deltas.copy()
+        deltas.add_block(height, coin_changes)
+        self.put(header_hash, deltas)
@@ -1,10 +1,13 @@
 import asyncio
 import logging
+import math
+import time
 import traceback
 from concurrent.futures.process import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Dict, Union, Sequence
+from typing import List, Optional, Set, Tuple, Dict, Union, Sequence
 
+from src.consensus.block_body_validation import validate_block_body_context_free
 from src.consensus.block_header_validation import validate_finished_header_block
 from src.consensus.blockchain_interface import BlockchainInterface
 from src.consensus.constants import ConsensusConstants
@@ -25,6 +28,11 @@ from src.util.streamable import dataclass_from_dict, streamable, Streamable
 
 log = logging.getLogger(__name__)
 
+# Number of blocks sent to a worker in one call, before the time to validate a block is known
+DEFAULT_PRE_VALIDATION_BATCH_SIZE = 4
+# Time a worker should spend on a call, so the cost of the call is small in comparison
+TARGET_PRE_VALIDATION_BATCH_TIME = 0.5
+
 
 @dataclass(frozen=True)
 @streamable
@@ -32,27 +40,42 @@ class PreValidationResult(Streamable):
     error: Optional[uint16]
     required_iters: Optional[uint64]  # Iff error is None
     cost_result: Optional[CostResult]  # Iff error is None and block is a transaction block
+    body_validated: bool  # validate_block_body_context_free passed, see validate_block_body
+    signature_validated: bool  # And the aggregated signature was verified
 
 
 def batch_pre_validate_blocks(
-    constants_dict: Dict,
-    blocks_pickled: Dict[bytes, bytes],
-    header_blocks_pickled: List[bytes],
-    transaction_generators: List[Optional[bytes]],
+    constants: ConsensusConstants,
+    blocks: Dict[bytes32, BlockRecord],
+    blocks_pickled: List[bytes],
+    full_blocks: List[bool],
     check_filter: bool,
     expected_difficulty: List[uint64],
     expected_sub_slot_iters: List[uint64],
+    validate_signatures: bool,
 ) -> List[bytes]:
-    assert len(header_blocks_pickled) == len(transaction_generators)
-    blocks = {}
-    for k, v in blocks_pickled.items():
-        blocks[k] = BlockRecord.from_bytes(v)
+    """
+    Validates the headers of the blocks, which are full blocks where full_blocks is True and header blocks otherwise.
+    Full blocks also have their generators run, the checks of the body that do not need the blockchain or the coin
+    set done, and their aggregated signature verified if validate_signatures.
+    """
+    assert len(blocks_pickled) == len(full_blocks)
     results: List[PreValidationResult] = []
-    constants: ConsensusConstants = dataclass_from_dict(ConsensusConstants, constants_dict)
-    for i in range(len(header_blocks_pickled)):
+    for i in range(len(blocks_pickled)):
         try:
-            header_block: HeaderBlock = HeaderBlock.from_bytes(header_blocks_pickled[i])
-            generator: Optional[bytes] = transaction_generators[i]
+            cost_result: Optional[CostResult] = None
+            program: Optional[SerializedProgram] = None
+            if full_blocks[i]:
+                full_block: FullBlock = FullBlock.from_bytes(blocks_pickled[i])
+                if full_block.transactions_generator is not None:
+                    program = full_block.transactions_generator
+                    cost_result = calculate_cost_of_program(program, constants.CLVM_COST_RATIO_CONSTANT)
+                # The filter is built from the NPC list, so the generator only runs once
+                header_block: HeaderBlock = full_block.get_block_header(
+                    full_block.get_coin_changes(cost_result.npc_list if cost_result is not None else [])
+                )
+            else:
+                header_block = HeaderBlock.from_bytes(blocks_pickled[i])
             required_iters, error = validate_finished_header_block(
                 constants,
                 BlockCache(blocks),
@@ -61,51 +84,215 @@ def batch_pre_validate_blocks(
                 expected_difficulty[i],
                 expected_sub_slot_iters[i],
             )
-            cost_result = None
             error_int: Optional[uint16] = None
+            body_validated = False
             if error is not None:
                 error_int = uint16(error.code.value)
-            if not error and generator is not None:
-                cost_result = calculate_cost_of_program(
-                    SerializedProgram.from_bytes(generator), constants.CLVM_COST_RATIO_CONSTANT
+                cost_result = None
+            if (
+                error_int is None
+                and full_blocks[i]
+                and header_block.foliage_transaction_block is not None
+                and header_block.transactions_info is not None
+            ):
+                body_error: Optional[Err] = validate_block_body_context_free(
+                    constants,
+                    header_block.foliage_transaction_block,
+                    header_block.transactions_info,
+                    program,
+                    cost_result,
+                    validate_signatures,
                 )
-            results.append(PreValidationResult(error_int, required_iters, cost_result))
+                if body_error is not None:
+                    error_int = uint16(body_error.value)
+                    cost_result = None
+                else:
+                    body_validated = True
+            results.append(
+                PreValidationResult(
+                    error_int,
+                    required_iters,
+                    cost_result,
+                    body_validated,
+                    body_validated and validate_signatures,
+                )
+            )
         except Exception:
             error_stack = traceback.format_exc()
             log.error(f"Exception: {error_stack}")
-            results.append(PreValidationResult(uint16(Err.UNKNOWN.value), None, None))
+            results.append(PreValidationResult(uint16(Err.UNKNOWN.value), None, None, False, False))
     return [bytes(r) for r in results]
 
 
+# State of a worker process of a PreValidationPool
+_worker_constants: Optional[ConsensusConstants] = None
+_worker_block_records: Dict[bytes32, BlockRecord] = {}
+# Number of the last call whose block records the worker has
+_worker_call_number = 0
+
+
+def _initialize_worker(constants_dict: Dict) -> None:
+    global _worker_constants
+    _worker_constants = dataclass_from_dict(ConsensusConstants, constants_dict)
+
+
+def _pre_validate_in_worker(
+    reset: bool,
+    previous_call_number: int,
+    call_number: int,
+    added_block_records: List[bytes],
+    removed_block_records: List[bytes],
+    *args,
+) -> Tuple[Optional[List[bytes]], float]:
+    """
+    Updates the block records of the worker, and runs batch_pre_validate_blocks with them. Returns the results and
+    the time it took. Unless reset, the records are changes to those of the previous call, so the results are None if
+    the worker does not have them, because that call was cancelled before it ran.
+    """
+    global _worker_call_number
+    start = time.time()
+    if not reset and _worker_call_number != previous_call_number:
+        return None, time.time() - start
+    _worker_call_number = call_number
+    if reset:
+        _worker_block_records.clear()
+    for header_hash in removed_block_records:
+        _worker_block_records.pop(header_hash, None)
+    for block_record_bytes in added_block_records:
+        block_record = BlockRecord.from_bytes(block_record_bytes)
+        _worker_block_records[block_record.header_hash] = block_record
+    assert _worker_constants is not None
+    results = batch_pre_validate_blocks(_worker_constants, _worker_block_records, *args)
+    return results, time.time() - start
+
+
+class PreValidationPool:
+    """
+    Processes that pre-validate blocks. Each one parses the consensus constants once, and keeps the block records
+    that the blocks are validated against: the records it does not have yet are sent with each call, and the ones
+    that left the window of recent blocks are dropped. Each worker is its own single process executor, so it is known
+    which records it has. The number of blocks per call is chosen from the time a worker takes per block.
+    """
+
+    def __init__(self, constants_json: Dict, num_workers: int):
+        self.num_workers = max(1, num_workers)
+        self.executors = [
+            ProcessPoolExecutor(max_workers=1, initializer=_initialize_worker, initargs=(constants_json,))
+            for _ in range(self.num_workers)
+        ]
+        # Header hashes of the block records that each worker has, or None if it must start over
+        self.sent: List[Optional[Set[bytes32]]] = [set() for _ in range(self.num_workers)]
+        # Number of the last call sent to each worker, which the next call changes the block records of
+        self.call_numbers: List[int] = [0 for _ in range(self.num_workers)]
+        # Number of blocks each worker has been given and not validated yet
+        self.pending: List[int] = [0 for _ in range(self.num_workers)]
+        # Moving average of the time a worker spends per block
+        self.block_time: Optional[float] = None
+        self.block_records_sent = 0
+
+    def batch_size(self, num_blocks: int) -> int:
+        """
+        As many blocks per call as take TARGET_PRE_VALIDATION_BATCH_TIME, so calls are not dominated by sending
+        block records and results, but not more than are needed for all the workers to get some.
+        """
+        per_worker = max(1, math.ceil(num_blocks / self.num_workers))
+        if self.block_time is None:
+            return min(DEFAULT_PRE_VALIDATION_BATCH_SIZE, per_worker)
+        return max(1, min(math.ceil(TARGET_PRE_VALIDATION_BATCH_TIME / max(self.block_time, 1e-6)), per_worker))
+
+    async def pre_validate(
+        self,
+        block_records: Dict[bytes32, BlockRecord],
+        blocks_pickled: List[bytes],
+        *args,
+    ) -> List[bytes]:
+        """
+        Runs batch_pre_validate_blocks in the least busy worker, against block_records.
+        """
+        while True:
+            worker = min(range(self.num_workers), key=lambda i: self.pending[i])
+            sent: Optional[Set[bytes32]] = self.sent[worker]
+            reset = sent is None
+            if sent is None:
+                sent = set()
+            # The calls to a worker run in order, so the previous ones still have the records they were sent
+            removed = [header_hash for header_hash in sent if header_hash not in block_records]
+            added = [
+                bytes(block_record) for header_hash, block_record in block_records.items() if header_hash not in sent
+            ]
+            sent.difference_update(removed)
+            sent.update(block_records.keys())
+            self.sent[worker] = sent
+            self.block_records_sent += len(added)
+            previous_call_number = self.call_numbers[worker]
+            self.call_numbers[worker] += 1
+
+            num_blocks = len(blocks_pickled)
+            self.pending[worker] += num_blocks
+            try:
+                results, elapsed = await asyncio.get_running_loop().run_in_executor(
+                    self.executors[worker],
+                    _pre_validate_in_worker,
+                    reset,
+                    previous_call_number,
+                    previous_call_number + 1,
+                    added,
+                    [bytes(header_hash) for header_hash in removed],
+                    blocks_pickled,
+                    *args,
+                )
+            except BaseException:
+                # The worker might not have its records, also when the call was cancelled before or while it ran
+                self.sent[worker] = None
+                raise
+            finally:
+                self.pending[worker] -= num_blocks
+            if results is None:
+                # A call before this one was cancelled before it ran, the worker is sent all its records again
+                self.sent[worker] = None
+                continue
+            if num_blocks > 0:
+                block_time = elapsed / num_blocks
+                self.block_time = block_time if self.block_time is None else 0.8 * self.block_time + 0.2 * block_time
+            return results
+
+    def shut_down(self) -> None:
+        for executor in self.executors:
+            executor.shutdown(wait=True)
+
+
 async def pre_validate_blocks_multiprocessing(
     constants: ConsensusConstants,
-    constants_json: Dict,
     block_records: BlockchainInterface,
     blocks: Sequence[Union[FullBlock, HeaderBlock]],
-    pool: ProcessPoolExecutor,
+    pool: PreValidationPool,
+    validate_signatures: bool = False,
 ) -> Optional[List[PreValidationResult]]:
     """
-    This method must be called under the blockchain lock
-    If all the full blocks pass pre-validation, (only validates header), returns the list of required iters.
+    It does not need the blockchain lock: block_records is only read, and the block records of the blocks only added
+    to it temporarily, before the first await, so blocks that are added to the blockchain meanwhile are never seen
+    half added. The blocks are then validated in the workers, against a copy of the recent block records. The results
+    only hold for the chain the blocks were validated against, which receive_block checks again under the lock.
+    If all the full blocks pass pre-validation, (validates the header, and the parts of the body of full blocks that
+    do not need the coin set), returns the list of required iters.
     if any validation issue occurs, returns False.
+    The aggregated signatures of full blocks are verified too if validate_signatures, otherwise validate_block_body
+    verifies them, with the cache of the signatures verified by the mempool.
 
     Args:
-        constants_json:
         pool:
         constants:
         block_records:
         blocks: list of full blocks to validate (must be connected to current chain)
     """
-    batch_size = 4
     prev_b: Optional[BlockRecord] = None
     # Collects all the recent blocks (up to the previous sub-epoch)
     recent_blocks: Dict[bytes32, BlockRecord] = {}
-    recent_blocks_compressed: Dict[bytes32, BlockRecord] = {}
     num_sub_slots_found = 0
     num_blocks_seen = 0
     if blocks[0].height > 0:
         if not block_records.contains_block(blocks[0].prev_header_hash):
-            return [PreValidationResult(uint16(Err.INVALID_PREV_BLOCK_HASH.value), None, None)]
+            return [PreValidationResult(uint16(Err.INVALID_PREV_BLOCK_HASH.value), None, None, False, False)]
         curr = block_records.block_record(blocks[0].prev_header_hash)
         num_sub_slots_to_look_for = 3 if curr.overflow else 2
         while (
@@ -113,9 +300,6 @@ async def pre_validate_blocks_multiprocessing(
             or num_blocks_seen < constants.NUMBER_OF_TIMESTAMPS
             or num_sub_slots_found < num_sub_slots_to_look_for
         ) and curr.height > 0:
-            if num_blocks_seen < constants.NUMBER_OF_TIMESTAMPS or num_sub_slots_found < num_sub_slots_to_look_for:
-                recent_blocks_compressed[curr.header_hash] = curr
-
             if curr.first_in_sub_slot:
                 assert curr.finished_challenge_slot_hashes is not None
                 num_sub_slots_found += len(curr.finished_challenge_slot_hashes)
@@ -124,7 +308,6 @@ async def pre_validate_blocks_multiprocessing(
                 num_blocks_seen += 1
             curr = block_records.block_record(curr.prev_hash)
         recent_blocks[curr.header_hash] = curr
-        recent_blocks_compressed[curr.header_hash] = curr
     block_record_was_present = []
     for block in blocks:
         block_record_was_present.append(block_records.contains_block(block.header_hash))
@@ -168,7 +351,6 @@ async def pre_validate_blocks_multiprocessing(
             None,
         )
         recent_blocks[block_rec.header_hash] = block_rec
-        recent_blocks_compressed[block_rec.header_hash] = block_rec
         block_records.add_block_record(block_rec)  # Temporarily add block to dict
         prev_b = block_rec
         diff_ssis.append((difficulty, sub_slot_iters))
@@ -177,40 +359,25 @@ async def pre_validate_blocks_multiprocessing(
         if not block_record_was_present[i]:
             block_records.remove_block_record(block.header_hash)
 
-    recent_sb_compressed_pickled = {bytes(k): bytes(v) for k, v in recent_blocks_compressed.items()}
-
+    # The workers keep the block records they were sent, so only the new ones are sent with each batch
+    batch_size = pool.batch_size(len(blocks))
     futures = []
     # Pool of workers to validate blocks concurrently
     for i in range(0, len(blocks), batch_size):
         end_i = min(i + batch_size, len(blocks))
         blocks_to_validate = blocks[i:end_i]
-        if any([len(block.finished_sub_slots) > 0 for block in blocks_to_validate]):
-            final_pickled = {bytes(k): bytes(v) for k, v in recent_blocks.items()}
-        else:
-            final_pickled = recent_sb_compressed_pickled
-        hb_pickled: List[bytes] = []
-        generators: List[Optional[bytes]] = []
-        for block in blocks_to_validate:
-            if isinstance(block, FullBlock):
-                hb_pickled.append(bytes(block.get_block_header()))
-                generators.append(
-                    bytes(block.transactions_generator) if block.transactions_generator is not None else None
-                )
-            else:
-                hb_pickled.append(bytes(block))
-                generators.append(None)
-
+        # Full blocks are sent whole, and their header blocks are built in the worker, which runs their generators
+        blocks_pickled: List[bytes] = [bytes(block) for block in blocks_to_validate]
+        full_blocks: List[bool] = [isinstance(block, FullBlock) for block in blocks_to_validate]
         futures.append(
-            asyncio.get_running_loop().run_in_executor(
-                pool,
-                batch_pre_validate_blocks,
-                constants_json,
-                final_pickled,
-                hb_pickled,
-                generators,
+            pool.pre_validate(
+                recent_blocks,
+                blocks_pickled,
+                full_blocks,
                 True,
                 [diff_ssis[j][0] for j in range(i, end_i)],
                 [diff_ssis[j][1] for j in range(i, end_i)],
+                validate_signatures,
             )
         )
     # Collect all results into one flat list
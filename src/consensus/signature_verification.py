@@ -0,0 +1,171 @@
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, List, Set, Tuple
+
+from blspy import AugSchemeMPL, G1Element, G2Element
+
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.batching_executor import BatchingExecutor
+from src.util.hash import std_hash
+
+log = logging.getLogger(__name__)
+
+# Number of processes running the pairing checks
+DEFAULT_SIGNATURE_WORKERS = 2
+# Maximum number of aggregated signatures sent to a process in one call
+DEFAULT_SIGNATURE_BATCH_SIZE = 32
+# Number of verified aggregated signatures that are remembered
+DEFAULT_SIGNATURE_CACHE_SIZE = 50000
+
+# Public keys, messages and aggregated signature, serialized to be sent to another process
+SerializedSignature = Tuple[List[bytes], List[bytes], bytes]
+
+
+def verify_signatures_multiprocess(signatures: List[SerializedSignature]) -> List[bool]:
+    results: List[bool] = []
+    for pks_bytes, msgs, signature_bytes in signatures:
+        try:
+            pks = [G1Element.from_bytes(pk) for pk in pks_bytes]
+            results.append(AugSchemeMPL.aggregate_verify(pks, msgs, G2Element.from_bytes(signature_bytes)))
+        except Exception as e:
+            log.warning(f"Failed to verify signature: {e}")
+            results.append(False)
+    return results
+
+
+def pair_key(pk: G1Element, msg: bytes) -> bytes32:
+    return std_hash(bytes(pk) + msg)
+
+
+class VerifiedSignatureCache:
+    """
+    LRU cache of the aggregated signatures that were verified, with the (public key, message) pairs they sign,
+    indexed by pair. A signature over pairs that can be split into cached groups, such as a block made of spend
+    bundles that were verified by the mempool, is valid if it is the aggregate of their signatures, so it does not
+    need any pairing check.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries: OrderedDict = OrderedDict()
+        self.entries_by_pair: Dict[bytes32, Set[bytes32]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, pair_keys: List[bytes32], signature: G2Element) -> None:
+        if len(pair_keys) == 0:
+            return
+        entry_key = std_hash(b"".join(pair_keys) + bytes(signature))
+        if entry_key in self.entries:
+            self.entries.move_to_end(entry_key)
+            return
+        self.entries[entry_key] = (pair_keys, signature)
+        for key in pair_keys:
+            self.entries_by_pair.setdefault(key, set()).add(entry_key)
+        while len(self.entries) > self.capacity:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _remove(self, entry_key: bytes32) -> None:
+        pair_keys, _ = self.entries.pop(entry_key)
+        for key in pair_keys:
+            entry_keys = self.entries_by_pair.get(key)
+            if entry_keys is None:
+                continue
+            entry_keys.discard(entry_key)
+            if len(entry_keys) == 0:
+                self.entries_by_pair.pop(key)
+
+    def is_verified(self, pair_keys: List[bytes32], signature: G2Element) -> bool:
+        """
+        Returns True if the pairs are exactly those of some cached signatures, and signature is their aggregate.
+        """
+        if len(pair_keys) == 0:
+            return False
+        remaining: Counter = Counter(pair_keys)
+        used: List[bytes32] = []
+        for key in pair_keys:
+            if remaining[key] == 0:
+                continue
+            found = False
+            for entry_key in self.entries_by_pair.get(key, set()):
+                needed: Counter = Counter(self.entries[entry_key][0])
+                if all(remaining[k] >= count for k, count in needed.items()):
+                    remaining.subtract(needed)
+                    used.append(entry_key)
+                    found = True
+                    break
+            if not found:
+                self.misses += 1
+                return False
+        if AugSchemeMPL.aggregate([self.entries[entry_key][1] for entry_key in used]) != signature:
+            self.misses += 1
+            return False
+        for entry_key in used:
+            self.entries.move_to_end(entry_key)
+        self.hits += 1
+        return True
+
+
+class SignatureVerifier:
+    """
+    Verifies aggregated signatures in a pool of processes, without blocking the event loop, in batches, so the
+    signatures of concurrent mempool admissions and blocks are checked together. Verified signatures are cached, and
+    a signature that is the aggregate of cached ones, over the same pairs, is valid without any pairing check.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = DEFAULT_SIGNATURE_WORKERS,
+        batch_size: int = DEFAULT_SIGNATURE_BATCH_SIZE,
+        cache_size: int = DEFAULT_SIGNATURE_CACHE_SIZE,
+    ):
+        self.executor = BatchingExecutor(
+            "Signature verification",
+            verify_signatures_multiprocess,
+            self._handle_result,
+            num_workers=num_workers,
+            batch_size=batch_size,
+        )
+        self.cache = VerifiedSignatureCache(cache_size)
+        self.failed = 0
+
+    def _handle_result(self, context: Tuple[List[bytes32], G2Element], valid: bool) -> bool:
+        pair_keys, signature = context
+        if valid:
+            self.cache.add(pair_keys, signature)
+        else:
+            self.failed += 1
+        return valid
+
+    async def verify(self, pks: List[G1Element], msgs: List[bytes], signature: G2Element) -> bool:
+        """
+        Returns True if signature is the aggregated signature of msgs by pks.
+        """
+        if len(pks) != len(msgs):
+            return False
+        if len(pks) == 0:
+            return signature == G2Element.infinity()
+        pair_keys = [pair_key(pk, msg) for pk, msg in zip(pks, msgs)]
+        if self.cache.is_verified(pair_keys, signature):
+            return True
+        key = std_hash(b"".join(pair_keys) + bytes(signature))
+        serialized: SerializedSignature = ([bytes(pk) for pk in pks], msgs, bytes(signature))
+        return await self.executor.submit(key, serialized, (pair_keys, signature))
+
+    def get_metrics(self) -> Dict:
+        metrics = self.executor.get_metrics()
+        metrics["verified"] = metrics.pop("processed")
+        metrics["failed"] = self.failed
+        metrics["cache_size"] = len(self.cache)
+        metrics["cache_hits"] = self.cache.hits
+        metrics["cache_misses"] = self.cache.misses
+        metrics["cache_evictions"] = self.cache.evictions
+        return metrics
+
+    def shut_down(self) -> None:
+        self.executor.shut_down()
@@ -284,6 +284,7 @@ class FarmerAPI:
                     "passed_filter": request.passed,
                     "proofs": request.proofs,
                     "total_plots": request.total_plots,
+                    "filter_time": request.filter_time,
                     "timestamp": request.timestamp,
                 }
             },
@@ -1,8 +1,10 @@
 import logging
 import aiosqlite
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
+from src.types.block_coin_changes import BlockCoinChanges
 from src.types.full_block import FullBlock
+from src.types.full_block_view import FullBlockView
 from src.types.header_block import HeaderBlock
 from src.types.blockchain_format.sized_bytes import bytes32
 from src.types.blockchain_format.sub_epoch_summary import SubEpochSummary
@@ -17,6 +19,7 @@ log = logging.getLogger(__name__)
 class BlockStore:
     db: aiosqlite.Connection
     block_cache: LRUCache
+    coin_changes_cache: LRUCache
 
     @classmethod
     async def create(cls, connection: aiosqlite.Connection):
@@ -25,14 +28,27 @@ class BlockStore:
         # All full blocks which have been added to the blockchain. Header_hash -> block
         self.db = connection
         await self.db.execute(
-            "CREATE TABLE IF NOT EXISTS full_blocks(header_hash text PRIMARY KEY, height bigint,"
+            "CREATE TABLE IF NOT EXISTS full_blocks(header_hash blob PRIMARY KEY, height bigint,"
             "  is_block tinyint, block blob)"
         )
 
+        # Header blocks of all full blocks, so serving headers does not require reading and decoding the full blocks
+        cursor = await self.db.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='header_blocks'")
+        header_blocks_table_exists = await cursor.fetchone() is not None
+        await cursor.close()
+        await self.db.execute(
+            "CREATE TABLE IF NOT EXISTS header_blocks(header_hash blob PRIMARY KEY, height bigint, block blob)"
+        )
+
+        # Removals, additions and reward coins of transaction blocks, so they are computed once, when validated
+        await self.db.execute(
+            "CREATE TABLE IF NOT EXISTS block_coin_changes(header_hash blob PRIMARY KEY, coin_changes blob)"
+        )
+
         # Block records
         await self.db.execute(
             "CREATE TABLE IF NOT EXISTS block_records(header_hash "
-            "text PRIMARY KEY, prev_hash text, height bigint,"
+            "blob PRIMARY KEY, prev_hash blob, height bigint,"
             "block blob, sub_epoch_summary blob, is_peak tinyint, is_block tinyint)"
         )
 
@@ -44,6 +60,7 @@ class BlockStore:
         # Height index so we can look up in order of height for sync purposes
         await self.db.execute("CREATE INDEX IF NOT EXISTS full_block_height on full_blocks(height)")
         await self.db.execute("CREATE INDEX IF NOT EXISTS is_block on full_blocks(is_block)")
+        await self.db.execute("CREATE INDEX IF NOT EXISTS header_block_height on header_blocks(height)")
 
         await self.db.execute("CREATE INDEX IF NOT EXISTS height on block_records(height)")
 
@@ -52,9 +69,39 @@ class BlockStore:
         await self.db.execute("CREATE INDEX IF NOT EXISTS is_block on block_records(is_block)")
 
         await self.db.commit()
+        if not header_blocks_table_exists:
+            await self._add_missing_header_blocks()
         self.block_cache = LRUCache(1000)
+        self.coin_changes_cache = LRUCache(10000)
         return self
 
+    async def _add_missing_header_blocks(self, batch_size: int = 1000) -> None:
+        """
+        Migrates databases created before header blocks were stored, by creating the header block of every stored
+        full block, in batches of heights.
+        """
+        cursor = await self.db.execute("SELECT MAX(height) from full_blocks")
+        row = await cursor.fetchone()
+        await cursor.close()
+        if row is None or row[0] is None:
+            return
+        max_height = row[0]
+        log.info(f"Adding header blocks for {max_height + 1} heights, this might take a while")
+        for start in range(0, max_height + 1, batch_size):
+            cursor = await self.db.execute(
+                "SELECT header_hash, height, block from full_blocks WHERE height >= ? and height < ?",
+                (start, start + batch_size),
+            )
+            rows = await cursor.fetchall()
+            await cursor.close()
+            header_block_rows = [(row[0], row[1], bytes(FullBlockView(row[2]).get_block_header())) for row in rows]
+            cursor = await self.db.executemany(
+                "INSERT OR REPLACE INTO header_blocks VALUES(?, ?, ?)", header_block_rows
+            )
+            await cursor.close()
+            await self.db.commit()
+            log.info(f"Added header blocks up to height {min(start + batch_size, max_height + 1) - 1}")
+
     async def begin_transaction(self):
         # Also locks the coin store, since both stores must be updated at once
         cursor = await self.db.execute("BEGIN TRANSACTION")
@@ -68,12 +115,26 @@ class BlockStore:
         cursor = await self.db.execute("ROLLBACK")
         await cursor.close()
 
-    async def add_full_block(self, block: FullBlock, block_record: BlockRecord) -> None:
+    async def add_full_block(
+        self, block: FullBlock, block_record: BlockRecord, coin_changes: Optional[BlockCoinChanges] = None
+    ) -> None:
+        """
+        Stores the block, its header block and record, and the coin changes of transaction blocks, which are computed
+        if not given.
+        """
         self.block_cache.put(block.header_hash, block)
+        if block.is_transaction_block():
+            if coin_changes is None:
+                coin_changes = block.get_coin_changes()
+            self.coin_changes_cache.put(block.header_hash, coin_changes)
+            cursor_changes = await self.db.execute(
+                "INSERT OR REPLACE INTO block_coin_changes VALUES(?, ?)", (block.header_hash, bytes(coin_changes))
+            )
+            await cursor_changes.close()
         cursor_1 = await self.db.execute(
             "INSERT OR REPLACE INTO full_blocks VALUES(?, ?, ?, ?)",
             (
-                block.header_hash.hex(),
+                block.header_hash,
                 block.height,
                 int(block.is_transaction_block()),
                 bytes(block),
@@ -82,11 +143,17 @@ class BlockStore:
 
         await cursor_1.close()
 
+        cursor_header = await self.db.execute(
+            "INSERT OR REPLACE INTO header_blocks VALUES(?, ?, ?)",
+            (block.header_hash, block.height, bytes(block.get_block_header(coin_changes))),
+        )
+        await cursor_header.close()
+
         cursor_2 = await self.db.execute(
             "INSERT OR REPLACE INTO block_records VALUES(?, ?, ?, ?,?, ?, ?)",
             (
-                block.header_hash.hex(),
-                block.prev_header_hash.hex(),
+                block.header_hash,
+                block.prev_header_hash,
                 block.height,
                 bytes(block_record),
                 None
@@ -99,6 +166,41 @@ class BlockStore:
         await cursor_2.close()
         await self.db.commit()
 
+    async def add_block_records(self, block_records: List[BlockRecord]) -> None:
+        """
+        Stores block records in bulk, without their full blocks, for loading a snapshot of the chain.
+        """
+        cursor = await self.db.executemany(
+            "INSERT OR REPLACE INTO block_records VALUES(?, ?, ?, ?,?, ?, ?)",
+            [
+                (
+                    block_record.header_hash,
+                    block_record.prev_hash,
+                    block_record.height,
+                    bytes(block_record),
+                    None
+                    if block_record.sub_epoch_summary_included is None
+                    else bytes(block_record.sub_epoch_summary_included),
+                    False,
+                    block_record.is_transaction_block,
+                )
+                for block_record in block_records
+            ],
+        )
+        await cursor.close()
+        await self.db.commit()
+
+    async def add_header_blocks(self, header_blocks: List[HeaderBlock]) -> None:
+        """
+        Stores header blocks in bulk, without their full blocks, for loading a snapshot of the chain.
+        """
+        cursor = await self.db.executemany(
+            "INSERT OR REPLACE INTO header_blocks VALUES(?, ?, ?)",
+            [(header_block.header_hash, header_block.height, bytes(header_block)) for header_block in header_blocks],
+        )
+        await cursor.close()
+        await self.db.commit()
+
     async def persist_sub_epoch_challenge_segments(
         self, sub_epoch_summary_height: uint32, segments: List[SubEpochChallengeSegment]
     ):
@@ -129,7 +231,7 @@ class BlockStore:
         cached = self.block_cache.get(header_hash)
         if cached is not None:
             return cached
-        cursor = await self.db.execute("SELECT block from full_blocks WHERE header_hash=?", (header_hash.hex(),))
+        cursor = await self.db.execute("SELECT block from full_blocks WHERE header_hash=?", (header_hash,))
         row = await cursor.fetchone()
         await cursor.close()
         if row is not None:
@@ -147,6 +249,68 @@ class BlockStore:
         await cursor.close()
         return [FullBlock.from_bytes(row[0]) for row in rows]
 
+    async def get_full_block_view(self, header_hash: bytes32) -> Optional[FullBlockView]:
+        """
+        Returns a view of the block that only deserializes the fields that are accessed, for callers that do not need
+        the whole block.
+        """
+        cursor = await self.db.execute("SELECT block from full_blocks WHERE header_hash=?", (header_hash,))
+        row = await cursor.fetchone()
+        await cursor.close()
+        if row is not None:
+            return FullBlockView(row[0])
+        return None
+
+    async def get_coin_changes(self, block: Union[FullBlock, FullBlockView]) -> BlockCoinChanges:
+        """
+        Returns the removals, additions and reward coins of the block, from the cache or the database, so the
+        transactions generator of a stored block does not run again. They are computed for blocks stored before
+        coin changes were.
+        """
+        if not block.is_transaction_block():
+            return BlockCoinChanges([], [], [])
+        coin_changes: Optional[BlockCoinChanges] = await self._get_stored_coin_changes(block.header_hash)
+        if coin_changes is None:
+            coin_changes = block.get_coin_changes()
+            self.coin_changes_cache.put(block.header_hash, coin_changes)
+        return coin_changes
+
+    async def get_coin_changes_by_hash(self, header_hash: bytes32) -> Optional[BlockCoinChanges]:
+        """
+        Like get_coin_changes, only reading the block if its coin changes are not stored. Returns None if the block
+        is not stored.
+        """
+        coin_changes: Optional[BlockCoinChanges] = await self._get_stored_coin_changes(header_hash)
+        if coin_changes is not None:
+            return coin_changes
+        block: Optional[FullBlockView] = await self.get_full_block_view(header_hash)
+        if block is None:
+            return None
+        return await self.get_coin_changes(block)
+
+    async def _get_stored_coin_changes(self, header_hash: bytes32) -> Optional[BlockCoinChanges]:
+        cached: Optional[BlockCoinChanges] = self.coin_changes_cache.get(header_hash)
+        if cached is not None:
+            return cached
+        cursor = await self.db.execute(
+            "SELECT coin_changes from block_coin_changes WHERE header_hash=?", (header_hash,)
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        if row is None:
+            return None
+        coin_changes = BlockCoinChanges.from_bytes(row[0])
+        self.coin_changes_cache.put(header_hash, coin_changes)
+        return coin_changes
+
+    async def get_header_block(self, header_hash: bytes32) -> Optional[HeaderBlock]:
+        cursor = await self.db.execute("SELECT block from header_blocks WHERE header_hash=?", (header_hash,))
+        row = await cursor.fetchone()
+        await cursor.close()
+        if row is not None:
+            return HeaderBlock.from_bytes(row[0])
+        return None
+
     async def get_header_blocks_by_hash(self, header_hashes: List[bytes32]) -> List[HeaderBlock]:
         """
         Returns a list of header blocks, ordered by the same order in which header_hashes are passed in.
@@ -156,15 +320,16 @@ class BlockStore:
         if len(header_hashes) == 0:
             return []
 
-        header_hashes_db = tuple([hh.hex() for hh in header_hashes])
-        formatted_str = f'SELECT block from full_blocks WHERE header_hash in ({"?," * (len(header_hashes_db) - 1)}?)'
+        header_hashes_db = tuple(header_hashes)
+        formatted_str = (
+            f'SELECT header_hash, block from header_blocks WHERE header_hash in ({"?," * (len(header_hashes_db) - 1)}?)'
+        )
         cursor = await self.db.execute(formatted_str, header_hashes_db)
         rows = await cursor.fetchall()
         await cursor.close()
         all_headers: Dict[bytes32, HeaderBlock] = {}
         for row in rows:
-            full_block: FullBlock = FullBlock.from_bytes(row[0])
-            all_headers[full_block.header_hash] = full_block.get_block_header()
+            all_headers[bytes32(row[0])] = HeaderBlock.from_bytes(row[1])
         ret: List[HeaderBlock] = []
         for hh in header_hashes:
             if hh not in all_headers:
@@ -177,24 +342,26 @@ class BlockStore:
         start: int,
         stop: int,
     ) -> Dict[bytes32, HeaderBlock]:
+        """
+        Returns the header blocks in the height range, with their transactions filter, as they are stored.
+        """
 
-        formatted_str = f"SELECT header_hash,block from full_blocks WHERE height >= {start} and height <= {stop}"
+        formatted_str = f"SELECT header_hash,block from header_blocks WHERE height >= {start} and height <= {stop}"
 
         cursor = await self.db.execute(formatted_str)
         rows = await cursor.fetchall()
         await cursor.close()
         ret: Dict[bytes32, HeaderBlock] = {}
         for row in rows:
-            header_hash = bytes.fromhex(row[0])
-            full_block: FullBlock = FullBlock.from_bytes(row[1])
-            ret[header_hash] = full_block.get_block_header()
+            header_hash = bytes32(row[0])
+            ret[header_hash] = HeaderBlock.from_bytes(row[1])
 
         return ret
 
     async def get_block_record(self, header_hash: bytes32) -> Optional[BlockRecord]:
         cursor = await self.db.execute(
             "SELECT block from block_records WHERE header_hash=?",
-            (header_hash.hex(),),
+            (header_hash,),
         )
         row = await cursor.fetchone()
         await cursor.close()
@@ -215,7 +382,7 @@ class BlockStore:
         ret: Dict[bytes32, BlockRecord] = {}
         peak: Optional[bytes32] = None
         for row in rows:
-            header_hash = bytes.fromhex(row[0])
+            header_hash = bytes32(row[0])
             ret[header_hash] = BlockRecord.from_bytes(row[3])
             if row[5]:
                 assert peak is None  # Sanity check, only one peak
@@ -239,7 +406,7 @@ class BlockStore:
         await cursor.close()
         ret: Dict[bytes32, BlockRecord] = {}
         for row in rows:
-            header_hash = bytes.fromhex(row[0])
+            header_hash = bytes32(row[0])
             ret[header_hash] = BlockRecord.from_bytes(row[1])
 
         return ret
@@ -264,9 +431,9 @@ class BlockStore:
         await cursor.close()
         ret: Dict[bytes32, BlockRecord] = {}
         for row in rows:
-            header_hash = bytes.fromhex(row[0])
+            header_hash = bytes32(row[0])
             ret[header_hash] = BlockRecord.from_bytes(row[1])
-        return ret, bytes.fromhex(peak_row[0])
+        return ret, bytes32(peak_row[0])
 
     async def get_peak_height_dicts(self) -> Tuple[Dict[uint32, bytes32], Dict[uint32, SubEpochSummary]]:
         """
@@ -280,7 +447,7 @@ class BlockStore:
         if row is None:
             return {}, {}
 
-        peak: bytes32 = bytes.fromhex(row[0])
+        peak: bytes32 = bytes32(row[0])
         cursor = await self.db.execute("SELECT header_hash,prev_hash,height,sub_epoch_summary from block_records")
         rows = await cursor.fetchall()
         await cursor.close()
@@ -289,10 +456,10 @@ class BlockStore:
         hash_to_summary: Dict[bytes32, SubEpochSummary] = {}
 
         for row in rows:
-            hash_to_prev_hash[bytes.fromhex(row[0])] = bytes.fromhex(row[1])
-            hash_to_height[bytes.fromhex(row[0])] = row[2]
+            hash_to_prev_hash[bytes32(row[0])] = bytes32(row[1])
+            hash_to_height[bytes32(row[0])] = row[2]
             if row[3] is not None:
-                hash_to_summary[bytes.fromhex(row[0])] = SubEpochSummary.from_bytes(row[3])
+                hash_to_summary[bytes32(row[0])] = SubEpochSummary.from_bytes(row[3])
 
         height_to_hash: Dict[uint32, bytes32] = {}
         sub_epoch_summaries: Dict[uint32, SubEpochSummary] = {}
@@ -316,6 +483,6 @@ class BlockStore:
         await cursor_1.close()
         cursor_2 = await self.db.execute(
             "UPDATE block_records SET is_peak=1 WHERE header_hash=?",
-            (header_hash.hex(),),
+            (header_hash,),
         )
         await cursor_2.close()
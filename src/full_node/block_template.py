@@ -0,0 +1,127 @@
+import heapq
+from typing import Dict, Iterator, List, Set, Tuple
+
+from src.full_node.mempool import Mempool
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.types.mempool_item import MempoolItem
+
+# Maximum number of mempool items that a new mempool item can spend the coins of, directly or through other mempool
+# items. This bounds the size of packages and the work to select and remove items
+MAX_MEMPOOL_ANCESTORS = 25
+
+
+def get_parents(mempool: Mempool, item: MempoolItem) -> List[MempoolItem]:
+    """
+    Returns the mempool items that create the coins spent by item, which must be in the same block or before it.
+    """
+    parents: Dict[bytes32, MempoolItem] = {}
+    for coin in item.removals:
+        parent = mempool.additions.get(coin.name())
+        if parent is not None and parent.name != item.name:
+            parents[parent.name] = parent
+    return list(parents.values())
+
+
+def get_package(mempool: Mempool, item: MempoolItem, selected: Set[bytes32]) -> List[MempoolItem]:
+    """
+    Returns item with its ancestors in the mempool that are not selected yet, ancestors first.
+    """
+    package: List[MempoolItem] = []
+    seen: Set[bytes32] = {item.name}
+    # Depth first, with the parents of each item on the stack that are not visited yet
+    stack: List[Tuple[MempoolItem, Iterator[MempoolItem]]] = [(item, iter(get_parents(mempool, item)))]
+    while len(stack) > 0:
+        curr, parents = stack[-1]
+        parent = next(parents, None)
+        if parent is None:
+            stack.pop()
+            package.append(curr)
+        elif parent.name not in seen and parent.name not in selected:
+            seen.add(parent.name)
+            stack.append((parent, iter(get_parents(mempool, parent))))
+    return package
+
+
+def count_ancestors(mempool: Mempool, parents: List[MempoolItem]) -> int:
+    """
+    Returns the number of mempool items in parents and their ancestors.
+    """
+    ancestors: Set[bytes32] = set()
+    for parent in parents:
+        if parent.name not in ancestors:
+            ancestors.update(item.name for item in get_package(mempool, parent, ancestors))
+    return len(ancestors)
+
+
+def package_fee_per_cost(package: List[MempoolItem]) -> float:
+    cost = sum(item.cost_result.cost for item in package)
+    if cost == 0:
+        return 0
+    return sum(item.fee for item in package) / cost
+
+
+def select_mempool_items(mempool: Mempool, max_cost: int, max_fees: int) -> List[MempoolItem]:
+    """
+    Selects the mempool items to include in a block, highest fee per cost first. An item that spends coins created
+    by other mempool items is only included with them, at the fee per cost of the whole package, so a high fee can
+    pay for its cheap parents. Packages that do not fit in the remaining cost or fees are skipped, and smaller ones
+    after them can still be included. Returns the items in an order where parents come before their children.
+    """
+    selected: Set[bytes32] = set()
+    skipped: Set[bytes32] = set()
+    result: List[MempoolItem] = []
+    cost_sum = 0
+    fee_sum = 0
+    children: Dict[bytes32, List[MempoolItem]] = {}
+    # Entries are (-fee per cost, name, version), where entries with an old version are outdated
+    heap: List[Tuple[float, bytes32, int]] = []
+    versions: Dict[bytes32, int] = {}
+    # The ancestors of each item, from the ancestors of its parents, which are computed first
+    ancestors: Dict[bytes32, Set[bytes32]] = {}
+    computed: Set[bytes32] = set()
+    for item in mempool.spends.values():
+        for curr in get_package(mempool, item, computed):
+            curr_ancestors: Set[bytes32] = set()
+            for parent in get_parents(mempool, curr):
+                children.setdefault(parent.name, []).append(curr)
+                curr_ancestors.add(parent.name)
+                curr_ancestors.update(ancestors[parent.name])
+            ancestors[curr.name] = curr_ancestors
+            computed.add(curr.name)
+            if len(curr_ancestors) == 0:
+                fee_per_cost = curr.fee_per_cost
+            else:
+                package = [mempool.spends[name] for name in curr_ancestors] + [curr]
+                fee_per_cost = package_fee_per_cost(package)
+            versions[curr.name] = 0
+            heap.append((-fee_per_cost, curr.name, 0))
+    heapq.heapify(heap)
+
+    while len(heap) > 0 and cost_sum < max_cost:
+        _, name, version = heapq.heappop(heap)
+        if version != versions[name] or name in selected or name in skipped:
+            continue
+        package = get_package(mempool, mempool.spends[name], selected)
+        package_cost = sum(item.cost_result.cost for item in package)
+        package_fees = sum(item.fee for item in package)
+        if cost_sum + package_cost > max_cost or fee_sum + package_fees > max_fees:
+            skipped.add(name)
+            continue
+        cost_sum += package_cost
+        fee_sum += package_fees
+        for item in package:
+            selected.add(item.name)
+            result.append(item)
+        # The packages of the descendants of the selected items do not include them anymore
+        to_update: List[MempoolItem] = [child for item in package for child in children.get(item.name, [])]
+        updated: Set[bytes32] = set()
+        while len(to_update) > 0:
+            descendant = to_update.pop()
+            if descendant.name in updated or descendant.name in selected or descendant.name in skipped:
+                continue
+            updated.add(descendant.name)
+            versions[descendant.name] += 1
+            fee_per_cost = package_fee_per_cost(get_package(mempool, descendant, selected))
+            heapq.heappush(heap, (-fee_per_cost, descendant.name, versions[descendant.name]))
+            to_update.extend(children.get(descendant.name, []))
+    return result
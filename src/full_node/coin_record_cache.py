@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.types.coin_record import CoinRecord
+from src.util.ints import uint32
+
+
+class CoinRecordCache:
+    """
+    LRU cache of coin records by coin name. The names are also indexed by the heights at which their coins were
+    confirmed and spent, so a rollback only visits the records of the heights that are rolled back. The hit, miss and
+    eviction counters are kept for sizing the cache.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.records: OrderedDict = OrderedDict()
+        self.names_by_height: Dict[uint32, Set[bytes32]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, coin_name: bytes32) -> Optional[CoinRecord]:
+        record: Optional[CoinRecord] = self.records.get(coin_name)
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.records.move_to_end(coin_name)
+        return record
+
+    def peek(self, coin_name: bytes32) -> Optional[CoinRecord]:
+        """
+        Returns the record without counting a hit or a miss, or refreshing it.
+        """
+        return self.records.get(coin_name)
+
+    def put(self, coin_name: bytes32, record: CoinRecord) -> None:
+        self.remove(coin_name)
+        self.records[coin_name] = record
+        self._index(coin_name, record.confirmed_block_index)
+        if record.spent:
+            self._index(coin_name, record.spent_block_index)
+        while len(self.records) > self.capacity:
+            self.remove(next(iter(self.records)))
+            self.evictions += 1
+
+    def remove(self, coin_name: bytes32) -> None:
+        record: Optional[CoinRecord] = self.records.pop(coin_name, None)
+        if record is None:
+            return
+        self._unindex(coin_name, record.confirmed_block_index)
+        if record.spent:
+            self._unindex(coin_name, record.spent_block_index)
+
+    def clear(self) -> None:
+        """
+        Removes all the records, keeping the counters.
+        """
+        self.records.clear()
+        self.names_by_height.clear()
+
+    def rollback(self, block_index: int) -> None:
+        """
+        Removes the records of the coins confirmed after block_index, and marks the coins spent after it as unspent.
+        """
+        heights: List[uint32] = [height for height in self.names_by_height.keys() if height > block_index]
+        for height in heights:
+            for coin_name in list(self.names_by_height.get(height, [])):
+                record = self.records[coin_name]
+                self.remove(coin_name)
+                if record.confirmed_block_index <= block_index:
+                    self.put(
+                        coin_name,
+                        CoinRecord(
+                            record.coin,
+                            record.confirmed_block_index,
+                            uint32(0),
+                            False,
+                            record.coinbase,
+                            record.timestamp,
+                        ),
+                    )
+
+    def get_metrics(self) -> Dict[str, int]:
+        return {
+            "size": len(self.records),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _index(self, coin_name: bytes32, height: uint32) -> None:
+        if height not in self.names_by_height:
+            self.names_by_height[height] = set()
+        self.names_by_height[height].add(coin_name)
+
+    def _unindex(self, coin_name: bytes32, height: uint32) -> None:
+        names = self.names_by_height.get(height)
+        if names is None:
+            return
+        names.discard(coin_name)
+        if len(names) == 0:
+            del self.names_by_height[height]
@@ -1,11 +1,17 @@
 from typing import Dict, Optional, List
 import aiosqlite
+from src.full_node.coin_record_cache import CoinRecordCache
+from src.full_node.coin_undo_journal import CoinUndoJournal
+from src.types.block_coin_changes import BlockCoinChanges
 from src.types.full_block import FullBlock
 from src.types.blockchain_format.coin import Coin
 from src.types.coin_record import CoinRecord
 from src.types.blockchain_format.sized_bytes import bytes32
 from src.util.ints import uint32, uint64
 
+# Older versions of sqlite do not allow more than 999 parameters per statement, one of them is the spent index
+MAX_COINS_PER_UPDATE = 998
+
 
 class CoinStore:
     """
@@ -14,11 +20,17 @@ class CoinStore:
     """
 
     coin_record_db: aiosqlite.Connection
-    coin_record_cache: Dict[str, CoinRecord]
+    coin_record_cache: CoinRecordCache
     cache_size: uint32
+    undo_journal: CoinUndoJournal
 
     @classmethod
-    async def create(cls, connection: aiosqlite.Connection, cache_size: uint32 = uint32(600000)):
+    async def create(
+        cls,
+        connection: aiosqlite.Connection,
+        cache_size: uint32 = uint32(600000),
+        undo_journal_heights: uint32 = uint32(1000),
+    ):
         self = cls()
 
         self.cache_size = cache_size
@@ -26,13 +38,13 @@ class CoinStore:
         await self.coin_record_db.execute(
             (
                 "CREATE TABLE IF NOT EXISTS coin_record("
-                "coin_name text PRIMARY KEY,"
+                "coin_name blob PRIMARY KEY,"
                 " confirmed_index bigint,"
                 " spent_index bigint,"
                 " spent int,"
                 " coinbase int,"
-                " puzzle_hash text,"
-                " coin_parent text,"
+                " puzzle_hash blob,"
+                " coin_parent blob,"
                 " amount blob,"
                 " timestamp bigint)"
             )
@@ -50,106 +62,145 @@ class CoinStore:
         await self.coin_record_db.execute("CREATE INDEX IF NOT EXISTS coin_spent on coin_record(puzzle_hash)")
 
         await self.coin_record_db.commit()
-        self.coin_record_cache = dict()
+        self.coin_record_cache = CoinRecordCache(cache_size)
+        self.undo_journal = CoinUndoJournal(undo_journal_heights, await self._get_max_height() + 1)
         return self
 
-    async def new_block(self, block: FullBlock):
+    async def _get_max_height(self) -> int:
+        cursor = await self.coin_record_db.execute("SELECT MAX(confirmed_index), MAX(spent_index) from coin_record")
+        row = await cursor.fetchone()
+        await cursor.close()
+        return max([-1] + [height for height in row if height is not None])
+
+    async def reset_undo_journal(self) -> None:
+        """
+        Starts the undo journal over from the highest height in the database.
+        """
+        self.undo_journal.reset(await self._get_max_height() + 1)
+
+    async def reset_after_rollback(self) -> None:
         """
-        Only called for blocks which are blocks (and thus have rewards and transactions)
+        Must be called when a database transaction that changed the coin store is rolled back, since the cached
+        records and the undo journal do not match the database anymore.
+        """
+        self.coin_record_cache.clear()
+        await self.reset_undo_journal()
+
+    async def new_block(self, block: FullBlock, coin_changes: Optional[BlockCoinChanges] = None):
+        """
+        Only called for blocks which are blocks (and thus have rewards and transactions). The coin changes of the block
+        are computed if not given.
         """
         if block.is_transaction_block() is False:
             return
         assert block.foliage_transaction_block is not None
-        removals, additions = block.tx_removals_and_additions()
-
-        for coin in additions:
-            record: CoinRecord = CoinRecord(
-                coin,
-                block.height,
-                uint32(0),
-                False,
-                False,
-                block.foliage_transaction_block.timestamp,
-            )
-            await self._add_coin_record(record)
-
-        for coin_name in removals:
-            await self._set_spent(coin_name, block.height)
+        if coin_changes is None:
+            coin_changes = block.get_coin_changes()
+        await self.apply_coin_changes(block.height, block.foliage_transaction_block.timestamp, coin_changes)
 
-        included_reward_coins = block.get_included_reward_coins()
-        if block.height == 0:
+    async def apply_coin_changes(self, height: uint32, timestamp: uint64, coin_changes: BlockCoinChanges) -> None:
+        """
+        Applies the coin changes of the transaction block at height, with its timestamp, so blocks can be applied
+        again in a reorg from their stored coin changes and block records, without their full blocks.
+        """
+        included_reward_coins = coin_changes.reward_coins
+        if height == 0:
             assert len(included_reward_coins) == 0
         else:
             assert len(included_reward_coins) >= 2
 
-        for coin in included_reward_coins:
-            reward_coin_r: CoinRecord = CoinRecord(
-                coin,
-                block.height,
-                uint32(0),
-                False,
-                True,
-                block.foliage_transaction_block.timestamp,
-            )
-            await self._add_coin_record(reward_coin_r)
+        records: List[CoinRecord] = [
+            CoinRecord(coin, height, uint32(0), False, False, timestamp) for coin in coin_changes.additions
+        ]
+        records += [CoinRecord(coin, height, uint32(0), False, True, timestamp) for coin in included_reward_coins]
+        # Additions go first, since a coin can be created and spent in the same block
+        await self._add_coin_records(records)
+        await self._set_spent_coins(coin_changes.removals, height)
 
     # Checks DB and DiffStores for CoinRecord with coin_name and returns it
     async def get_coin_record(self, coin_name: bytes32) -> Optional[CoinRecord]:
-        if coin_name.hex() in self.coin_record_cache:
-            return self.coin_record_cache[coin_name.hex()]
-        cursor = await self.coin_record_db.execute("SELECT * from coin_record WHERE coin_name=?", (coin_name.hex(),))
+        cached: Optional[CoinRecord] = self.coin_record_cache.get(coin_name)
+        if cached is not None:
+            return cached
+        cursor = await self.coin_record_db.execute("SELECT * from coin_record WHERE coin_name=?", (coin_name,))
         row = await cursor.fetchone()
         await cursor.close()
         if row is not None:
-            coin = Coin(bytes32(bytes.fromhex(row[6])), bytes32(bytes.fromhex(row[5])), uint64.from_bytes(row[7]))
-            return CoinRecord(coin, row[1], row[2], row[3], row[4], row[8])
+            coin = Coin(bytes32(row[6]), bytes32(row[5]), uint64.from_bytes(row[7]))
+            record = CoinRecord(coin, row[1], row[2], row[3], row[4], row[8])
+            self.coin_record_cache.put(coin_name, record)
+            return record
         return None
 
+    def get_cache_metrics(self) -> Dict[str, int]:
+        return self.coin_record_cache.get_metrics()
+
     # Checks DB and DiffStores for CoinRecords with puzzle_hash and returns them
     async def get_coin_records_by_puzzle_hash(self, puzzle_hash: bytes32) -> List[CoinRecord]:
         coins = set()
-        cursor = await self.coin_record_db.execute(
-            "SELECT * from coin_record WHERE puzzle_hash=?", (puzzle_hash.hex(),)
-        )
+        cursor = await self.coin_record_db.execute("SELECT * from coin_record WHERE puzzle_hash=?", (puzzle_hash,))
         rows = await cursor.fetchall()
 
         await cursor.close()
         for row in rows:
-            coin = Coin(bytes32(bytes.fromhex(row[6])), bytes32(bytes.fromhex(row[5])), uint64.from_bytes(row[7]))
+            coin = Coin(bytes32(row[6]), bytes32(row[5]), uint64.from_bytes(row[7]))
             coins.add(CoinRecord(coin, row[1], row[2], row[3], row[4], row[8]))
         return list(coins)
 
+    async def get_coins_added_at_height(self, height: uint32) -> List[CoinRecord]:
+        return await self._get_coin_records_where("confirmed_index=?", height)
+
+    async def get_coins_removed_at_height(self, height: uint32) -> List[CoinRecord]:
+        # Unspent coins have spent_index 0, and nothing is spent at height 0
+        if height == 0:
+            return []
+        return await self._get_coin_records_where("spent_index=?", height)
+
+    async def _get_coin_records_where(self, condition: str, height: uint32) -> List[CoinRecord]:
+        cursor = await self.coin_record_db.execute(f"SELECT * from coin_record WHERE {condition}", (height,))
+        rows = await cursor.fetchall()
+        await cursor.close()
+        coins = []
+        for row in rows:
+            coin = Coin(bytes32(row[6]), bytes32(row[5]), uint64.from_bytes(row[7]))
+            coins.append(CoinRecord(coin, row[1], row[2], row[3], row[4], row[8]))
+        return coins
+
     async def rollback_to_block(self, block_index: int):
         """
         Note that block_index can be negative, in which case everything is rolled back
         """
         # Update memory cache
-        delete_queue: bytes32 = []
-        for coin_name, coin_record in self.coin_record_cache.items():
-            if int(coin_record.spent_block_index) > block_index:
-                new_record = CoinRecord(
-                    coin_record.coin,
-                    coin_record.confirmed_block_index,
-                    coin_record.spent_block_index,
-                    False,
-                    coin_record.coinbase,
-                    coin_record.timestamp,
+        self.coin_record_cache.rollback(block_index)
+
+        if self.undo_journal.covers(block_index):
+            # Only the rows of the coins created or spent since block_index
+            created, spent = self.undo_journal.changes_after(block_index)
+            for start in range(0, len(created), MAX_COINS_PER_UPDATE):
+                names_db = tuple(created[start : start + MAX_COINS_PER_UPDATE])
+                c1 = await self.coin_record_db.execute(
+                    f'DELETE FROM coin_record WHERE confirmed_index>? and coin_name in ({"?," * (len(names_db) - 1)}?)',
+                    (block_index,) + names_db,
                 )
-                self.coin_record_cache[coin_record.coin.name().hex()] = new_record
-            if int(coin_record.confirmed_block_index) > block_index:
-                delete_queue.append(coin_name)
-
-        for coin_name in delete_queue:
-            del self.coin_record_cache[coin_name]
-
-        # Delete from storage
-        c1 = await self.coin_record_db.execute("DELETE FROM coin_record WHERE confirmed_index>?", (block_index,))
-        await c1.close()
-        c2 = await self.coin_record_db.execute(
-            "UPDATE coin_record SET spent_index = 0, spent = 0 WHERE spent_index>?",
-            (block_index,),
-        )
-        await c2.close()
+                await c1.close()
+            for start in range(0, len(spent), MAX_COINS_PER_UPDATE):
+                names_db = tuple(spent[start : start + MAX_COINS_PER_UPDATE])
+                c2 = await self.coin_record_db.execute(
+                    "UPDATE coin_record SET spent_index = 0, spent = 0 WHERE spent_index>? and coin_name in "
+                    f'({"?," * (len(names_db) - 1)}?)',
+                    (block_index,) + names_db,
+                )
+                await c2.close()
+        else:
+            # Delete from storage
+            c1 = await self.coin_record_db.execute("DELETE FROM coin_record WHERE confirmed_index>?", (block_index,))
+            await c1.close()
+            c2 = await self.coin_record_db.execute(
+                "UPDATE coin_record SET spent_index = 0, spent = 0 WHERE spent_index>?",
+                (block_index,),
+            )
+            await c2.close()
+        self.undo_journal.rollback(block_index)
 
     async def get_unspent_coin_records(self) -> List[CoinRecord]:
         coins = set()
@@ -157,44 +208,91 @@ class CoinStore:
         rows = await cursor.fetchall()
         await cursor.close()
         for row in rows:
-            coin = Coin(bytes32(bytes.fromhex(row[6])), bytes32(bytes.fromhex(row[5])), uint64.from_bytes(row[7]))
+            coin = Coin(bytes32(row[6]), bytes32(row[5]), uint64.from_bytes(row[7]))
             coins.add(CoinRecord(coin, row[1], row[2], row[3], row[4], row[8]))
         return list(coins)
 
+    async def get_unspent_coin_records_at_height(self, height: uint32, start: int, stop: int) -> List[CoinRecord]:
+        """
+        Returns the coins confirmed between the heights start and stop (inclusive) that were unspent at height, as
+        they were at that height.
+        """
+        cursor = await self.coin_record_db.execute(
+            "SELECT * from coin_record WHERE confirmed_index>=? and confirmed_index<=? and (spent=0 or spent_index>?)",
+            (start, stop, height),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+        coins = []
+        for row in rows:
+            coin = Coin(bytes32(row[6]), bytes32(row[5]), uint64.from_bytes(row[7]))
+            coins.append(CoinRecord(coin, row[1], uint32(0), False, row[4], row[8]))
+        return coins
+
+    async def add_coin_records(self, records: List[CoinRecord]) -> None:
+        """
+        Stores coin records in bulk without caching or journaling them, for loading a snapshot of the coin set.
+        """
+        await self._add_coin_records(records, update_cache=False)
+        await self.reset_undo_journal()
+
     # Store CoinRecord in DB and ram cache
     async def _add_coin_record(self, record: CoinRecord) -> None:
-        cursor = await self.coin_record_db.execute(
+        await self._add_coin_records([record])
+
+    # Store CoinRecords in DB and ram cache, with a single statement
+    async def _add_coin_records(self, records: List[CoinRecord], update_cache: bool = True) -> None:
+        if len(records) == 0:
+            return
+        cursor = await self.coin_record_db.executemany(
             "INSERT OR REPLACE INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                record.coin.name().hex(),
-                record.confirmed_block_index,
-                record.spent_block_index,
-                int(record.spent),
-                int(record.coinbase),
-                str(record.coin.puzzle_hash.hex()),
-                str(record.coin.parent_coin_info.hex()),
-                bytes(record.coin.amount),
-                record.timestamp,
-            ),
+            [
+                (
+                    record.coin.name(),
+                    record.confirmed_block_index,
+                    record.spent_block_index,
+                    int(record.spent),
+                    int(record.coinbase),
+                    record.coin.puzzle_hash,
+                    record.coin.parent_coin_info,
+                    bytes(record.coin.amount),
+                    record.timestamp,
+                )
+                for record in records
+            ],
         )
         await cursor.close()
-        self.coin_record_cache[record.coin.name().hex()] = record
-        if len(self.coin_record_cache) > self.cache_size:
-            while len(self.coin_record_cache) > self.cache_size:
-                first_in = list(self.coin_record_cache.keys())[0]
-                del self.coin_record_cache[first_in]
+        if update_cache:
+            names_by_height: Dict[uint32, List[bytes32]] = {}
+            for record in records:
+                self.coin_record_cache.put(record.coin.name(), record)
+                names_by_height.setdefault(record.confirmed_block_index, []).append(record.coin.name())
+            for height, names in names_by_height.items():
+                self.undo_journal.add_created(height, names)
 
     # Update coin_record to be spent in DB
     async def _set_spent(self, coin_name: bytes32, index: uint32):
-        current: Optional[CoinRecord] = await self.get_coin_record(coin_name)
-        if current is None:
-            return
-        spent: CoinRecord = CoinRecord(
-            current.coin,
-            current.confirmed_block_index,
-            index,
-            True,
-            current.coinbase,
-            current.timestamp,
-        )  # type: ignore # noqa
-        await self._add_coin_record(spent)
+        await self._set_spent_coins([coin_name], index)
+
+    # Update coin_records to be spent in DB, with one statement per MAX_COINS_PER_UPDATE coins
+    async def _set_spent_coins(self, coin_names: List[bytes32], index: uint32):
+        for start in range(0, len(coin_names), MAX_COINS_PER_UPDATE):
+            names_db = tuple(coin_names[start : start + MAX_COINS_PER_UPDATE])
+            cursor = await self.coin_record_db.execute(
+                f'UPDATE coin_record SET spent_index=?, spent=1 WHERE coin_name in ({"?," * (len(names_db) - 1)}?)',
+                (index,) + names_db,
+            )
+            await cursor.close()
+        self.undo_journal.add_spent(index, coin_names)
+        for coin_name in coin_names:
+            current: Optional[CoinRecord] = self.coin_record_cache.peek(coin_name)
+            if current is not None:
+                spent = CoinRecord(
+                    current.coin,
+                    current.confirmed_block_index,
+                    index,
+                    True,
+                    current.coinbase,
+                    current.timestamp,
+                )
+                self.coin_record_cache.put(coin_name, spent)
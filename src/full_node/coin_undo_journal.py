@@ -0,0 +1,73 @@
+from typing import Dict, List, Set, Tuple
+
+from src.types.blockchain_format.sized_bytes import bytes32
+
+
+class CoinUndoJournal:
+    """
+    The names of the coins created and spent at each of the last max_heights heights of the coin store, so a rollback
+    to one of these heights only touches the rows of these coins. Every change at a height of at least start is in the
+    journal: start is above the heights in the database when the journal is created, and the older heights are
+    dropped as new ones are added.
+    """
+
+    def __init__(self, max_heights: int, start: int):
+        self.max_heights = max_heights
+        self.start = start
+        self.created: Dict[int, Set[bytes32]] = {}
+        self.spent: Dict[int, Set[bytes32]] = {}
+
+    def add_created(self, height: int, coin_names: List[bytes32]) -> None:
+        if len(coin_names) == 0:
+            return
+        self.created.setdefault(height, set()).update(coin_names)
+        self._prune(height)
+
+    def add_spent(self, height: int, coin_names: List[bytes32]) -> None:
+        if len(coin_names) == 0:
+            return
+        self.spent.setdefault(height, set()).update(coin_names)
+        self._prune(height)
+
+    def covers(self, block_index: int) -> bool:
+        """
+        True if the journal has all the changes above block_index.
+        """
+        return block_index + 1 >= self.start
+
+    def changes_after(self, block_index: int) -> Tuple[List[bytes32], List[bytes32]]:
+        """
+        Returns the names of the coins created and spent above block_index.
+        """
+        created: List[bytes32] = []
+        spent: List[bytes32] = []
+        for height, names in self.created.items():
+            if height > block_index:
+                created.extend(names)
+        for height, names in self.spent.items():
+            if height > block_index:
+                spent.extend(names)
+        return created, spent
+
+    def rollback(self, block_index: int) -> None:
+        """
+        Called once the changes above block_index were undone, so there are none left above it.
+        """
+        for heights in (self.created, self.spent):
+            for height in [height for height in heights.keys() if height > block_index]:
+                heights.pop(height)
+        self.start = min(self.start, max(block_index + 1, 0))
+
+    def reset(self, start: int) -> None:
+        self.start = start
+        self.created.clear()
+        self.spent.clear()
+
+    def _prune(self, height: int) -> None:
+        oldest = height - self.max_heights + 1
+        if oldest <= self.start:
+            return
+        self.start = oldest
+        for heights in (self.created, self.spent):
+            for old_height in [old_height for old_height in heights.keys() if old_height < oldest]:
+                heights.pop(old_height)
@@ -26,8 +26,14 @@ from src.full_node.block_store import BlockStore
 from src.full_node.coin_store import CoinStore
 from src.full_node.full_node_store import FullNodeStore
 from src.full_node.mempool_manager import MempoolManager
+from src.full_node.spend_bundle_pre_validation import (
+    DEFAULT_PRE_VALIDATION_BATCH_SIZE,
+    DEFAULT_PRE_VALIDATION_QUEUE_SIZE,
+    DEFAULT_PRE_VALIDATION_WORKERS,
+)
 from src.full_node.signage_point import SignagePoint
-from src.full_node.sync_store import SyncStore
+from src.full_node.sync_pipeline import MAX_SYNC_BATCHES_IN_FLIGHT, SyncPipeline
+from src.full_node.sync_store import MAX_SYNC_REQUESTS_PER_PEER, SyncStore
 from src.full_node.weight_proof import WeightProofHandler
 from src.protocols import (
     full_node_protocol,
@@ -112,7 +118,14 @@ class FullNode:
         self.log.info("Initializing blockchain from disk")
         start_time = time.time()
         self.blockchain = await Blockchain.create(self.coin_store, self.block_store, self.constants)
-        self.mempool_manager = MempoolManager(self.coin_store, self.constants)
+        self.mempool_manager = MempoolManager(
+            self.coin_store,
+            self.constants,
+            self.config.get("tx_pre_validation_workers", DEFAULT_PRE_VALIDATION_WORKERS),
+            self.config.get("tx_pre_validation_batch_size", DEFAULT_PRE_VALIDATION_BATCH_SIZE),
+            self.config.get("tx_pre_validation_queue_size", DEFAULT_PRE_VALIDATION_QUEUE_SIZE),
+            signature_verifier=self.blockchain.signature_verifier,
+        )
         self.weight_proof_handler = WeightProofHandler(self.constants, self.blockchain)
         self._sync_task = None
         time_taken = time.time() - start_time
@@ -197,23 +210,32 @@ class FullNode:
 
         batch_size = self.constants.MAX_BLOCK_COUNT_PER_REQUESTS
 
+        async def fetch_batch(height: uint32, end_height: uint32) -> Tuple[ws.WSChiaConnection, List[FullBlock]]:
+            response = await peer.request_blocks(RequestBlocks(height, end_height, True))
+            if not response or not isinstance(response, RespondBlocks):
+                raise ValueError(f"Error short batch syncing, invalid/no response for {height}-{end_height}")
+            return peer, response.blocks
+
+        async def add_batch(
+            _: ws.WSChiaConnection, blocks: List[FullBlock], results: Optional[List[PreValidationResult]]
+        ) -> bool:
+            start, end = blocks[0].height, blocks[-1].height
+            if results is None:
+                raise ValueError(f"Error short batch syncing, failed to validate blocks {start}-{end}")
+            async with self.blockchain.lock:
+                success, advanced_peak, fork_height = await self.add_pre_validated_batch(blocks, results, peer, None)
+                if not success:
+                    raise ValueError(f"Error short batch syncing, failed to validate blocks {start}-{end}")
+                if advanced_peak:
+                    peak = self.blockchain.get_peak()
+                    peak_fb: Optional[FullBlock] = await self.blockchain.get_full_peak()
+                    assert peak is not None and peak_fb is not None and fork_height is not None
+                    await self.peak_post_processing(peak_fb, peak, fork_height, peer)
+                    self.log.info(f"Added blocks {start}-{end}")
+            return True
+
         try:
-            for height in range(start_height, target_height, batch_size):
-                end_height = min(target_height, height + batch_size)
-                request = RequestBlocks(uint32(height), uint32(end_height), True)
-                response = await peer.request_blocks(request)
-                if not response:
-                    raise ValueError(f"Error short batch syncing, invalid/no response for {height}-{end_height}")
-                async with self.blockchain.lock:
-                    success, advanced_peak, fork_height = await self.receive_block_batch(response.blocks, peer, None)
-                    if not success:
-                        raise ValueError(f"Error short batch syncing, failed to validate blocks {height}-{end_height}")
-                    if advanced_peak:
-                        peak = self.blockchain.get_peak()
-                        peak_fb: Optional[FullBlock] = await self.blockchain.get_full_peak()
-                        assert peak is not None and peak_fb is not None and fork_height is not None
-                        await self.peak_post_processing(peak_fb, peak, fork_height, peer)
-                        self.log.info(f"Added blocks {height}-{end_height}")
+            await SyncPipeline(self.blockchain, fetch_batch, add_batch).run(start_height, target_height, batch_size)
         except Exception:
             self.sync_store.batch_syncing.remove(peer.peer_node_id)
             raise
@@ -589,35 +611,63 @@ class FullNode:
             raise RuntimeError(f"Not syncing, no peers with header_hash {peak_hash} ")
         advanced_peak = False
         batch_size = self.constants.MAX_BLOCK_COUNT_PER_REQUESTS
-        for i in range(fork_point_height, target_peak_sb_height, batch_size):
-            start_height = i
-            end_height = min(target_peak_sb_height, start_height + batch_size)
-            request = RequestBlocks(uint32(start_height), uint32(end_height), True)
+
+        async def fetch_batch(
+            start_height: uint32, end_height: uint32
+        ) -> Optional[Tuple[ws.WSChiaConnection, List[FullBlock]]]:
+            nonlocal peers_with_peak
+            if self.sync_store.peers_changed.is_set():
+                peer_ids = self.sync_store.get_peers_that_have_peak([peak_hash])
+                peers_with_peak = [c for c in self.server.all_connections.values() if c.peer_node_id in peer_ids]
+                self.log.info(f"Number of peers we are syncing from: {len(peers_with_peak)}")
+                self.sync_store.peers_changed.clear()
+
+            request = RequestBlocks(start_height, end_height, True)
             self.log.info(f"Requesting blocks: {start_height} to {end_height}")
-            batch_added = False
-            to_remove = []
-            for peer in peers_with_peak:
-                if peer.closed:
-                    to_remove.append(peer)
-                    continue
-                response = await peer.request_blocks(request)
+            tried: Set[bytes32] = set()
+            while True:
+                peers_with_peak = [peer for peer in peers_with_peak if not peer.closed]
+                peers_by_id = {peer.peer_node_id: peer for peer in peers_with_peak if peer.peer_node_id not in tried}
+                peer_id: Optional[bytes32] = self.sync_store.choose_sync_peer(list(peers_by_id.keys()))
+                if peer_id is None:
+                    break
+                tried.add(peer_id)
+                peer = peers_by_id[peer_id]
+                request_start = self.sync_store.sync_request_started(peer_id, peer.bytes_read)
+                try:
+                    response = await peer.request_blocks(request)
+                except asyncio.CancelledError:
+                    # The sync pipeline stopped, so the request is not in flight anymore
+                    self.sync_store.sync_request_failed(peer_id)
+                    raise
                 if response is None:
+                    self.sync_store.sync_request_failed(peer_id)
                     await peer.close()
-                    to_remove.append(peer)
                     continue
+                if isinstance(response, RespondBlocks):
+                    self.sync_store.sync_request_done(peer_id, request_start, peer.bytes_read)
+                    return peer, response.blocks
                 if isinstance(response, RejectBlocks):
-                    to_remove.append(peer)
-                    continue
-                elif isinstance(response, RespondBlocks):
-                    success, advanced_peak, _ = await self.receive_block_batch(
-                        response.blocks, peer, None if advanced_peak else uint32(fork_point_height)
-                    )
-                    if success is False:
-                        await peer.close()
-                        continue
-                    else:
-                        batch_added = True
-                        break
+                    self.log.info(f"Peer {peer.get_peer_info()} rejected blocks {start_height} to {end_height}")
+                # The batch is requested from another peer
+                self.sync_store.sync_request_failed(peer_id)
+            self.log.info(f"Failed to fetch blocks {start_height} to {end_height} from peers: {peers_with_peak}")
+            return None
+
+        async def add_batch(
+            peer: ws.WSChiaConnection, blocks: List[FullBlock], results: Optional[List[PreValidationResult]]
+        ) -> bool:
+            nonlocal advanced_peak
+            success = False
+            if results is not None:
+                success, batch_advanced_peak, _ = await self.add_pre_validated_batch(
+                    blocks, results, peer, None if advanced_peak else uint32(fork_point_height)
+                )
+                advanced_peak = advanced_peak or batch_advanced_peak
+            if not success:
+                # The batch is fetched again from another peer
+                await peer.close()
+                return False
 
             peak = self.blockchain.get_peak()
             assert peak is not None
@@ -631,40 +681,46 @@ class FullNode:
                 ),
             )
             await self.server.send_to_all([msg], NodeType.WALLET)
-
-            for peer in to_remove:
-                peers_with_peak.remove(peer)
-
-            if self.sync_store.peers_changed.is_set():
-                peer_ids = self.sync_store.get_peers_that_have_peak([peak_hash])
-                peers_with_peak = [c for c in self.server.all_connections.values() if c.peer_node_id in peer_ids]
-                self.log.info(f"Number of peers we are syncing from: {len(peers_with_peak)}")
-                self.sync_store.peers_changed.clear()
-
-            if batch_added is False:
-                self.log.info(f"Failed to fetch blocks {start_height} to {end_height} from peers: {peers_with_peak}")
-                break
-            else:
-                self.log.info(f"Added blocks {start_height} to {end_height}")
-                self.blockchain.clean_block_record(
-                    min(
-                        end_height - self.constants.BLOCKS_CACHE_SIZE,
-                        peak.height - self.constants.BLOCKS_CACHE_SIZE,
-                    )
+            self.log.info(f"Added blocks {blocks[0].height} to {blocks[-1].height}")
+            self.blockchain.clean_block_record(
+                min(
+                    blocks[-1].height - self.constants.BLOCKS_CACHE_SIZE,
+                    peak.height - self.constants.BLOCKS_CACHE_SIZE,
                 )
+            )
+            return True
+
+        # Several batches are requested from each peer at once, so the sync is as fast as all the peers together
+        fetch_concurrency = min(len(peers_with_peak) * MAX_SYNC_REQUESTS_PER_PEER, MAX_SYNC_BATCHES_IN_FLIGHT)
+        pipeline = SyncPipeline(self.blockchain, fetch_batch, add_batch, fetch_concurrency=fetch_concurrency)
+        await pipeline.run(fork_point_height, target_peak_sb_height, batch_size)
+        self.log.info(f"Sync pipeline from {fork_point_height} to {target_peak_sb_height}: {pipeline.stats}")
+        for peer_id, peer_stats in self.sync_store.get_peer_sync_stats().items():
+            self.log.info(f"Sync speed of peer {peer_id}: {peer_stats}")
 
     async def receive_block_batch(
         self, blocks: List[FullBlock], peer: ws.WSChiaConnection, fork_point: Optional[uint32]
     ) -> Tuple[bool, bool, Optional[uint32]]:
-        advanced_peak = False
-        fork_height: Optional[uint32] = uint32(0)
         pre_validate_start = time.time()
+        # The signatures of synced blocks are not in the cache of the mempool, so they are verified in the pool too
         pre_validation_results: Optional[
             List[PreValidationResult]
-        ] = await self.blockchain.pre_validate_blocks_multiprocessing(blocks)
+        ] = await self.blockchain.pre_validate_blocks_multiprocessing(blocks, validate_signatures=True)
         self.log.debug(f"Block pre-validation time: {time.time() - pre_validate_start}")
         if pre_validation_results is None:
             return False, False, None
+        return await self.add_pre_validated_batch(blocks, pre_validation_results, peer, fork_point)
+
+    async def add_pre_validated_batch(
+        self,
+        blocks: List[FullBlock],
+        pre_validation_results: List[PreValidationResult],
+        peer: ws.WSChiaConnection,
+        fork_point: Optional[uint32],
+    ) -> Tuple[bool, bool, Optional[uint32]]:
+        advanced_peak = False
+        fork_height: Optional[uint32] = uint32(0)
+        add_start = time.time()
         for i, block in enumerate(blocks):
             if pre_validation_results[i].error is not None:
                 self.log.error(
@@ -686,9 +742,7 @@ class FullNode:
             if block_record.sub_epoch_summary_included is not None:
                 await self.weight_proof_handler.create_prev_sub_epoch_segments()
         self._state_changed("new_peak")
-        self.log.debug(
-            f"Total time for {len(blocks)} blocks: {time.time() - pre_validate_start}, advanced: {advanced_peak}"
-        )
+        self.log.debug(f"Total time for {len(blocks)} blocks: {time.time() - add_start}, advanced: {advanced_peak}")
         return True, advanced_peak, fork_height
 
     async def _finish_sync(self):
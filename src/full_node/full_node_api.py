@@ -34,6 +34,7 @@ from src.types.blockchain_format.coin import Coin, hash_coin_list
 
 from src.types.end_of_slot_bundle import EndOfSubSlotBundle
 from src.types.full_block import FullBlock
+from src.types.full_block_view import FullBlockView
 from src.types.header_block import HeaderBlock
 
 from src.types.mempool_inclusion_status import MempoolInclusionStatus
@@ -179,7 +180,7 @@ class FullNodeAPI:
         self.full_node.mempool_manager.add_and_maybe_pop_seen(spend_name)
 
         # Do the expensive pre-validation outside the lock
-        cost_result = await self.full_node.mempool_manager.pre_validate_spendbundle(tx.transaction)
+        cost_result = await self.full_node.mempool_manager.pre_validate_spendbundle(tx.transaction, spend_name)
 
         async with self.full_node.blockchain.lock:
             # Check for unnecessary addition
@@ -938,9 +939,8 @@ class FullNodeAPI:
         if header_hash is None:
             msg = make_msg(ProtocolMessageTypes.reject_header_request, RejectHeaderRequest(request.height))
             return msg
-        block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash)
-        if block is not None:
-            header_block: HeaderBlock = block.get_block_header()
+        header_block: Optional[HeaderBlock] = await self.full_node.block_store.get_header_block(header_hash)
+        if header_block is not None:
             msg = make_msg(
                 ProtocolMessageTypes.respond_block_header,
                 wallet_protocol.RespondBlockHeader(header_block),
@@ -950,10 +950,13 @@ class FullNodeAPI:
 
     @api_request
     async def request_additions(self, request: wallet_protocol.RequestAdditions) -> Optional[Message]:
-        block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(request.header_hash)
+        block: Optional[FullBlockView] = await self.full_node.block_store.get_full_block_view(request.header_hash)
+        peak_height: Optional[uint32] = self.full_node.blockchain.get_peak_height()
         if (
             block is None
             or block.is_transaction_block() is False
+            or peak_height is None
+            or block.height > peak_height
             or self.full_node.blockchain.height_to_hash(block.height) is None
         ):
             reject = wallet_protocol.RejectAdditionsRequest(request.height, request.header_hash)
@@ -962,9 +965,9 @@ class FullNodeAPI:
             return msg
 
         assert block is not None and block.foliage_transaction_block is not None
-        _, additions = block.tx_removals_and_additions()
+        coin_changes = await self.full_node.block_store.get_coin_changes(block)
         puzzlehash_coins_map: Dict[bytes32, List[Coin]] = {}
-        for coin in additions + list(block.get_included_reward_coins()):
+        for coin in coin_changes.additions + coin_changes.reward_coins:
             if coin.puzzle_hash in puzzlehash_coins_map:
                 puzzlehash_coins_map[coin.puzzle_hash].append(coin)
             else:
@@ -1005,12 +1008,14 @@ class FullNodeAPI:
 
     @api_request
     async def request_removals(self, request: wallet_protocol.RequestRemovals) -> Optional[Message]:
-        block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(request.header_hash)
+        block: Optional[FullBlockView] = await self.full_node.block_store.get_full_block_view(request.header_hash)
+        peak_height: Optional[uint32] = self.full_node.blockchain.get_peak_height()
         if (
             block is None
             or block.is_transaction_block() is False
             or block.height != request.height
-            or block.height > self.full_node.blockchain.get_peak_height()
+            or peak_height is None
+            or block.height > peak_height
             or self.full_node.blockchain.height_to_hash(block.height) != block.header_hash
         ):
             reject = wallet_protocol.RejectRemovalsRequest(request.height, request.header_hash)
@@ -1018,7 +1023,7 @@ class FullNodeAPI:
             return msg
 
         assert block is not None and block.foliage_transaction_block is not None
-        all_removals, _ = block.tx_removals_and_additions()
+        all_removals = (await self.full_node.block_store.get_coin_changes(block)).removals
 
         coins_map: List[Tuple[bytes32, Optional[Coin]]] = []
         proofs_map: List[Tuple[bytes32, bytes]] = []
@@ -1079,7 +1084,7 @@ class FullNodeAPI:
             status = MempoolInclusionStatus.FAILED
             error: Optional[Err] = Err.NO_TRANSACTIONS_WHILE_SYNCING
         else:
-            cost_result = await self.full_node.mempool_manager.pre_validate_spendbundle(request.transaction)
+            cost_result = await self.full_node.mempool_manager.pre_validate_spendbundle(request.transaction, spend_name)
 
             async with self.full_node.blockchain.lock:
                 cost, status, error = await self.full_node.mempool_manager.add_spendbundle(
@@ -1130,7 +1135,7 @@ class FullNodeAPI:
             return reject_msg
 
         header_hash = self.full_node.blockchain.height_to_hash(height)
-        block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash)
+        block: Optional[FullBlockView] = await self.full_node.block_store.get_full_block_view(header_hash)
 
         if block is None or block.transactions_generator is None:
             return reject_msg
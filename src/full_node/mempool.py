@@ -13,6 +13,7 @@ class Mempool:
     additions: Dict[bytes32, MempoolItem]
     removals: Dict[bytes32, MempoolItem]
     size: int
+    version: int  # Changes whenever an item is added or removed
 
     # if new min fee is added
     @staticmethod
@@ -23,6 +24,7 @@ class Mempool:
         self.removals = {}
         self.sorted_spends = SortedDict()
         self.size = size
+        self.version = 0
         return self
 
     def get_min_fee_rate(self) -> float:
@@ -32,18 +34,37 @@ class Mempool:
         else:
             return 0
 
-    def remove_spend(self, item: MempoolItem):
-        removals: List[Coin] = item.spend_bundle.removals()
-        additions: List[Coin] = item.spend_bundle.additions()
-        for rem in removals:
-            del self.removals[rem.name()]
-        for add in additions:
-            del self.additions[add.name()]
-        del self.spends[item.name]
-        del self.sorted_spends[item.fee_per_cost][item.name]
-        dic = self.sorted_spends[item.fee_per_cost]
-        if len(dic.values()) == 0:
-            del self.sorted_spends[item.fee_per_cost]
+    def remove_spend(self, item: MempoolItem, remove_dependents: bool = True):
+        """
+        Removes an item, and unless remove_dependents is False (when the item was included in a block, so the coins
+        it creates exist), the items that spend the coins it creates.
+        """
+        to_remove: List[MempoolItem] = [item]
+        while len(to_remove) > 0:
+            item = to_remove.pop()
+            if item.name not in self.spends:
+                # Spends several coins of an item that was removed
+                continue
+            removals: List[Coin] = item.removals
+            additions: List[Coin] = item.additions
+            for rem in removals:
+                del self.removals[rem.name()]
+            for add in additions:
+                del self.additions[add.name()]
+            del self.spends[item.name]
+            del self.sorted_spends[item.fee_per_cost][item.name]
+            dic = self.sorted_spends[item.fee_per_cost]
+            if len(dic.values()) == 0:
+                del self.sorted_spends[item.fee_per_cost]
+            self.version += 1
+            if not remove_dependents:
+                return
+
+            # Items that spend coins created by this one cannot be included in a block anymore
+            for add in additions:
+                child = self.removals.get(add.name())
+                if child is not None:
+                    to_remove.append(child)
 
     def add_to_pool(
         self,
@@ -70,6 +91,7 @@ class Mempool:
             self.additions[add.name()] = item
         for key in removals_dic.keys():
             self.removals[key] = item
+        self.version += 1
 
     def at_full_capacity(self) -> bool:
         return len(self.spends.keys()) >= self.size
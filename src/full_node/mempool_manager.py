@@ -1,54 +1,56 @@
-import asyncio
 import collections
 import dataclasses
 import time
-from concurrent.futures.process import ProcessPoolExecutor
 from typing import Dict, Optional, Tuple, List, Set
 import logging
 
 from chiabip158 import PyBIP158
-from blspy import G1Element, AugSchemeMPL, G2Element
+from blspy import G1Element
 
 from src.consensus.constants import ConsensusConstants
 from src.consensus.block_record import BlockRecord
+from src.consensus.signature_verification import SignatureVerifier
 from src.types.condition_opcodes import ConditionOpcode
 from src.types.condition_var_pair import ConditionVarPair
-from src.full_node.bundle_tools import best_solution_program
+from src.full_node.block_template import MAX_MEMPOOL_ANCESTORS, count_ancestors, select_mempool_items
 from src.types.blockchain_format.coin import Coin
 from src.types.full_block import additions_for_npc
 from src.types.spend_bundle import SpendBundle
 from src.types.coin_record import CoinRecord
 from src.types.mempool_item import MempoolItem
 from src.full_node.mempool import Mempool
+from src.full_node.spend_bundle_pre_validation import (
+    DEFAULT_PRE_VALIDATION_BATCH_SIZE,
+    DEFAULT_PRE_VALIDATION_QUEUE_SIZE,
+    DEFAULT_PRE_VALIDATION_WORKERS,
+    SpendBundlePreValidator,
+)
 from src.types.blockchain_format.sized_bytes import bytes32
 from src.full_node.coin_store import CoinStore
 from src.util.errors import Err
 from src.util.clvm import int_from_bytes
-from src.consensus.cost_calculator import calculate_cost_of_program, CostResult
+from src.consensus.cost_calculator import CostResult
 from src.full_node.mempool_check_conditions import mempool_check_conditions_dict
 from src.util.condition_tools import pkm_pairs_for_conditions_dict
 from src.util.ints import uint64, uint32
 from src.types.mempool_inclusion_status import MempoolInclusionStatus
 from sortedcontainers import SortedDict
 
-from src.util.streamable import recurse_jsonify, dataclass_from_dict
+from src.util.streamable import recurse_jsonify
 
 log = logging.getLogger(__name__)
 
 
-def validate_transaction_multiprocess(
-    constants_dict: Dict,
-    spend_bundle_bytes: bytes,
-) -> bytes:
-    constants: ConsensusConstants = dataclass_from_dict(ConsensusConstants, constants_dict)
-    # Calculate the cost and fees
-    program = best_solution_program(SpendBundle.from_bytes(spend_bundle_bytes))
-    # npc contains names of the coins removed, puzzle_hashes and their spend conditions
-    return bytes(calculate_cost_of_program(program, constants.CLVM_COST_RATIO_CONSTANT, True))
-
-
 class MempoolManager:
-    def __init__(self, coin_store: CoinStore, consensus_constants: ConsensusConstants):
+    def __init__(
+        self,
+        coin_store: CoinStore,
+        consensus_constants: ConsensusConstants,
+        pre_validation_workers: int = DEFAULT_PRE_VALIDATION_WORKERS,
+        pre_validation_batch_size: int = DEFAULT_PRE_VALIDATION_BATCH_SIZE,
+        pre_validation_queue_size: int = DEFAULT_PRE_VALIDATION_QUEUE_SIZE,
+        signature_verifier: Optional[SignatureVerifier] = None,
+    ):
         self.constants: ConsensusConstants = consensus_constants
         self.constants_json = recurse_jsonify(dataclasses.asdict(self.constants))
 
@@ -69,21 +71,32 @@ class MempoolManager:
         self.mempool_size = int(tx_per_sec * sec_per_block * block_buffer_count)
         self.potential_cache_size = 300
         self.seen_cache_size = 10000
-        self.pool = ProcessPoolExecutor(max_workers=1)
+        self.pre_validator = SpendBundlePreValidator(
+            self.constants_json, pre_validation_workers, pre_validation_batch_size, pre_validation_queue_size
+        )
+        # Shared with the blockchain, so the signatures verified here are not verified again in blocks
+        self.owns_signature_verifier = signature_verifier is None
+        self.signature_verifier: SignatureVerifier = (
+            SignatureVerifier() if signature_verifier is None else signature_verifier
+        )
 
         # The mempool will correspond to a certain peak
         self.peak: Optional[BlockRecord] = None
         self.mempool: Mempool = Mempool.create(self.mempool_size)
+        # The last result of create_bundle_from_mempool, with the peak and mempool version it was built for
+        self.block_template: Optional[Tuple[bytes32, int, Optional[Tuple[SpendBundle, List[Coin], List[Coin]]]]] = None
 
     def shut_down(self):
-        self.pool.shutdown(wait=True)
+        self.pre_validator.shut_down()
+        if self.owns_signature_verifier:
+            self.signature_verifier.shut_down()
 
     async def create_bundle_from_mempool(
         self, peak_header_hash: bytes32
     ) -> Optional[Tuple[SpendBundle, List[Coin], List[Coin]]]:
         """
         Returns aggregated spendbundle that can be used for creating new block,
-        additions and removals in that spend_bundle
+        additions and removals in that spend_bundle. It is cached until the peak or the mempool change.
         """
         if (
             self.peak is None
@@ -92,28 +105,22 @@ class MempoolManager:
         ):
             return None
 
-        cost_sum = 0  # Checks that total cost does not exceed block maximum
-        fee_sum = 0  # Checks that total fees don't exceed 64 bits
-        spend_bundles: List[SpendBundle] = []
-        removals = []
-        additions = []
-        for dic in self.mempool.sorted_spends.values():
-            for item in dic.values():
-                if (
-                    item.cost_result.cost + cost_sum <= self.constants.MAX_BLOCK_COST_CLVM
-                    and item.fee + fee_sum <= self.constants.MAX_COIN_AMOUNT
-                ):
-                    spend_bundles.append(item.spend_bundle)
-                    cost_sum += item.cost_result.cost
-                    fee_sum += item.fee
-                    removals.extend(item.removals)
-                    additions.extend(item.additions)
-                else:
-                    break
-        if len(spend_bundles) > 0:
-            return SpendBundle.aggregate(spend_bundles), additions, removals
+        if self.block_template is not None:
+            template_peak_hash, template_version, template = self.block_template
+            if template_peak_hash == peak_header_hash and template_version == self.mempool.version:
+                return template
+
+        items: List[MempoolItem] = select_mempool_items(
+            self.mempool, self.constants.MAX_BLOCK_COST_CLVM, self.constants.MAX_COIN_AMOUNT
+        )
+        if len(items) > 0:
+            removals: List[Coin] = [coin for item in items for coin in item.removals]
+            additions: List[Coin] = [coin for item in items for coin in item.additions]
+            template = SpendBundle.aggregate([item.spend_bundle for item in items]), additions, removals
         else:
-            return None
+            template = None
+        self.block_template = peak_header_hash, self.mempool.version, template
+        return template
 
     def get_filter(self) -> bytes:
         all_transactions: Set[bytes32] = set()
@@ -152,18 +159,21 @@ class MempoolManager:
         if bundle_hash in self.seen_bundle_hashes:
             self.seen_bundle_hashes.pop(bundle_hash)
 
-    async def pre_validate_spendbundle(self, new_spend: SpendBundle) -> CostResult:
+    async def pre_validate_spendbundle(
+        self, new_spend: SpendBundle, spend_name: Optional[bytes32] = None
+    ) -> CostResult:
         """
         Errors are included within the cached_result.
-        This runs in another process so we don't block the main thread
+        This runs in another process so we don't block the main thread. Spend bundles received at the same time are
+        validated together, by several processes.
         """
         start_time = time.time()
-        cached_result_bytes = await asyncio.get_running_loop().run_in_executor(
-            self.pool, validate_transaction_multiprocess, self.constants_json, bytes(new_spend)
-        )
-        end_time = time.time()
-        log.info(f"It took {end_time - start_time} to pre validate transaction")
-        return CostResult.from_bytes(cached_result_bytes)
+        cost_result = await self.pre_validator.validate(new_spend, spend_name)
+        log.info(f"It took {time.time() - start_time} to pre validate transaction")
+        return cost_result
+
+    def get_pre_validation_metrics(self) -> Dict:
+        return self.pre_validator.get_metrics()
 
     async def add_spendbundle(
         self,
@@ -227,13 +237,21 @@ class MempoolManager:
         removal_coin_dict: Dict[bytes32, Coin] = {}
         unknown_unspent_error: bool = False
         removal_amount = uint64(0)
+        parent_items: Dict[bytes32, MempoolItem] = {}
         for name in removal_names:
             removal_record = await self.coin_store.get_coin_record(name)
-            if removal_record is None and name not in additions_dict:
+            if removal_record is None and name not in additions_dict and name not in self.mempool.additions:
                 unknown_unspent_error = True
                 break
-            elif name in additions_dict:
-                removal_coin = additions_dict[name]
+            elif removal_record is None:
+                # Coins created by this spend bundle, or by another one in the mempool, which must then be in the
+                # same block or before it
+                if name in additions_dict:
+                    removal_coin = additions_dict[name]
+                else:
+                    parent_item: MempoolItem = self.mempool.additions[name]
+                    parent_items[parent_item.name] = parent_item
+                    removal_coin = [coin for coin in parent_item.additions if coin.name() == name][0]
                 # TODO(straya): what timestamp to use here?
                 removal_record = CoinRecord(
                     removal_coin,
@@ -250,6 +268,8 @@ class MempoolManager:
             removal_coin_dict[name] = removal_record.coin
         if unknown_unspent_error:
             return None, MempoolInclusionStatus.FAILED, Err.UNKNOWN_UNSPENT
+        if count_ancestors(self.mempool, list(parent_items.values())) > MAX_MEMPOOL_ANCESTORS:
+            return None, MempoolInclusionStatus.FAILED, Err.TOO_MANY_MEMPOOL_ANCESTORS
 
         if addition_amount > removal_amount:
             print(addition_amount, removal_amount)
@@ -338,10 +358,7 @@ class MempoolManager:
 
         if validate_signature:
             # Verify aggregated signature
-            if len(pks) == 0 and len(msgs) == 0:
-                validates = new_spend.aggregated_signature == G2Element.infinity()
-            else:
-                validates = AugSchemeMPL.aggregate_verify(pks, msgs, new_spend.aggregated_signature)
+            validates = await self.signature_verifier.verify(pks, msgs, new_spend.aggregated_signature)
             if not validates:
                 log.warning(f"Aggsig validation error {pks} {msgs} {new_spend}")
                 return None, MempoolInclusionStatus.FAILED, Err.BAD_AGGREGATE_SIGNATURE
@@ -406,7 +423,9 @@ class MempoolManager:
 
     async def new_peak(self, new_peak: Optional[BlockRecord]):
         """
-        Called when a new peak is available, we try to recreate a mempool for the new tip.
+        Called when a new peak is available. If it is a child of the previous one, only the items that spend coins
+        spent by it are removed, otherwise we try to recreate a mempool for the new tip. Then the items that could not
+        enter the mempool yet are tried again.
         """
         if new_peak is None:
             return
@@ -415,13 +434,20 @@ class MempoolManager:
         if new_peak.height <= self.constants.INITIAL_FREEZE_PERIOD:
             return
 
+        old_peak = self.peak
         self.peak = new_peak
 
-        old_pool = self.mempool
-        self.mempool = Mempool.create(self.mempool_size)
+        if old_peak is not None and new_peak.prev_hash == old_peak.header_hash:
+            if not new_peak.is_transaction_block:
+                # No coins changed, and neither did the height used for the conditions
+                return
+            await self.remove_spent_items(new_peak.height)
+        else:
+            old_pool = self.mempool
+            self.mempool = Mempool.create(self.mempool_size)
 
-        for item in old_pool.spends.values():
-            await self.add_spendbundle(item.spend_bundle, item.cost_result, item.spend_bundle_name, False)
+            for item in old_pool.spends.values():
+                await self.add_spendbundle(item.spend_bundle, item.cost_result, item.spend_bundle_name, False)
 
         potential_txs_copy = self.potential_txs.copy()
         self.potential_txs = {}
@@ -431,6 +457,25 @@ class MempoolManager:
             f"Size of mempool: {len(self.mempool.spends)}, minimum fee to get in: {self.mempool.get_min_fee_rate()}"
         )
 
+    async def remove_spent_items(self, height: uint32) -> None:
+        """
+        Removes the items that spend coins spent by the block at height, which are either included in it or conflict
+        with it. The other items stay valid, since their height and time conditions can only become easier to meet.
+        The items spending coins created by an included item stay too, since the coins now exist.
+        """
+        removed: Set[bytes32] = set(record.name for record in await self.coin_store.get_coins_removed_at_height(height))
+        if len(removed) == 0:
+            return
+        added: Set[bytes32] = set(record.name for record in await self.coin_store.get_coins_added_at_height(height))
+        for coin_name in removed:
+            item: Optional[MempoolItem] = self.mempool.removals.get(coin_name)
+            if item is None:
+                continue
+            included = all(coin.name() in removed for coin in item.removals) and all(
+                coin.name() in added for coin in item.additions
+            )
+            self.mempool.remove_spend(item, remove_dependents=not included)
+
     async def get_items_not_in_filter(self, mempool_filter: PyBIP158) -> List[MempoolItem]:
         items: List[MempoolItem] = []
         checked_items: Set[bytes32] = set()
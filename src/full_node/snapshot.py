@@ -0,0 +1,248 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Type
+
+import aiosqlite
+
+from src.consensus.block_record import BlockRecord
+from src.consensus.constants import ConsensusConstants
+from src.full_node.block_store import BlockStore
+from src.full_node.coin_store import CoinStore
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.types.coin_record import CoinRecord
+from src.types.full_block import FullBlock
+from src.types.header_block import HeaderBlock
+from src.types.weight_proof import SubEpochSegments
+from src.util.ints import uint32, uint64
+from src.util.streamable import Streamable, streamable
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"chia-snapshot"
+SNAPSHOT_VERSION = uint32(1)
+CHECKSUM_SIZE = 32
+# Number of heights whose block records or coins are read from the database, and written, at once
+SNAPSHOT_BATCH_HEIGHTS = 10000
+
+
+@dataclass(frozen=True)
+@streamable
+class SnapshotHeader(Streamable):
+    version: uint32
+    genesis_challenge: bytes32
+    height: uint32
+    peak_hash: bytes32
+
+
+@dataclass(frozen=True)
+@streamable
+class SnapshotSubEpochSegments(Streamable):
+    ses_height: uint32
+    segments: SubEpochSegments
+
+
+class ChecksummedWriter:
+    """
+    Writes to a file and hashes everything written, so the digest can be appended as a checksum.
+    """
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.hasher = hashlib.sha256()
+
+    def write(self, data: bytes) -> None:
+        self.hasher.update(data)
+        self.f.write(data)
+
+    def write_batch(self, items: Sequence[Streamable]) -> None:
+        """
+        Sections are sequences of batches, each one prefixed by its length, ending with an empty batch.
+        """
+        self.write(bytes(uint64(len(items))))
+        for item in items:
+            self.write(bytes(item))
+
+    def write_checksum(self) -> None:
+        self.f.write(self.hasher.digest())
+
+
+def read_batches(f: BinaryIO, item_type: Type[Streamable]) -> Iterator[List]:
+    while True:
+        count = uint64.parse(f)
+        if count == 0:
+            return
+        yield [item_type.parse(f) for _ in range(count)]
+
+
+def verify_checksum(path: Path) -> None:
+    size = path.stat().st_size
+    if size < len(SNAPSHOT_MAGIC) + CHECKSUM_SIZE:
+        raise ValueError(f"Snapshot {path} is truncated")
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = size - CHECKSUM_SIZE
+        while remaining > 0:
+            chunk = f.read(min(remaining, 1024 * 1024))
+            hasher.update(chunk)
+            remaining -= len(chunk)
+        if f.read(CHECKSUM_SIZE) != hasher.digest():
+            raise ValueError(f"Snapshot {path} is corrupted, its checksum does not match")
+
+
+async def first_full_block_height(
+    block_store: BlockStore, height_to_hash: Dict[uint32, bytes32], height: uint32
+) -> uint32:
+    """
+    The full blocks from the start of the sub-slot before the one of the block at height are needed to find the
+    signage point and infusion point sub-slots of the peak, so they are included in the snapshot.
+    """
+    sub_slots_found = 0
+    curr_height = height
+    while curr_height > 0:
+        block_record: Optional[BlockRecord] = await block_store.get_block_record(height_to_hash[curr_height])
+        assert block_record is not None
+        if block_record.first_in_sub_slot:
+            sub_slots_found += 1
+            if sub_slots_found == 2:
+                break
+        curr_height = uint32(curr_height - 1)
+    return curr_height
+
+
+async def export_snapshot(
+    connection: aiosqlite.Connection, path: Path, constants: ConsensusConstants, height: Optional[int] = None
+) -> SnapshotHeader:
+    """
+    Writes the coins that are unspent at height (the peak by default), with the block records of the main chain up to
+    it, the stored sub-epoch challenge segments, the full blocks close to it and the header blocks of the recent chain
+    of weight proofs before them, followed by a checksum. A node loaded from the snapshot cannot reorg below height, so
+    it should be buried deep enough in the chain.
+    """
+    block_store = await BlockStore.create(connection)
+    coin_store = await CoinStore.create(connection)
+    height_to_hash, sub_epoch_summaries = await block_store.get_peak_height_dicts()
+    if len(height_to_hash) == 0:
+        raise ValueError("The database has no peak")
+    peak_height = max(height_to_hash.keys())
+    if height is None:
+        height = peak_height
+    if height < 0 or height > peak_height:
+        raise ValueError(f"Height {height} is not between 0 and the peak height {peak_height}")
+    header = SnapshotHeader(
+        SNAPSHOT_VERSION, constants.GENESIS_CHALLENGE, uint32(height), height_to_hash[uint32(height)]
+    )
+
+    with open(path, "wb") as f:
+        writer = ChecksummedWriter(f)
+        writer.write(SNAPSHOT_MAGIC)
+        writer.write(bytes(header))
+
+        for start in range(0, height + 1, SNAPSHOT_BATCH_HEIGHTS):
+            stop = min(start + SNAPSHOT_BATCH_HEIGHTS - 1, height)
+            block_records = await block_store.get_block_records_in_range(start, stop)
+            # Orphaned blocks are not in the snapshot
+            writer.write_batch([block_records[height_to_hash[uint32(h)]] for h in range(start, stop + 1)])
+        writer.write_batch([])
+        log.info(f"Exported {height + 1} block records")
+
+        segments: List[SnapshotSubEpochSegments] = []
+        for ses_height in sorted(sub_epoch_summaries.keys()):
+            if ses_height > height:
+                break
+            challenge_segments = await block_store.get_sub_epoch_challenge_segments(ses_height)
+            if challenge_segments is not None:
+                segments.append(SnapshotSubEpochSegments(ses_height, SubEpochSegments(challenge_segments)))
+        if len(segments) > 0:
+            writer.write_batch(segments)
+        writer.write_batch([])
+
+        full_block_height = await first_full_block_height(block_store, height_to_hash, uint32(height))
+        for h in range(full_block_height, height + 1):
+            block: Optional[FullBlock] = await block_store.get_full_block(height_to_hash[uint32(h)])
+            assert block is not None
+            writer.write_batch([block])
+        writer.write_batch([])
+
+        # The weight proofs of the node start their recent chain up to WEIGHT_PROOF_RECENT_BLOCKS below its peak, which
+        # is never below height, and are made from the header blocks
+        recent_chain_height = max(0, height - constants.WEIGHT_PROOF_RECENT_BLOCKS)
+        for start in range(recent_chain_height, full_block_height, SNAPSHOT_BATCH_HEIGHTS):
+            stop = min(start + SNAPSHOT_BATCH_HEIGHTS, full_block_height) - 1
+            header_blocks = await block_store.get_header_blocks_in_range(start, stop)
+            writer.write_batch([header_blocks[height_to_hash[uint32(h)]] for h in range(start, stop + 1)])
+        writer.write_batch([])
+
+        num_coins = 0
+        for start in range(0, height + 1, SNAPSHOT_BATCH_HEIGHTS):
+            stop = min(start + SNAPSHOT_BATCH_HEIGHTS - 1, height)
+            coin_records = await coin_store.get_unspent_coin_records_at_height(uint32(height), start, stop)
+            if len(coin_records) > 0:
+                writer.write_batch(coin_records)
+                num_coins += len(coin_records)
+        writer.write_batch([])
+        log.info(f"Exported {num_coins} unspent coins")
+
+        writer.write_checksum()
+    return header
+
+
+async def import_snapshot(connection: aiosqlite.Connection, path: Path, genesis_challenge: bytes32) -> SnapshotHeader:
+    """
+    Loads a snapshot written by export_snapshot into a database without a chain, and sets its peak to the height of
+    the snapshot, from where the node syncs normally.
+    """
+    verify_checksum(path)
+    block_store = await BlockStore.create(connection)
+    coin_store = await CoinStore.create(connection)
+    _, peak = await block_store.get_block_records_close_to_peak(0)
+    if peak is not None:
+        raise ValueError("The database already has a chain, snapshots can only be loaded into a new database")
+
+    with open(path, "rb") as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a snapshot")
+        header = SnapshotHeader.parse(f)
+        if header.version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {header.version}")
+        if header.genesis_challenge != genesis_challenge:
+            raise ValueError("The snapshot is of another network")
+
+        num_block_records = 0
+        for block_records in read_batches(f, BlockRecord):
+            await block_store.add_block_records(block_records)
+            num_block_records += len(block_records)
+        peak_record: Optional[BlockRecord] = await block_store.get_block_record(header.peak_hash)
+        if num_block_records != header.height + 1 or peak_record is None or peak_record.height != header.height:
+            raise ValueError(f"The block records of the snapshot do not end at its peak, height {header.height}")
+        log.info(f"Imported {num_block_records} block records")
+
+        for segments_batch in read_batches(f, SnapshotSubEpochSegments):
+            for segments in segments_batch:
+                await block_store.persist_sub_epoch_challenge_segments(
+                    segments.ses_height, segments.segments.challenge_segments
+                )
+        await connection.commit()
+
+        for blocks in read_batches(f, FullBlock):
+            for block in blocks:
+                block_record: Optional[BlockRecord] = await block_store.get_block_record(block.header_hash)
+                if block_record is None:
+                    raise ValueError(f"The snapshot has no block record for block {block.header_hash}")
+                await block_store.add_full_block(block, block_record)
+
+        for header_blocks in read_batches(f, HeaderBlock):
+            await block_store.add_header_blocks(header_blocks)
+
+        num_coins = 0
+        for coin_records in read_batches(f, CoinRecord):
+            await coin_store.add_coin_records(coin_records)
+            await connection.commit()
+            num_coins += len(coin_records)
+        log.info(f"Imported {num_coins} unspent coins")
+
+    # The peak is set last, so an interrupted import leaves a database without a chain
+    await block_store.set_peak(header.peak_hash)
+    await connection.commit()
+    return header
@@ -0,0 +1,89 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from src.consensus.constants import ConsensusConstants
+from src.consensus.cost_calculator import CostResult, calculate_cost_of_program
+from src.full_node.bundle_tools import best_solution_program
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.types.spend_bundle import SpendBundle
+from src.util.batching_executor import BatchingExecutor
+from src.util.streamable import dataclass_from_dict
+
+log = logging.getLogger(__name__)
+
+# Number of processes running the CLVM of incoming spend bundles
+DEFAULT_PRE_VALIDATION_WORKERS = 2
+# Maximum number of spend bundles sent to a process in one call
+DEFAULT_PRE_VALIDATION_BATCH_SIZE = 16
+# Spend bundles waiting for a process, beyond which callers wait until there is room
+DEFAULT_PRE_VALIDATION_QUEUE_SIZE = 1000
+
+
+def validate_transactions_multiprocess(
+    constants_dict: Dict,
+    spend_bundles_bytes: List[bytes],
+) -> List[Tuple[Optional[bytes], Optional[str]]]:
+    """
+    Returns, for each spend bundle, its serialized CostResult, or the error that the validation raised, so that an
+    invalid spend bundle does not fail the others of the batch.
+    """
+    constants: ConsensusConstants = dataclass_from_dict(ConsensusConstants, constants_dict)
+    results: List[Tuple[Optional[bytes], Optional[str]]] = []
+    for spend_bundle_bytes in spend_bundles_bytes:
+        try:
+            program = best_solution_program(SpendBundle.from_bytes(spend_bundle_bytes))
+            results.append((bytes(calculate_cost_of_program(program, constants.CLVM_COST_RATIO_CONSTANT, True)), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+
+class SpendBundlePreValidator:
+    """
+    Runs the CLVM of incoming spend bundles in a pool of processes, without blocking the event loop, in batches, so
+    bursts of transactions are spread over the processes with little overhead per bundle. A spend bundle that is
+    already queued or being validated is not validated again. When the queue is full, callers wait for room, which
+    slows down the peers sending the transactions.
+    """
+
+    def __init__(
+        self,
+        constants_json: Dict,
+        num_workers: int = DEFAULT_PRE_VALIDATION_WORKERS,
+        batch_size: int = DEFAULT_PRE_VALIDATION_BATCH_SIZE,
+        queue_size: int = DEFAULT_PRE_VALIDATION_QUEUE_SIZE,
+    ):
+        self.executor = BatchingExecutor(
+            "Pre-validation",
+            validate_transactions_multiprocess,
+            self._handle_result,
+            (constants_json,),
+            num_workers,
+            batch_size,
+            queue_size,
+        )
+        self.failed = 0
+
+    def _handle_result(self, _, result: Tuple[Optional[bytes], Optional[str]]) -> CostResult:
+        result_bytes, error = result
+        if result_bytes is None:
+            self.failed += 1
+            raise ValueError(error)
+        return CostResult.from_bytes(result_bytes)
+
+    async def validate(self, spend_bundle: SpendBundle, spend_name: Optional[bytes32] = None) -> CostResult:
+        """
+        Returns the cost result of the spend bundle, and raises the error of the validation if it failed.
+        """
+        if spend_name is None:
+            spend_name = spend_bundle.name()
+        return await self.executor.submit(spend_name, bytes(spend_bundle))
+
+    def get_metrics(self) -> Dict:
+        metrics = self.executor.get_metrics()
+        metrics["validated"] = metrics.pop("processed")
+        metrics["failed"] = self.failed
+        return metrics
+
+    def shut_down(self) -> None:
+        self.executor.shut_down()
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Coroutine, Deque, Dict, List, Optional, Tuple
+
+from src.consensus.block_record import BlockRecord
+from src.consensus.blockchain import Blockchain
+from src.consensus.blockchain_interface import BlockchainInterface
+from src.consensus.multiprocess_validation import PreValidationResult, pre_validate_blocks_multiprocessing
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.types.blockchain_format.sub_epoch_summary import SubEpochSummary
+from src.types.full_block import FullBlock
+from src.util.ints import uint32
+
+log = logging.getLogger(__name__)
+
+# Number of batches that can wait between two stages, bounding the blocks held in memory
+SYNC_PIPELINE_QUEUE_SIZE = 2
+# Upper bound on the batches fetched at once, whatever the number of peers
+MAX_SYNC_BATCHES_IN_FLIGHT = 16
+SYNC_STAGES = ["fetch", "pre_validate", "add"]
+
+# Fetches the blocks from start to end height, returning them with the peer that sent them, or None if no peer did
+FetchBatch = Callable[[uint32, uint32], Coroutine[Any, Any, Optional[Tuple[Any, List[FullBlock]]]]]
+# Adds a batch of blocks to the blockchain, with their pre-validation results (None if the batch failed it)
+AddBatch = Callable[[Any, List[FullBlock], Optional[List[PreValidationResult]]], Awaitable[bool]]
+
+
+class PendingBlockRecords(BlockchainInterface):
+    """
+    The block records of the blocks that were pre-validated but not yet added to the blockchain, in front of the
+    blockchain. The blocks of a batch are pre-validated against them while the previous batch is being added, which
+    only reads the blockchain, so it does not need the blockchain lock. The heights of the pending blocks are those
+    of the chain being synced, so they are answered from the pending records before the blockchain.
+    """
+
+    def __init__(self, blockchain: BlockchainInterface):
+        self.blockchain = blockchain
+        self.records: Dict[bytes32, BlockRecord] = {}
+        self.heights: Dict[uint32, bytes32] = {}
+
+    def get_peak_height(self) -> Optional[uint32]:
+        return self.blockchain.get_peak_height()
+
+    def block_record(self, header_hash: bytes32) -> BlockRecord:
+        record: Optional[BlockRecord] = self.records.get(header_hash)
+        if record is not None:
+            return record
+        return self.blockchain.block_record(header_hash)
+
+    def height_to_block_record(self, height: uint32) -> BlockRecord:
+        header_hash: Optional[bytes32] = self.heights.get(height)
+        if header_hash is not None:
+            return self.records[header_hash]
+        return self.blockchain.height_to_block_record(height)
+
+    def get_ses_heights(self) -> List[uint32]:
+        return self.blockchain.get_ses_heights()
+
+    def get_ses(self, height: uint32) -> SubEpochSummary:
+        return self.blockchain.get_ses(height)
+
+    def height_to_hash(self, height: uint32) -> Optional[bytes32]:
+        header_hash: Optional[bytes32] = self.heights.get(height)
+        if header_hash is not None:
+            return header_hash
+        return self.blockchain.height_to_hash(height)
+
+    def contains_height(self, height: uint32) -> bool:
+        return height in self.heights or self.blockchain.contains_height(height)
+
+    def contains_block(self, header_hash: bytes32) -> bool:
+        return header_hash in self.records or self.blockchain.contains_block(header_hash)
+
+    def add_block_record(self, block_record: BlockRecord):
+        self.records[block_record.header_hash] = block_record
+        self.heights[block_record.height] = block_record.header_hash
+
+    def remove_block_record(self, header_hash: bytes32):
+        # Pre-validation removes the records it adds, but the next batch builds on them, so they are kept until the
+        # blocks are added to the blockchain
+        pass
+
+    def remove_added(self, blocks: List[FullBlock]) -> None:
+        for block in blocks:
+            self.records.pop(block.header_hash, None)
+            if self.heights.get(block.height) == block.header_hash:
+                del self.heights[block.height]
+
+
+class SyncPipelineStats:
+    """
+    Per stage, the time spent working and waiting for the previous stage, and the blocks and batches done. The
+    stage that waits the least is the one limiting the sync.
+    """
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.busy: Dict[str, float] = {stage: 0.0 for stage in SYNC_STAGES}
+        self.waiting: Dict[str, float] = {stage: 0.0 for stage in SYNC_STAGES}
+        self.blocks: Dict[str, int] = {stage: 0 for stage in SYNC_STAGES}
+        self.batches: Dict[str, int] = {stage: 0 for stage in SYNC_STAGES}
+
+    def add(self, stage: str, busy: float, waiting: float, num_blocks: int) -> None:
+        self.busy[stage] += busy
+        self.waiting[stage] += waiting
+        self.blocks[stage] += num_blocks
+        self.batches[stage] += 1
+
+    def get_metrics(self) -> Dict:
+        return {
+            "time": time.time() - self.start_time,
+            "stages": {
+                stage: {
+                    "busy": self.busy[stage],
+                    "waiting": self.waiting[stage],
+                    "blocks": self.blocks[stage],
+                    "batches": self.batches[stage],
+                }
+                for stage in SYNC_STAGES
+            },
+        }
+
+    def __str__(self) -> str:
+        stages = ", ".join(
+            f"{stage}: {self.blocks[stage]} blocks in {self.busy[stage]:.2f}s, waited {self.waiting[stage]:.2f}s"
+            for stage in SYNC_STAGES
+        )
+        return f"{time.time() - self.start_time:.2f}s, {stages}"
+
+
+class SyncPipeline:
+    """
+    Syncs a range of heights in batches through three stages connected by bounded queues: while batches are being
+    fetched from peers (fetch_concurrency at once), the one before them is being pre-validated in the process pool,
+    and the one before that is being added to the blockchain. Batches are added in order. When a batch fails, the
+    batches after it are dropped and the pipeline starts again from it, since add_batch disconnects the peer that
+    sent it.
+    """
+
+    def __init__(
+        self,
+        blockchain: Blockchain,
+        fetch_batch: FetchBatch,
+        add_batch: AddBatch,
+        queue_size: int = SYNC_PIPELINE_QUEUE_SIZE,
+        fetch_concurrency: int = 1,
+    ):
+        self.blockchain = blockchain
+        self.fetch_batch = fetch_batch
+        self.add_batch = add_batch
+        self.queue_size = queue_size
+        self.fetch_concurrency = fetch_concurrency
+        self.stats = SyncPipelineStats()
+        self.pending = PendingBlockRecords(blockchain)
+        self.failed_height: Optional[int] = None
+        self.fetch_failed = False
+        self.error: Optional[BaseException] = None
+
+    async def run(self, start_height: int, end_height: int, batch_size: int) -> bool:
+        """
+        Returns True if all the blocks up to end_height were added, and False if they could not be fetched from any
+        peer. Exceptions of the stages are raised once the pipeline has stopped.
+        """
+        height = start_height
+        while height < end_height:
+            self.failed_height = None
+            self.pending = PendingBlockRecords(self.blockchain)
+            fetched: asyncio.Queue = asyncio.Queue(self.queue_size)
+            validated: asyncio.Queue = asyncio.Queue(self.queue_size)
+            await asyncio.gather(
+                self._fetch(height, end_height, batch_size, fetched),
+                self._pre_validate(fetched, validated),
+                self._add(validated),
+            )
+            if self.error is not None:
+                raise self.error
+            if self.fetch_failed:
+                return False
+            if self.failed_height is None:
+                break
+            height = self.failed_height
+        return True
+
+    def _stopped(self) -> bool:
+        # The batches fetched before a fetch failure are still added
+        return self.failed_height is not None or self.error is not None
+
+    async def _fetch(self, start_height: int, end_height: int, batch_size: int, out: asyncio.Queue) -> None:
+        """
+        Keeps up to fetch_concurrency batches being fetched at once, and passes them on in order.
+        """
+        heights = iter(range(start_height, end_height, batch_size))
+        in_flight: Deque[Tuple[int, asyncio.Task]] = deque()
+        task: asyncio.Task
+        try:
+            while True:
+                while len(in_flight) < self.fetch_concurrency and not self._stopped():
+                    next_height: Optional[int] = next(heights, None)
+                    if next_height is None:
+                        break
+                    batch_end = min(end_height, next_height + batch_size)
+                    task = asyncio.create_task(self.fetch_batch(uint32(next_height), uint32(batch_end)))
+                    in_flight.append((next_height, task))
+                if len(in_flight) == 0 or self._stopped():
+                    break
+                fetch_start = time.time()
+                height, task = in_flight.popleft()
+                response = await task
+                if response is None:
+                    self.fetch_failed = True
+                    break
+                peer, blocks = response
+                put_start = time.time()
+                await out.put((height, peer, blocks))
+                self.stats.add("fetch", put_start - fetch_start, time.time() - put_start, len(blocks))
+        except Exception as e:
+            self.error = e
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+        # The following stages always drain their queue until None, so this never blocks forever
+        await out.put(None)
+
+    async def _pre_validate(self, batches: asyncio.Queue, out: asyncio.Queue) -> None:
+        while True:
+            get_start = time.time()
+            batch = await batches.get()
+            if batch is None:
+                break
+            if self._stopped():
+                continue
+            height, peer, blocks = batch
+            validate_start = time.time()
+            try:
+                results: Optional[List[PreValidationResult]] = await pre_validate_blocks_multiprocessing(
+                    self.blockchain.constants,
+                    self.pending,
+                    blocks,
+                    self.blockchain.pool,
+                    validate_signatures=True,
+                )
+            except Exception as e:
+                self.error = e
+                continue
+            self.stats.add("pre_validate", time.time() - validate_start, validate_start - get_start, len(blocks))
+            await out.put((height, peer, blocks, results))
+        await out.put(None)
+
+    async def _add(self, batches: asyncio.Queue) -> None:
+        while True:
+            get_start = time.time()
+            batch = await batches.get()
+            if batch is None:
+                break
+            if self._stopped():
+                continue
+            height, peer, blocks, results = batch
+            add_start = time.time()
+            try:
+                success = await self.add_batch(peer, blocks, results)
+            except Exception as e:
+                self.error = e
+                continue
+            self.pending.remove_added(blocks)
+            if not success:
+                self.failed_height = height
+                continue
+            self.stats.add("add", time.time() - add_start, add_start - get_start, len(blocks))
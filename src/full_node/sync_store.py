@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import time
 from typing import Dict, List, Optional, Tuple, Set
 
 from src.types.blockchain_format.sized_bytes import bytes32
@@ -7,6 +8,46 @@ from src.util.ints import uint32, uint128
 
 log = logging.getLogger(__name__)
 
+# Block requests that are sent to a peer at once during sync, unless all the other peers have as many
+MAX_SYNC_REQUESTS_PER_PEER = 3
+# Peers that fail this many block requests are not asked for blocks anymore during sync
+MAX_SYNC_FAILURES = 3
+# Peers slower than this fraction of the fastest one are only asked for blocks when the other peers are busy
+SLOW_PEER_FRACTION = 0.2
+# Weight of the last request in the moving averages of the speed and latency of a peer
+SYNC_STATS_ALPHA = 0.3
+
+
+class PeerSyncStats:
+    """
+    Download speed and latency of a peer, as moving averages over its block requests during sync. The bytes are the
+    ones read from the connection while requests are in flight, so requests sent at once are measured together.
+    """
+
+    def __init__(self):
+        self.bytes_per_second: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.interval_start = 0.0
+        self.interval_bytes_read = 0
+
+    def get_metrics(self) -> Dict:
+        return {
+            "bytes_per_second": self.bytes_per_second,
+            "latency": self.latency,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+def moving_average(average: Optional[float], value: float) -> float:
+    if average is None:
+        return value
+    return SYNC_STATS_ALPHA * value + (1 - SYNC_STATS_ALPHA) * average
+
 
 class SyncStore:
     # Whether or not we are syncing
@@ -18,6 +59,7 @@ class SyncStore:
     peers_changed: asyncio.Event
     batch_syncing: Set[bytes32]  # Set of nodes which we are batch syncing from
     backtrack_syncing: Dict[bytes32, int]  # Set of nodes which we are backtrack syncing from, and how many threads
+    peer_sync_stats: Dict[bytes32, PeerSyncStats]  # peer node id : speed of its block requests during sync
 
     @classmethod
     async def create(cls):
@@ -33,6 +75,7 @@ class SyncStore:
 
         self.batch_syncing = set()
         self.backtrack_syncing = {}
+        self.peer_sync_stats = {}
         return self
 
     def set_peak_target(self, peak_hash: bytes32, target_height: uint32):
@@ -116,10 +159,77 @@ class SyncStore:
         Clears the peak_to_peer info which can get quite large.
         """
         self.peak_to_peer = {}
+        self.peer_sync_stats = {}
+
+    def sync_request_started(self, peer_id: bytes32, bytes_read: int) -> float:
+        """
+        Records a block request sent to a peer, given the bytes read from its connection so far. Returns the time it
+        was sent.
+        """
+        stats = self.peer_sync_stats.setdefault(peer_id, PeerSyncStats())
+        now = time.time()
+        if stats.in_flight == 0:
+            stats.interval_start = now
+            stats.interval_bytes_read = bytes_read
+        stats.in_flight += 1
+        stats.requests += 1
+        return now
+
+    def sync_request_done(self, peer_id: bytes32, request_start: float, bytes_read: int) -> None:
+        stats = self.peer_sync_stats.get(peer_id)
+        if stats is None:
+            return
+        now = time.time()
+        stats.in_flight = max(0, stats.in_flight - 1)
+        stats.latency = moving_average(stats.latency, now - request_start)
+        if now > stats.interval_start:
+            speed = (bytes_read - stats.interval_bytes_read) / (now - stats.interval_start)
+            stats.bytes_per_second = moving_average(stats.bytes_per_second, speed)
+        stats.interval_start = now
+        stats.interval_bytes_read = bytes_read
+
+    def sync_request_failed(self, peer_id: bytes32) -> None:
+        stats = self.peer_sync_stats.get(peer_id)
+        if stats is None:
+            return
+        stats.in_flight = max(0, stats.in_flight - 1)
+        stats.failures += 1
+
+    def choose_sync_peer(self, peer_ids: List[bytes32]) -> Optional[bytes32]:
+        """
+        Returns the peer to request the next batch of blocks from: peers that were not measured yet first, so all of
+        them get tried, then the one with the most speed per request in flight. Peers that failed too many requests
+        are never chosen, and busy or slow ones only when all the others are too.
+        """
+        candidates: List[Tuple[bytes32, PeerSyncStats]] = []
+        for peer_id in peer_ids:
+            stats = self.peer_sync_stats.get(peer_id, PeerSyncStats())
+            if stats.failures < MAX_SYNC_FAILURES:
+                candidates.append((peer_id, stats))
+        if len(candidates) == 0:
+            return None
+        fastest = max(stats.bytes_per_second or 0.0 for _, stats in candidates)
+
+        def score(candidate: Tuple[bytes32, PeerSyncStats]) -> Tuple[bool, bool, float]:
+            stats = candidate[1]
+            if stats.bytes_per_second is None:
+                speed = float("inf")
+            else:
+                speed = stats.bytes_per_second / (stats.in_flight + 1)
+            idle = stats.in_flight < MAX_SYNC_REQUESTS_PER_PEER
+            fast = stats.bytes_per_second is None or stats.bytes_per_second >= SLOW_PEER_FRACTION * fastest
+            return idle, fast, speed
+
+        return max(candidates, key=score)[0]
+
+    def get_peer_sync_stats(self) -> Dict[bytes32, Dict]:
+        return {peer_id: stats.get_metrics() for peer_id, stats in self.peer_sync_stats.items()}
 
     def peer_disconnected(self, node_id: bytes32):
         if node_id in self.peer_to_peak:
             del self.peer_to_peak[node_id]
+        if node_id in self.peer_sync_stats:
+            del self.peer_sync_stats[node_id]
 
         for peak, peers in self.peak_to_peer.items():
             if node_id in peers:
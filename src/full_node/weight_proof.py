@@ -211,10 +211,11 @@ class WeightProofHandler:
 
         headers: Dict[bytes32, HeaderBlock] = await self.blockchain.get_header_blocks_in_range(curr_height, tip_height)
         while curr_height <= tip_height:
-            # add to needed reward chain recent blocks
-            header_block = headers[self.blockchain.height_to_hash(curr_height)]
+            # add to needed reward chain recent blocks, a node restored from a snapshot only has the header blocks of
+            # the snapshot below it, so a missing one fails the proof instead of raising
+            header_block: Optional[HeaderBlock] = headers.get(self.blockchain.height_to_hash(curr_height))
             if header_block is None:
-                self.log.error("creating recent chain failed")
+                self.log.error(f"creating recent chain failed, no header block at height {curr_height}")
                 return None
             recent_chain.append(ProofBlockHeader(header_block.finished_sub_slots, header_block.reward_chain_block))
             curr_height = curr_height + uint32(1)  # type: ignore
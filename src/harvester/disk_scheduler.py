@@ -0,0 +1,114 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from concurrent.futures.thread import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+# Number of lookups that run at the same time on one device
+DEFAULT_NUM_THREADS_PER_DISK = 4
+# Number of recent lookups of each kind whose latencies are kept for the percentiles
+DEFAULT_LATENCY_SAMPLES = 1000
+LATENCY_PERCENTILES = [50, 90, 99]
+
+# Priorities of the lookups, the lowest runs first. The qualities of all the plots that passed the filter are looked
+# up before the full proofs, which only a few plots have, and which take more reads
+QUALITY_LOOKUP = 0
+FULL_PROOF_LOOKUP = 1
+LOOKUP_NAMES = {QUALITY_LOOKUP: "quality_lookups", FULL_PROOF_LOOKUP: "full_proof_lookups"}
+
+
+def latency_percentiles(latencies: Deque[float]) -> Dict[str, float]:
+    sorted_latencies: List[float] = sorted(latencies)
+    percentiles: Dict[str, float] = {}
+    for percentile in LATENCY_PERCENTILES:
+        if len(sorted_latencies) == 0:
+            percentiles[f"p{percentile}"] = 0.0
+        else:
+            index = min(len(sorted_latencies) - 1, len(sorted_latencies) * percentile // 100)
+            percentiles[f"p{percentile}"] = sorted_latencies[index]
+    return percentiles
+
+
+class DiskQueue:
+    """
+    Runs the lookups of the plots of one device in its own threads, at most num_threads at a time. The lookups that
+    wait for a thread are started by priority, and then in the order they were added.
+    """
+
+    def __init__(self, device: int, num_threads: int, num_samples: int):
+        self.device = device
+        self.num_threads = num_threads
+        self.executor = ThreadPoolExecutor(max_workers=num_threads)
+        self.running = 0
+        self.waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self.counter = itertools.count()
+        self.latencies: Dict[int, Deque[float]] = {priority: deque(maxlen=num_samples) for priority in LOOKUP_NAMES}
+        self.lookups: Dict[int, int] = {priority: 0 for priority in LOOKUP_NAMES}
+
+    async def run(self, priority: int, function: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        if self.running < self.num_threads:
+            self.running += 1
+        else:
+            # _release hands its thread over to the waiting lookup
+            future: asyncio.Future = loop.create_future()
+            heapq.heappush(self.waiting, (priority, next(self.counter), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+        start = time.time()
+        try:
+            return await loop.run_in_executor(self.executor, function, *args)
+        finally:
+            self.latencies[priority].append(time.time() - start)
+            self.lookups[priority] += 1
+            self._release()
+
+    def _release(self) -> None:
+        while len(self.waiting) > 0:
+            _, _, future = heapq.heappop(self.waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+    def get_metrics(self) -> Dict:
+        metrics: Dict = {"device": self.device, "running": self.running, "waiting": len(self.waiting)}
+        for priority, name in LOOKUP_NAMES.items():
+            metrics[name] = {"count": self.lookups[priority], **latency_percentiles(self.latencies[priority])}
+        return metrics
+
+    def shut_down(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+class DiskScheduler:
+    """
+    Runs the blocking lookups of plots in a DiskQueue for each device, by st_dev, so that a slow disk only holds the
+    threads of its own plots.
+    """
+
+    def __init__(self, num_threads_per_disk: int, num_samples: int = DEFAULT_LATENCY_SAMPLES):
+        self.num_threads_per_disk = num_threads_per_disk
+        self.num_samples = num_samples
+        self.queues: Dict[int, DiskQueue] = {}
+
+    def _get_queue(self, device: int) -> DiskQueue:
+        if device not in self.queues:
+            self.queues[device] = DiskQueue(device, self.num_threads_per_disk, self.num_samples)
+        return self.queues[device]
+
+    async def run(self, device: int, priority: int, function: Callable, *args) -> Any:
+        return await self._get_queue(device).run(priority, function, *args)
+
+    def get_metrics(self) -> List[Dict]:
+        return [queue.get_metrics() for queue in self.queues.values()]
+
+    def shut_down(self) -> None:
+        for queue in self.queues.values():
+            queue.shut_down()
@@ -1,27 +1,42 @@
 import logging
 import asyncio
+import time
 import src.server.ws_connection as ws  # lgtm [py/import-and-import-from]
 from concurrent.futures.thread import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional, Tuple, List, Callable, Set
+from typing import Any, Dict, Optional, Tuple, List, Callable, Set
 import concurrent
 
 from blspy import G1Element
 
 from src.consensus.constants import ConsensusConstants
+from src.harvester.disk_scheduler import DEFAULT_NUM_THREADS_PER_DISK, DiskScheduler
+from src.harvester.harvester_metrics import DEFAULT_LOOKUP_DEADLINE, HarvesterMetrics
+from src.plotting.plot_metadata_cache import PlotMetadataCache
 from src.plotting.plot_tools import (
-    load_plots,
+    find_plot_filenames,
+    load_plot_batch,
     PlotInfo,
     remove_plot_directory as remove_plot_directory_pt,
     add_plot_directory as add_plot_directory_pt,
     get_plot_directories as get_plot_directories_pt,
 )
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.path import path_from_root
 
 log = logging.getLogger(__name__)
 
+# Seconds between two refreshes of the plots
+PLOT_REFRESH_INTERVAL = 120
+# Number of plot files that are loaded at a time in the executor, the plots of a batch are farmed before the next one
+PLOT_REFRESH_BATCH_SIZE = 300
+PLOT_METADATA_CACHE_PATH = "cache/plot_metadata.dat"
+
 
 class Harvester:
     provers: Dict[Path, PlotInfo]
+    plot_filenames: List[Path]
+    plot_ids: bytes
     failed_to_open_filenames: Dict[Path, int]
     no_key_filenames: Set[Path]
     farmer_public_keys: List[G1Element]
@@ -29,16 +44,23 @@ class Harvester:
     root_path: Path
     _is_shutdown: bool
     executor: ThreadPoolExecutor
+    disk_scheduler: DiskScheduler
+    metrics: HarvesterMetrics
     state_changed_callback: Optional[Callable]
     cached_challenges: List
     constants: ConsensusConstants
     _refresh_lock: asyncio.Lock
+    _refresh_task: Optional[asyncio.Task]
+    plot_metadata_cache: PlotMetadataCache
 
     def __init__(self, root_path: Path, config: Dict, constants: ConsensusConstants):
         self.root_path = root_path
 
         # From filename to prover
         self.provers = {}
+        # The filenames of the provers, and their plot ids concatenated in the same order, for the plot filter
+        self.plot_filenames = []
+        self.plot_ids = b""
         self.failed_to_open_filenames = {}
         self.no_key_filenames = set()
 
@@ -48,6 +70,9 @@ class Harvester:
         self.match_str = None
         self.show_memo: bool = False
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=config["num_threads"])
+        # The lookups on the plots run in the threads of the device of the plot
+        self.disk_scheduler = DiskScheduler(config.get("num_threads_per_disk", DEFAULT_NUM_THREADS_PER_DISK))
+        self.metrics = HarvesterMetrics(config.get("lookup_deadline", DEFAULT_LOOKUP_DEADLINE))
         self.state_changed_callback = None
         self.server = None
         self.constants = constants
@@ -55,23 +80,29 @@ class Harvester:
         self.log = log
         self.state_changed_callback: Optional[Callable] = None
         self.last_load_time: float = 0
+        self._refresh_task = None
+        self.plot_metadata_cache = PlotMetadataCache(path_from_root(root_path, PLOT_METADATA_CACHE_PATH))
 
     async def _start(self):
         self._refresh_lock = asyncio.Lock()
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.plot_metadata_cache.load)
+        self._refresh_task = asyncio.create_task(self._periodically_refresh_plots())
 
     def _close(self):
         self._is_shutdown = True
         self.executor.shutdown(wait=True)
+        self.disk_scheduler.shut_down()
 
     async def _await_closed(self):
-        pass
+        if self._refresh_task is not None:
+            await self._refresh_task
 
     def _set_state_changed_callback(self, callback: Callable):
         self.state_changed_callback = callback
 
-    def _state_changed(self, change: str):
+    def _state_changed(self, change: str, change_data: Optional[Dict[str, Any]] = None):
         if self.state_changed_callback is not None:
-            self.state_changed_callback(change)
+            self.state_changed_callback(change, {} if change_data is None else change_data)
 
     def on_disconnect(self, connection: ws.WSChiaConnection):
         self.log.info(f"peer disconnected {connection.get_peer_info()}")
@@ -80,12 +111,11 @@ class Harvester:
     def get_plots(self) -> Tuple[List[Dict], List[str], List[str]]:
         response_plots: List[Dict] = []
         for path, plot_info in self.provers.items():
-            prover = plot_info.prover
             response_plots.append(
                 {
                     "filename": str(path),
-                    "size": prover.get_size(),
-                    "plot-seed": prover.get_id(),
+                    "size": plot_info.size,
+                    "plot-seed": plot_info.plot_id,
                     "pool_public_key": plot_info.pool_public_key,
                     "pool_contract_puzzle_hash": plot_info.pool_contract_puzzle_hash,
                     "farmer_public_key": plot_info.farmer_public_key,
@@ -102,28 +132,105 @@ class Harvester:
             [str(s) for s in self.no_key_filenames],
         )
 
+    def get_disk_metrics(self) -> List[Dict]:
+        num_plots: Dict[int, int] = {}
+        for plot_info in self.provers.values():
+            num_plots[plot_info.device] = num_plots.get(plot_info.device, 0) + 1
+        disk_metrics: List[Dict] = self.disk_scheduler.get_metrics()
+        for metrics in disk_metrics:
+            metrics["plots"] = num_plots.get(metrics["device"], 0)
+        return disk_metrics
+
+    async def _periodically_refresh_plots(self):
+        while not self._is_shutdown:
+            # The plots are first loaded when the keys are received in the handshake
+            if len(self.farmer_public_keys) > 0 and time.time() - self.last_load_time > PLOT_REFRESH_INTERVAL:
+                await self.refresh_plots()
+            await asyncio.sleep(1)
+
     async def refresh_plots(self):
         locked: bool = self._refresh_lock.locked()
         changed: bool = False
         if not locked:
             async with self._refresh_lock:
                 # Avoid double refreshing of plots
-                (changed, self.provers, self.failed_to_open_filenames, self.no_key_filenames,) = load_plots(
-                    self.provers,
-                    self.failed_to_open_filenames,
-                    self.farmer_public_keys,
-                    self.pool_public_keys,
-                    self.match_str,
-                    self.show_memo,
-                    self.root_path,
-                )
+                changed = await self._load_plots_in_batches()
+                self.last_load_time = time.time()
         if changed:
             self._state_changed("plots")
 
+    async def _load_plots_in_batches(self) -> bool:
+        """
+        Loads the plots of the plot directories in the executor, PLOT_REFRESH_BATCH_SIZE files at a time, so the
+        event loop keeps running, and the new plots of each batch are farmed while the next ones are loaded. The plots
+        in the metadata cache are not opened until they are looked up. Returns whether plots were added or removed.
+        """
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        all_filenames: List[Path] = await loop.run_in_executor(
+            self.executor, find_plot_filenames, self.root_path, self.match_str
+        )
+        changed = False
+        no_key_filenames: Set[Path] = set()
+        plot_ids: Set[bytes32] = set()
+        total_size = 0
+        for batch_start in range(0, len(all_filenames), PLOT_REFRESH_BATCH_SIZE):
+            if self._is_shutdown:
+                return changed
+            batch: List[Path] = all_filenames[batch_start : batch_start + PLOT_REFRESH_BATCH_SIZE]
+            batch_changed, batch_provers, batch_no_key_filenames, batch_size = await loop.run_in_executor(
+                self.executor,
+                load_plot_batch,
+                batch,
+                self.provers,
+                self.failed_to_open_filenames,
+                self.farmer_public_keys,
+                self.pool_public_keys,
+                self.show_memo,
+                plot_ids,
+                self.plot_metadata_cache,
+            )
+            removed: List[Path] = [filename for filename in batch if filename not in batch_provers]
+            removed = [filename for filename in removed if self.provers.pop(filename, None) is not None]
+            self.metrics.remove_plots(removed)
+            self.provers.update(batch_provers)
+            if batch_changed or len(removed) > 0:
+                self._update_plot_ids()
+                changed = True
+            no_key_filenames.update(batch_no_key_filenames)
+            total_size += batch_size
+
+        # The plots that are not in the plot directories anymore
+        all_filenames_set: Set[Path] = set(all_filenames)
+        for filename in [filename for filename in self.provers.keys() if filename not in all_filenames_set]:
+            del self.provers[filename]
+            self.metrics.remove_plots([filename])
+            changed = True
+        self._update_plot_ids()
+        self.no_key_filenames = no_key_filenames
+        if self._is_shutdown:
+            return changed
+        self.plot_metadata_cache.keep_only(all_filenames)
+        await loop.run_in_executor(self.executor, self.plot_metadata_cache.save)
+
+        self.log.info(
+            f"Loaded a total of {len(self.provers)} plots of size {total_size / (1024 ** 4)} TiB, in"
+            f" {time.time() - start_time} seconds"
+        )
+        return changed
+
+    def _update_plot_ids(self) -> None:
+        # Replaced together, so that the indexes of the plot ids always match the filenames
+        plot_filenames: List[Path] = list(self.provers.keys())
+        self.plot_ids = b"".join(self.provers[filename].plot_id for filename in plot_filenames)
+        self.plot_filenames = plot_filenames
+
     def delete_plot(self, str_path: str):
         path = Path(str_path).resolve()
         if path in self.provers:
             del self.provers[path]
+            self._update_plot_ids()
+        self.metrics.remove_plots([path])
 
         # Remove absolute and relative paths
         if path.exists():
@@ -1,7 +1,7 @@
 import asyncio
 import time
 from pathlib import Path
-from typing import Callable, List, Tuple
+from typing import Callable, List, Optional, Tuple
 
 from blspy import AugSchemeMPL, G2Element
 
@@ -9,7 +9,9 @@ from src.consensus.pot_iterations import (
     calculate_sp_interval_iters,
     calculate_iterations_quality,
 )
+from src.harvester.disk_scheduler import FULL_PROOF_LOOKUP, QUALITY_LOOKUP
 from src.harvester.harvester import Harvester
+from src.harvester.harvester_metrics import run_timed
 from src.plotting.plot_tools import PlotInfo
 from src.protocols import harvester_protocol
 from src.protocols.farmer_protocol import FarmingInfo
@@ -19,7 +21,7 @@ from src.server.ws_connection import WSChiaConnection
 from src.types.blockchain_format.proof_of_space import ProofOfSpace
 from src.types.blockchain_format.sized_bytes import bytes32
 from src.util.api_decorators import api_request, peer_required
-from src.util.ints import uint8, uint64, uint32
+from src.util.ints import uint64, uint32
 
 
 class HarvesterAPI:
@@ -73,36 +75,28 @@ class HarvesterAPI:
         start = time.time()
         assert len(new_challenge.challenge_hash) == 32
 
-        # Refresh plots to see if there are any new ones
-        if start - self.harvester.last_load_time > 120:
-            await self.harvester.refresh_plots()
-            self.harvester.last_load_time = time.time()
-
         loop = asyncio.get_running_loop()
 
-        def blocking_lookup(filename: Path, plot_info: PlotInfo) -> List[Tuple[bytes32, ProofOfSpace]]:
+        def blocking_lookup_qualities(
+            filename: Path, plot_info: PlotInfo, sp_challenge_hash: bytes32
+        ) -> List[Tuple[int, bytes32]]:
             # Uses the DiskProver object to lookup qualities. This is a blocking call,
-            # so it should be run in a thread pool.
+            # so it should be run in a thread pool. Returns the qualities that need a full proof, with their index
             try:
-                sp_challenge_hash = ProofOfSpace.calculate_pos_challenge(
-                    plot_info.prover.get_id(),
-                    new_challenge.challenge_hash,
-                    new_challenge.sp_hash,
-                )
                 try:
                     quality_strings = plot_info.prover.get_qualities_for_challenge(sp_challenge_hash)
                 except Exception as e:
                     self.harvester.log.error(f"Error using prover object {e}")
                     return []
 
-                responses: List[Tuple[bytes32, ProofOfSpace]] = []
+                good_qualities: List[Tuple[int, bytes32]] = []
                 if quality_strings is not None:
                     # Found proofs of space (on average 1 is expected per plot)
                     for index, quality_str in enumerate(quality_strings):
                         required_iters: uint64 = calculate_iterations_quality(
                             self.harvester.constants.DIFFICULTY_CONSTANT_FACTOR,
                             quality_str,
-                            plot_info.prover.get_size(),
+                            plot_info.size,
                             new_challenge.difficulty,
                             new_challenge.sp_hash,
                         )
@@ -110,44 +104,75 @@ class HarvesterAPI:
                             self.harvester.constants, new_challenge.sub_slot_iters
                         )
                         if required_iters < sp_interval_iters:
-                            # Found a very good proof of space! will fetch the whole proof from disk,
-                            # then send to farmer
-                            try:
-                                proof_xs = plot_info.prover.get_full_proof(sp_challenge_hash, index)
-                            except RuntimeError:
-                                self.harvester.log.error(f"Exception fetching full proof for {filename}")
-                                continue
-
-                            plot_public_key = ProofOfSpace.generate_plot_public_key(
-                                plot_info.local_sk.get_g1(), plot_info.farmer_public_key
-                            )
-                            responses.append(
-                                (
-                                    quality_str,
-                                    ProofOfSpace(
-                                        sp_challenge_hash,
-                                        plot_info.pool_public_key,
-                                        plot_info.pool_contract_puzzle_hash,
-                                        plot_public_key,
-                                        uint8(plot_info.prover.get_size()),
-                                        proof_xs,
-                                    ),
-                                )
-                            )
-                return responses
+                            good_qualities.append((index, quality_str))
+                return good_qualities
             except Exception as e:
                 self.harvester.log.error(f"Unknown error: {e}")
                 return []
 
+        def blocking_lookup_proof(
+            filename: Path, plot_info: PlotInfo, sp_challenge_hash: bytes32, index: int
+        ) -> Optional[ProofOfSpace]:
+            # Found a very good proof of space! will fetch the whole proof from disk, then send to farmer
+            try:
+                try:
+                    proof_xs = plot_info.prover.get_full_proof(sp_challenge_hash, index)
+                except RuntimeError:
+                    self.harvester.log.error(f"Exception fetching full proof for {filename}")
+                    return None
+
+                return ProofOfSpace(
+                    sp_challenge_hash,
+                    plot_info.pool_public_key,
+                    plot_info.pool_contract_puzzle_hash,
+                    plot_info.plot_public_key,
+                    plot_info.size,
+                    proof_xs,
+                )
+            except Exception as e:
+                self.harvester.log.error(f"Unknown error: {e}")
+                return None
+
         async def lookup_challenge(filename: Path, plot_info: PlotInfo) -> List[harvester_protocol.NewProofOfSpace]:
-            # Executes a DiskProverLookup in a thread pool, and returns responses
+            # Executes a DiskProverLookup in the threads of the disk of the plot, and returns responses. The full
+            # proofs wait for the quality lookups of the other plots of the disk
             all_responses: List[harvester_protocol.NewProofOfSpace] = []
             if self.harvester._is_shutdown:
                 return []
-            proofs_of_space_and_q: List[Tuple[bytes32, ProofOfSpace]] = await loop.run_in_executor(
-                self.harvester.executor, blocking_lookup, filename, plot_info
+            sp_challenge_hash = ProofOfSpace.calculate_pos_challenge(
+                plot_info.plot_id,
+                new_challenge.challenge_hash,
+                new_challenge.sp_hash,
             )
-            for quality_str, proof_of_space in proofs_of_space_and_q:
+            disk_scheduler = self.harvester.disk_scheduler
+            good_qualities: List[Tuple[int, bytes32]]
+            good_qualities, quality_lookup_time = await disk_scheduler.run(
+                plot_info.device,
+                QUALITY_LOOKUP,
+                run_timed,
+                blocking_lookup_qualities,
+                filename,
+                plot_info,
+                sp_challenge_hash,
+            )
+            full_proof_times: List[float] = []
+            for index, quality_str in good_qualities:
+                if self.harvester._is_shutdown:
+                    return []
+                proof_of_space: Optional[ProofOfSpace]
+                proof_of_space, full_proof_time = await disk_scheduler.run(
+                    plot_info.device,
+                    FULL_PROOF_LOOKUP,
+                    run_timed,
+                    blocking_lookup_proof,
+                    filename,
+                    plot_info,
+                    sp_challenge_hash,
+                    index,
+                )
+                full_proof_times.append(full_proof_time)
+                if proof_of_space is None:
+                    continue
                 all_responses.append(
                     harvester_protocol.NewProofOfSpace(
                         new_challenge.challenge_hash,
@@ -157,26 +182,50 @@ class HarvesterAPI:
                         new_challenge.signage_point_index,
                     )
                 )
+            time_since_signage_point = time.time() - start
+            if self.harvester.metrics.add_plot_lookup(
+                filename, quality_lookup_time, full_proof_times, time_since_signage_point
+            ):
+                self.harvester.log.warning(
+                    f"The lookups of {filename} were done {time_since_signage_point:.5f} s after the signage point, "
+                    f"after the deadline of {self.harvester.metrics.lookup_deadline} s"
+                )
             return all_responses
 
+        if self.harvester._is_shutdown:
+            return
+
+        # The plots are checked for existence when they are refreshed, not at every signage point
+        plot_filenames: List[Path] = self.harvester.plot_filenames
+        plot_ids: bytes = self.harvester.plot_ids
+        total = len(plot_filenames)
+
+        # Passes the plot filter (does not check sp filter yet though, since we have not reached sp)
+        # This is being executed at the beginning of the slot
+        passed_indexes: List[int]
+        passed_indexes, filter_time = await loop.run_in_executor(
+            self.harvester.executor,
+            run_timed,
+            ProofOfSpace.passes_plot_filter_batch,
+            self.harvester.constants,
+            plot_ids,
+            new_challenge.challenge_hash,
+            new_challenge.sp_hash,
+        )
+
         awaitables = []
         passed = 0
-        total = 0
-        for try_plot_filename, try_plot_info in self.harvester.provers.items():
-            if try_plot_filename.exists():
-                # Passes the plot filter (does not check sp filter yet though, since we have not reached sp)
-                # This is being executed at the beginning of the slot
-                total += 1
-                if ProofOfSpace.passes_plot_filter(
-                    self.harvester.constants,
-                    try_plot_info.prover.get_id(),
-                    new_challenge.challenge_hash,
-                    new_challenge.sp_hash,
-                ):
-                    passed += 1
-                    awaitables.append(lookup_challenge(try_plot_filename, try_plot_info))
+        for index in passed_indexes:
+            try_plot_filename: Path = plot_filenames[index]
+            try_plot_info: Optional[PlotInfo] = self.harvester.provers.get(try_plot_filename)
+            if try_plot_info is None:
+                # Removed since the plot filter started
+                continue
+            passed += 1
+            awaitables.append(lookup_challenge(try_plot_filename, try_plot_info))
 
         # Concurrently executes all lookups on disk, to take advantage of multiple disk parallelism
+        missed_deadlines = self.harvester.metrics.missed_deadlines
         total_proofs_found = 0
         for sublist_awaitable in asyncio.as_completed(awaitables):
             for response in await sublist_awaitable:
@@ -192,12 +241,29 @@ class HarvesterAPI:
             uint32(passed),
             uint32(total_proofs_found),
             uint32(total),
+            uint64(int(filter_time * 1000000)),
         )
         pass_msg = make_msg(ProtocolMessageTypes.farming_info, farming_info)
         await peer.send_message(pass_msg)
+        signage_point_time = time.time() - start
+        self.harvester.metrics.add_signage_point(filter_time, signage_point_time)
+        self.harvester._state_changed(
+            "signage_point_metrics",
+            {
+                "challenge_hash": new_challenge.challenge_hash,
+                "sp_hash": new_challenge.sp_hash,
+                "filter_time": filter_time,
+                "signage_point_time": signage_point_time,
+                "passed_filter": passed,
+                "proofs": total_proofs_found,
+                "total_plots": total,
+                "missed_deadlines": self.harvester.metrics.missed_deadlines - missed_deadlines,
+                "total_missed_deadlines": self.harvester.metrics.missed_deadlines,
+            },
+        )
         self.harvester.log.info(
             f"{len(awaitables)} plots were eligible for farming {new_challenge.challenge_hash.hex()[:10]}..."
-            f" Found {total_proofs_found} proofs. Time: {time.time() - start:.5f} s. "
+            f" Found {total_proofs_found} proofs. Time: {signage_point_time:.5f} s, filter: {filter_time:.5f} s. "
             f"Total {len(self.harvester.provers)} plots"
         )
 
@@ -216,7 +282,7 @@ class HarvesterAPI:
             return
 
         local_sk = plot_info.local_sk
-        agg_pk = ProofOfSpace.generate_plot_public_key(local_sk.get_g1(), plot_info.farmer_public_key)
+        agg_pk = plot_info.plot_public_key
 
         # This is only a partial signature. When combined with the farmer's half, it will
         # form a complete PrependSignature.
@@ -0,0 +1,94 @@
+import bisect
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# Seconds after the signage point by which the lookups of a plot must be done, the farmer needs the proofs in time to
+# make a block
+DEFAULT_LOOKUP_DEADLINE = 5
+# Upper bounds of the buckets of the latency histograms, in seconds, the last bucket has the larger latencies
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30]
+
+
+def run_timed(function: Callable, *args) -> Tuple[Any, float]:
+    # Runs in the thread of the lookup, so that the time waiting for the thread is not counted
+    start = time.time()
+    result = function(*args)
+    return result, time.time() - start
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, latency: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, latency)] += 1
+        self.count += 1
+        self.total += latency
+
+    def to_json_dict(self) -> Dict:
+        return {"buckets": self.buckets, "counts": self.counts, "count": self.count, "sum": self.total}
+
+
+class HarvesterMetrics:
+    """
+    Latency histograms of the signage points of the harvester: the time of the plot filter of each signage point, and
+    the time of each quality and full proof lookup, without the wait for a thread of the disk. A plot lookup misses
+    the deadline if its proofs are found more than lookup_deadline seconds after the signage point was received, and
+    a plot is slow when its own lookups take longer than lookup_deadline.
+    """
+
+    def __init__(self, lookup_deadline: float):
+        self.lookup_deadline = lookup_deadline
+        self.signage_points = 0
+        self.filter_time = LatencyHistogram()
+        self.quality_lookup_time = LatencyHistogram()
+        self.full_proof_time = LatencyHistogram()
+        self.signage_point_time = LatencyHistogram()
+        self.plot_lookups = 0
+        self.missed_deadlines = 0
+        self.slow_lookups: Dict[Path, int] = {}
+
+    def add_plot_lookup(
+        self, filename: Path, quality_lookup_time: float, full_proof_times: List[float], time_since_signage_point: float
+    ) -> bool:
+        """
+        Adds the lookups of a plot that passed the filter, and returns whether they missed the deadline.
+        """
+        self.plot_lookups += 1
+        self.quality_lookup_time.add(quality_lookup_time)
+        for full_proof_time in full_proof_times:
+            self.full_proof_time.add(full_proof_time)
+        if quality_lookup_time + sum(full_proof_times) > self.lookup_deadline:
+            self.slow_lookups[filename] = self.slow_lookups.get(filename, 0) + 1
+        if time_since_signage_point > self.lookup_deadline:
+            self.missed_deadlines += 1
+            return True
+        return False
+
+    def remove_plots(self, filenames: Iterable[Path]) -> None:
+        # The plots that are not farmed anymore are not reported as slow
+        for filename in filenames:
+            self.slow_lookups.pop(filename, None)
+
+    def add_signage_point(self, filter_time: float, signage_point_time: float) -> None:
+        self.signage_points += 1
+        self.filter_time.add(filter_time)
+        self.signage_point_time.add(signage_point_time)
+
+    def to_json_dict(self) -> Dict:
+        slow_lookups: List[Tuple[Path, int]] = sorted(self.slow_lookups.items(), key=lambda item: -item[1])
+        return {
+            "lookup_deadline": self.lookup_deadline,
+            "signage_points": self.signage_points,
+            "plot_lookups": self.plot_lookups,
+            "missed_deadlines": self.missed_deadlines,
+            "filter_time": self.filter_time.to_json_dict(),
+            "quality_lookup_time": self.quality_lookup_time.to_json_dict(),
+            "full_proof_time": self.full_proof_time.to_json_dict(),
+            "signage_point_time": self.signage_point_time.to_json_dict(),
+            "slow_lookups": {str(filename): count for filename, count in slow_lookups},
+        }
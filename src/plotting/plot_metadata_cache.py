@@ -0,0 +1,134 @@
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from blspy import G1Element, PrivateKey
+from chiapos import DiskProver
+
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.ints import uint8, uint64
+from src.util.path import mkdir
+from src.util.streamable import Streamable, streamable
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+@streamable
+class PlotMetadata(Streamable):
+    """
+    What the harvester needs to farm a plot without opening it, from its header and the keys derived from its memo.
+    """
+
+    filename: str
+    file_size: uint64
+    time_modified: uint64  # st_mtime_ns of the file, the metadata is only used while the file is not modified
+    plot_id: bytes32
+    size: uint8
+    pool_public_key: Optional[G1Element]
+    pool_contract_puzzle_hash: Optional[bytes32]
+    farmer_public_key: G1Element
+    plot_public_key: G1Element
+    local_sk: PrivateKey
+
+
+@dataclass(frozen=True)
+@streamable
+class PlotMetadataList(Streamable):
+    plots: List[PlotMetadata]
+
+
+class LazyDiskProver:
+    """
+    Stands for the DiskProver of a plot with cached metadata, and only opens the plot the first time a challenge is
+    looked up in it.
+    """
+
+    def __init__(self, filename: str, plot_id: bytes32, size: uint8):
+        self.filename = filename
+        self.plot_id = plot_id
+        self.size = size
+        self.prover: Optional[DiskProver] = None
+        self.lock = threading.Lock()
+
+    def _open(self) -> DiskProver:
+        # The lookups run in threads
+        with self.lock:
+            if self.prover is None:
+                self.prover = DiskProver(self.filename)
+            return self.prover
+
+    def get_id(self) -> bytes32:
+        return self.plot_id
+
+    def get_size(self) -> uint8:
+        return self.size
+
+    def get_filename(self) -> str:
+        return self.filename
+
+    def get_memo(self) -> bytes:
+        return self._open().get_memo()
+
+    def get_qualities_for_challenge(self, challenge: bytes32):
+        return self._open().get_qualities_for_challenge(challenge)
+
+    def get_full_proof(self, challenge: bytes32, index: int):
+        return self._open().get_full_proof(challenge, index)
+
+
+class PlotMetadataCache:
+    """
+    The PlotMetadata of the plots that were loaded, by filename, saved in a file so that after a restart the plots
+    that did not change are farmed without reading their headers.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.plots: Dict[str, PlotMetadata] = {}
+        self.changed = False
+
+    def __len__(self) -> int:
+        return len(self.plots)
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            self.plots = {plot.filename: plot for plot in PlotMetadataList.from_bytes(self.path.read_bytes()).plots}
+        except Exception as e:
+            log.warning(f"Failed to load the plot metadata cache {self.path}, plots are opened again. {e}")
+            self.plots = {}
+        self.changed = False
+
+    def save(self) -> None:
+        if not self.changed:
+            return
+        mkdir(self.path.parent)
+        tmp_path = self.path.with_suffix("." + str(os.getpid()))
+        tmp_path.write_bytes(bytes(PlotMetadataList(list(self.plots.values()))))
+        shutil.move(str(tmp_path), self.path)
+        self.changed = False
+
+    def get(self, filename: Path, stat_info: os.stat_result) -> Optional[PlotMetadata]:
+        plot: Optional[PlotMetadata] = self.plots.get(str(filename))
+        if plot is None or plot.file_size != stat_info.st_size or plot.time_modified != stat_info.st_mtime_ns:
+            return None
+        return plot
+
+    def set(self, plot: PlotMetadata) -> None:
+        self.plots[plot.filename] = plot
+        self.changed = True
+
+    def keep_only(self, filenames: List[Path]) -> None:
+        """
+        Removes the plots that are not in filenames, the files that are not in the plot directories anymore.
+        """
+        filenames_str = set(str(filename) for filename in filenames)
+        for filename in [filename for filename in self.plots.keys() if filename not in filenames_str]:
+            del self.plots[filename]
+            self.changed = True
@@ -8,9 +8,11 @@ import logging
 import traceback
 
 from src.consensus.pos_quality import _expected_plot_size, UI_ACTUAL_SPACE_CONSTANT_FACTOR
+from src.plotting.plot_metadata_cache import LazyDiskProver, PlotMetadata, PlotMetadataCache
 from src.types.blockchain_format.proof_of_space import ProofOfSpace
 from src.types.blockchain_format.sized_bytes import bytes32
 from src.util.config import load_config, save_config
+from src.util.ints import uint8, uint64
 from src.wallet.derive_keys import master_sk_to_local_sk
 
 
@@ -19,7 +21,7 @@ log = logging.getLogger(__name__)
 
 @dataclass
 class PlotInfo:
-    prover: DiskProver
+    prover: Union[DiskProver, LazyDiskProver]
     pool_public_key: Optional[G1Element]
     pool_contract_puzzle_hash: Optional[bytes32]
     farmer_public_key: G1Element
@@ -27,6 +29,9 @@ class PlotInfo:
     local_sk: PrivateKey
     file_size: int
     time_modified: float
+    device: int  # st_dev of the file, the plots of a device are looked up in the same DiskQueue
+    plot_id: bytes32
+    size: uint8
 
 
 def _get_filenames(directory: Path) -> List[Path]:
@@ -134,37 +139,45 @@ def remove_plot_directory(str_path: str, root_path: Path) -> None:
     save_config(root_path, "config.yaml", config)
 
 
-def load_plots(
-    provers: Dict[Path, PlotInfo],
-    failed_to_open_filenames: Dict[Path, int],
-    farmer_public_keys: Optional[List[G1Element]],
-    pool_public_keys: Optional[List[G1Element]],
-    match_str: Optional[str],
-    show_memo: bool,
-    root_path: Path,
-    open_no_key_filenames=False,
-) -> Tuple[bool, Dict[Path, PlotInfo], Dict[Path, int], Set[Path]]:
-    start_time = time.time()
+def find_plot_filenames(root_path: Path, match_str: Optional[str]) -> List[Path]:
+    # Returns the plots in the plot directories of the config, that contain match_str if it is not None
     config_file = load_config(root_path, "config.yaml", "harvester")
-    changed = False
-    no_key_filenames: Set[Path] = set()
     log.info(f'Searching directories {config_file["plot_directories"]}')
 
     plot_filenames: Dict[Path, List[Path]] = get_plot_filenames(config_file)
     all_filenames: List[Path] = []
     for paths in plot_filenames.values():
         all_filenames += paths
-    total_size = 0
-    new_provers: Dict[Path, PlotInfo] = {}
-    plot_ids: Set[bytes32] = set()
 
     if match_str is not None:
         log.info(f'Only loading plots that contain "{match_str}" in the file or directory name')
+        all_filenames = [filename for filename in all_filenames if match_str in str(filename)]
+    return all_filenames
 
-    for filename in all_filenames:
-        filename_str = str(filename)
-        if match_str is not None and match_str not in filename_str:
-            continue
+
+def load_plot_batch(
+    filenames: List[Path],
+    provers: Dict[Path, PlotInfo],
+    failed_to_open_filenames: Dict[Path, int],
+    farmer_public_keys: Optional[List[G1Element]],
+    pool_public_keys: Optional[List[G1Element]],
+    show_memo: bool,
+    plot_ids: Set[bytes32],
+    plot_cache: Optional[PlotMetadataCache] = None,
+    open_no_key_filenames=False,
+) -> Tuple[bool, Dict[Path, PlotInfo], Set[Path], int]:
+    """
+    Loads the plots of filenames. The plots in provers that were not modified are kept, and the others are opened,
+    or farmed from their metadata in plot_cache, with a LazyDiskProver, if it has them. The plot ids of the loaded
+    plots are added to plot_ids, so that the copies of a plot in the next batches are not loaded.
+    Returns whether new plots were loaded, the plots, the plots with keys that are not ours, and the size of the plots.
+    """
+    changed = False
+    no_key_filenames: Set[Path] = set()
+    total_size = 0
+    new_provers: Dict[Path, PlotInfo] = {}
+
+    for filename in filenames:
         if filename.exists():
             if filename in failed_to_open_filenames and (time.time() - failed_to_open_filenames[filename]) < 1200:
                 # Try once every 20 minutes to open the file
@@ -178,13 +191,21 @@ def load_plots(
                 if stat_info.st_mtime == provers[filename].time_modified:
                     total_size += stat_info.st_size
                     new_provers[filename] = provers[filename]
-                    plot_ids.add(provers[filename].prover.get_id())
+                    plot_ids.add(provers[filename].plot_id)
                     continue
             try:
-                prover = DiskProver(str(filename))
+                stat_info = filename.stat()
+                cached_plot: Optional[PlotMetadata] = None
+                if plot_cache is not None:
+                    cached_plot = plot_cache.get(filename, stat_info)
+
+                prover: Union[DiskProver, LazyDiskProver]
+                if cached_plot is not None:
+                    prover = LazyDiskProver(str(filename), cached_plot.plot_id, cached_plot.size)
+                else:
+                    prover = DiskProver(str(filename))
 
                 expected_size = _expected_plot_size(prover.get_size()) * UI_ACTUAL_SPACE_CONSTANT_FACTOR
-                stat_info = filename.stat()
 
                 # TODO: consider checking if the file was just written to (which would mean that the file is still
                 # being copied). A segfault might happen in this edge case.
@@ -200,11 +221,25 @@ def load_plots(
                     log.warning(f"Have multiple copies of the plot {filename}, not adding it.")
                     continue
 
-                (
-                    pool_public_key_or_puzzle_hash,
-                    farmer_public_key,
-                    local_master_sk,
-                ) = parse_plot_info(prover.get_memo())
+                local_master_sk: Optional[PrivateKey] = None
+                if cached_plot is not None:
+                    pool_public_key = cached_plot.pool_public_key
+                    pool_contract_puzzle_hash = cached_plot.pool_contract_puzzle_hash
+                    farmer_public_key = cached_plot.farmer_public_key
+                else:
+                    (
+                        pool_public_key_or_puzzle_hash,
+                        farmer_public_key,
+                        local_master_sk,
+                    ) = parse_plot_info(prover.get_memo())
+
+                    if isinstance(pool_public_key_or_puzzle_hash, G1Element):
+                        pool_public_key = pool_public_key_or_puzzle_hash
+                        pool_contract_puzzle_hash = None
+                    else:
+                        assert isinstance(pool_public_key_or_puzzle_hash, bytes32)
+                        pool_public_key = None
+                        pool_contract_puzzle_hash = pool_public_key_or_puzzle_hash
 
                 # Only use plots that correct keys associated with them
                 if farmer_public_keys is not None and farmer_public_key not in farmer_public_keys:
@@ -213,14 +248,6 @@ def load_plots(
                     if not open_no_key_filenames:
                         continue
 
-                if isinstance(pool_public_key_or_puzzle_hash, G1Element):
-                    pool_public_key = pool_public_key_or_puzzle_hash
-                    pool_contract_puzzle_hash = None
-                else:
-                    assert isinstance(pool_public_key_or_puzzle_hash, bytes32)
-                    pool_public_key = None
-                    pool_contract_puzzle_hash = pool_public_key_or_puzzle_hash
-
                 if (
                     pool_public_keys is not None
                     and pool_public_key is not None
@@ -231,9 +258,28 @@ def load_plots(
                     if not open_no_key_filenames:
                         continue
 
-                stat_info = filename.stat()
-                local_sk = master_sk_to_local_sk(local_master_sk)
-                plot_public_key: G1Element = ProofOfSpace.generate_plot_public_key(local_sk.get_g1(), farmer_public_key)
+                if cached_plot is not None:
+                    local_sk = cached_plot.local_sk
+                    plot_public_key = cached_plot.plot_public_key
+                else:
+                    assert local_master_sk is not None
+                    local_sk = master_sk_to_local_sk(local_master_sk)
+                    plot_public_key = ProofOfSpace.generate_plot_public_key(local_sk.get_g1(), farmer_public_key)
+                    if plot_cache is not None:
+                        plot_cache.set(
+                            PlotMetadata(
+                                str(filename),
+                                uint64(stat_info.st_size),
+                                uint64(stat_info.st_mtime_ns),
+                                prover.get_id(),
+                                uint8(prover.get_size()),
+                                pool_public_key,
+                                pool_contract_puzzle_hash,
+                                farmer_public_key,
+                                plot_public_key,
+                                local_sk,
+                            )
+                        )
                 new_provers[filename] = PlotInfo(
                     prover,
                     pool_public_key,
@@ -243,6 +289,9 @@ def load_plots(
                     local_sk,
                     stat_info.st_size,
                     stat_info.st_mtime,
+                    stat_info.st_dev,
+                    prover.get_id(),
+                    uint8(prover.get_size()),
                 )
                 plot_ids.add(prover.get_id())
                 total_size += stat_info.st_size
@@ -252,9 +301,9 @@ def load_plots(
                 log.error(f"Failed to open file {filename}. {e} {tb}")
                 failed_to_open_filenames[filename] = int(time.time())
                 continue
-            log.info(f"Found plot {filename} of size {new_provers[filename].prover.get_size()}")
+            log.info(f"Found plot {filename} of size {new_provers[filename].size}")
 
-            if show_memo:
+            if show_memo and local_master_sk is not None:
                 plot_memo: bytes32
                 if pool_contract_puzzle_hash is None:
                     plot_memo = stream_plot_info_pk(pool_public_key, farmer_public_key, local_master_sk)
@@ -263,6 +312,32 @@ def load_plots(
                 plot_memo_str: str = plot_memo.hex()
                 log.info(f"Memo: {plot_memo_str}")
 
+    return changed, new_provers, no_key_filenames, total_size
+
+
+def load_plots(
+    provers: Dict[Path, PlotInfo],
+    failed_to_open_filenames: Dict[Path, int],
+    farmer_public_keys: Optional[List[G1Element]],
+    pool_public_keys: Optional[List[G1Element]],
+    match_str: Optional[str],
+    show_memo: bool,
+    root_path: Path,
+    open_no_key_filenames=False,
+) -> Tuple[bool, Dict[Path, PlotInfo], Dict[Path, int], Set[Path]]:
+    start_time = time.time()
+    all_filenames: List[Path] = find_plot_filenames(root_path, match_str)
+    changed, new_provers, no_key_filenames, total_size = load_plot_batch(
+        all_filenames,
+        provers,
+        failed_to_open_filenames,
+        farmer_public_keys,
+        pool_public_keys,
+        show_memo,
+        set(),
+        open_no_key_filenames=open_no_key_filenames,
+    )
+
     log.info(
         f"Loaded a total of {len(new_provers)} plots of size {total_size / (1024 ** 4)} TiB, in"
         f" {time.time()-start_time} seconds"
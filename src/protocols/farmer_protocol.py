@@ -58,6 +58,7 @@ class FarmingInfo(Streamable):
     passed: uint32
     proofs: uint32
     total_plots: uint32
+    filter_time: uint64  # Microseconds spent applying the plot filter to all the plots
 
 
 @dataclass(frozen=True)
@@ -31,6 +31,9 @@ class FullNodeRpcApi:
             "/get_additions_and_removals": self.get_additions_and_removals,
             "/get_blocks": self.get_blocks,
             "/get_initial_freeze_period": self.get_initial_freeze_period,
+            "/get_coin_cache_metrics": self.get_coin_cache_metrics,
+            "/get_tx_pre_validation_metrics": self.get_tx_pre_validation_metrics,
+            "/get_signature_verification_metrics": self.get_signature_verification_metrics,
         }
 
     async def _state_changed(self, change: str) -> List[Dict]:
@@ -289,14 +292,30 @@ class FullNodeRpcApi:
         block: Optional[FullBlock] = await self.service.block_store.get_full_block(header_hash)
         if block is None:
             raise ValueError(f"Block {header_hash.hex()} not found")
-        reward_additions = block.get_included_reward_coins()
-
-        # TODO: optimize
-        tx_removals, tx_additions = block.tx_removals_and_additions()
+        coin_changes = await self.service.block_store.get_coin_changes(block)
         removal_records = []
         addition_records = []
-        for tx_removal in tx_removals:
+        for tx_removal in coin_changes.removals:
             removal_records.append(await self.service.coin_store.get_coin_record(tx_removal))
-        for tx_addition in tx_additions + list(reward_additions):
+        for tx_addition in coin_changes.additions + coin_changes.reward_coins:
             addition_records.append(await self.service.coin_store.get_coin_record(tx_addition.name()))
         return {"additions": addition_records, "removals": removal_records}
+
+    async def get_coin_cache_metrics(self, _request: Dict) -> Optional[Dict]:
+        """
+        Returns the size, capacity, and hit, miss and eviction counts of the coin record cache.
+        """
+        return {"coin_cache_metrics": self.service.coin_store.get_cache_metrics()}
+
+    async def get_tx_pre_validation_metrics(self, _request: Dict) -> Optional[Dict]:
+        """
+        Returns the queue depth, the counts and the latency of the pre-validation of incoming transactions.
+        """
+        return {"tx_pre_validation_metrics": self.service.mempool_manager.get_pre_validation_metrics()}
+
+    async def get_signature_verification_metrics(self, _request: Dict) -> Optional[Dict]:
+        """
+        Returns the queue depth, the counts and the latency of the signature verification, and the hit and miss
+        counts of its cache of verified signatures.
+        """
+        return {"signature_verification_metrics": self.service.blockchain.signature_verifier.get_metrics()}
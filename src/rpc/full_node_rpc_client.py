@@ -88,6 +88,18 @@ class FullNodeRpcClient(RpcClient):
             additions.append(CoinRecord.from_json_dict(coin_record))
         return additions, removals
 
+    async def get_coin_cache_metrics(self) -> Dict:
+        response = await self.fetch("get_coin_cache_metrics", {})
+        return response["coin_cache_metrics"]
+
+    async def get_tx_pre_validation_metrics(self) -> Dict:
+        response = await self.fetch("get_tx_pre_validation_metrics", {})
+        return response["tx_pre_validation_metrics"]
+
+    async def get_signature_verification_metrics(self) -> Dict:
+        response = await self.fetch("get_signature_verification_metrics", {})
+        return response["signature_verification_metrics"]
+
     async def get_block_records(self, start: int, end: int) -> List:
         try:
             response = await self.fetch("get_block_records", {"start": start, "end": end})
@@ -17,13 +17,18 @@ class HarvesterRpcApi:
             "/add_plot_directory": self.add_plot_directory,
             "/get_plot_directories": self.get_plot_directories,
             "/remove_plot_directory": self.remove_plot_directory,
+            "/get_disk_metrics": self.get_disk_metrics,
+            "/get_harvester_metrics": self.get_harvester_metrics,
         }
 
-    async def _state_changed(self, change: str) -> List[Dict]:
+    async def _state_changed(self, change: str, change_data: Dict) -> List[Dict]:
         if change == "plots":
             data = await self.get_plots({})
             payload = create_payload("get_plots", data, self.service_name, "wallet_ui", string=False)
             return [payload]
+        elif change == "signage_point_metrics":
+            payload = create_payload("signage_point_metrics", change_data, self.service_name, "wallet_ui", string=False)
+            return [payload]
         return []
 
     async def get_plots(self, request: Dict) -> Dict:
@@ -59,3 +64,9 @@ class HarvesterRpcApi:
         if await self.service.remove_plot_directory(directory_name):
             return {}
         raise ValueError(f"Did not remove plot directory {directory_name}")
+
+    async def get_disk_metrics(self, request: Dict) -> Dict:
+        return {"disk_metrics": self.service.get_disk_metrics()}
+
+    async def get_harvester_metrics(self, request: Dict) -> Dict:
+        return {"harvester_metrics": self.service.metrics.to_json_dict()}
@@ -28,3 +28,9 @@ class HarvesterRpcClient(RpcClient):
 
     async def remove_plot_directory(self, dirname: str) -> bool:
         return (await self.fetch("remove_plot_directory", {"dirname": dirname}))["success"]
+
+    async def get_disk_metrics(self) -> List[Dict]:
+        return (await self.fetch("get_disk_metrics", {}))["disk_metrics"]
+
+    async def get_harvester_metrics(self) -> Dict:
+        return (await self.fetch("get_harvester_metrics", {}))["harvester_metrics"]
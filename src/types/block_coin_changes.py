@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+from typing import List
+
+from src.types.blockchain_format.coin import Coin
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.streamable import Streamable, streamable
+
+
+@dataclass(frozen=True)
+@streamable
+class BlockCoinChanges(Streamable):
+    """
+    The coins spent and created by the transactions of a block, which take running its transactions generator to
+    compute, and its reward coins.
+    """
+
+    removals: List[bytes32]
+    additions: List[Coin]
+    reward_coins: List[Coin]
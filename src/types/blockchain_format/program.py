@@ -2,6 +2,7 @@ import io
 from typing import List, Optional, Set, Tuple
 
 from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.buffer_reader import BufferReader
 from src.util.hash import std_hash
 
 from clvm import run_program as default_run_program, SExp
@@ -38,6 +39,9 @@ class Program(SExp):
 
     @classmethod
     def parse(cls, f):
+        if isinstance(f, BufferReader):
+            # clvm deserialization expects bytes from read(), so copy out just this program
+            f = io.BytesIO(bytes(f.read(serialized_length(f.peek()))))
         return sexp_from_stream(f, cls.to)
 
     def stream(self, f):
@@ -118,6 +122,48 @@ def _tree_hash(node: SExp, precalculated: Set[bytes32]) -> bytes32:
     return bytes32(std_hash(s))
 
 
+MAX_SINGLE_BYTE = 0x7F
+CONS_BOX_MARKER = 0xFF
+
+
+def serialized_length(buf: memoryview) -> int:
+    """
+    Returns the length of the serialized clvm program at the start of buf, without copying or deserializing it.
+    """
+    ops = 1
+    pos = 0
+    while ops > 0:
+        ops -= 1
+        if pos >= len(buf):
+            raise ValueError("bad encoding")
+        b = buf[pos]
+        pos += 1
+        if b == CONS_BOX_MARKER:
+            ops += 2
+            continue
+        if b == 0x80 or b <= MAX_SINGLE_BYTE:
+            continue
+        bit_count = 0
+        bit_mask = 0x80
+        while b & bit_mask:
+            bit_count += 1
+            b &= 0xFF ^ bit_mask
+            bit_mask >>= 1
+        size_blob = bytes([b])
+        if bit_count > 1:
+            if pos + bit_count - 1 > len(buf):
+                raise ValueError("bad encoding")
+            size_blob += bytes(buf[pos : pos + bit_count - 1])
+            pos += bit_count - 1
+        size = int.from_bytes(size_blob, "big")
+        if size >= 0x400000000:
+            raise ValueError("blob too large")
+        if pos + size > len(buf):
+            raise ValueError("bad encoding")
+        pos += size
+    return pos
+
+
 def _serialize(node) -> bytes:
     if type(node) == SerializedProgram:
         return bytes(node)
@@ -134,6 +180,8 @@ class SerializedProgram:
 
     @classmethod
     def parse(cls, f) -> "SerializedProgram":
+        if isinstance(f, BufferReader):
+            return SerializedProgram.from_bytes(f.read(serialized_length(f.peek())))
         tmp = sexp_buffer_from_stream(f)
         return SerializedProgram.from_bytes(tmp)
 
@@ -1,6 +1,7 @@
+import hashlib
 import logging
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
 
 from bitstring import BitArray
 from blspy import G1Element
@@ -80,6 +81,31 @@ class ProofOfSpace(Streamable):
         )
         return plot_filter[: constants.NUMBER_ZERO_BITS_PLOT_FILTER].uint == 0
 
+    @staticmethod
+    def passes_plot_filter_batch(
+        constants: ConsensusConstants,
+        plot_ids: bytes,
+        challenge_hash: bytes32,
+        signage_point: bytes32,
+    ) -> List[int]:
+        """
+        Applies passes_plot_filter to plot_ids, the concatenation of 32 byte plot ids, and returns the indexes of the
+        plot ids that pass. The first bytes of the hashes are compared directly, instead of through a BitArray.
+        """
+        num_bits: int = constants.NUMBER_ZERO_BITS_PLOT_FILTER
+        num_bytes: int = (num_bits + 7) // 8
+        shift: int = num_bytes * 8 - num_bits
+        suffix: bytes = bytes(challenge_hash) + bytes(signage_point)
+        ids_view = memoryview(plot_ids)
+        sha256 = hashlib.sha256
+        passed: List[int] = []
+        for index in range(len(plot_ids) // 32):
+            # std_hash is a sha256
+            digest: bytes = sha256(ids_view[index * 32 : (index + 1) * 32].tobytes() + suffix).digest()
+            if int.from_bytes(digest[:num_bytes], "big") >> shift == 0:
+                passed.append(index)
+        return passed
+
     @staticmethod
     def calculate_plot_filter_input(plot_id: bytes32, challenge_hash: bytes32, signage_point: bytes32) -> bytes32:
         return std_hash(plot_id + challenge_hash + signage_point)
@@ -3,6 +3,7 @@ from typing import Tuple, List, Optional, Set
 
 from chiabip158 import PyBIP158
 
+from src.types.block_coin_changes import BlockCoinChanges
 from src.types.header_block import HeaderBlock
 from src.types.name_puzzle_condition import NPC
 from src.types.blockchain_format.coin import Coin
@@ -60,22 +61,18 @@ class FullBlock(Streamable):
     def is_transaction_block(self):
         return self.foliage_transaction_block is not None
 
-    def get_block_header(self) -> HeaderBlock:
+    def get_block_header(self, coin_changes: Optional[BlockCoinChanges] = None) -> HeaderBlock:
+        """
+        The filter of a transaction block is built from its coin changes, which must be given, so the generator is
+        never run here. Use get_coin_changes, with the NPC list of the generator if it already ran.
+        """
         # Create filter
         if self.is_transaction_block():
-            byte_array_tx: List[bytes32] = []
-            removals_names, addition_coins = self.tx_removals_and_additions()
-
-            for coin in addition_coins:
-                byte_array_tx.append(bytearray(coin.puzzle_hash))
-            for name in removals_names:
-                byte_array_tx.append(bytearray(name))
-
-            for coin in self.get_included_reward_coins():
-                byte_array_tx.append(bytearray(coin.puzzle_hash))
-
-            bip158: PyBIP158 = PyBIP158(byte_array_tx)
-            encoded_filter: bytes = bytes(bip158.GetEncoded())
+            if coin_changes is None:
+                raise ValueError(f"The coin changes of transaction block {self.header_hash} are needed for its filter")
+            encoded_filter: bytes = encoded_transactions_filter(
+                coin_changes.removals, coin_changes.additions, set(coin_changes.reward_coins)
+            )
         else:
             encoded_filter = b""
 
@@ -119,21 +116,66 @@ class FullBlock(Streamable):
         This call assumes that this block has been validated already,
         get_name_puzzle_conditions should not return error here
         """
-        removals: List[bytes32] = []
-        additions: List[Coin] = []
+        return tx_removals_and_additions(self.transactions_generator)
 
-        if self.transactions_generator is not None:
-            # This should never throw here, block must be valid if it comes to here
-            err, npc_list, cost = get_name_puzzle_conditions(self.transactions_generator, False)
-            # build removals list
-            if npc_list is None:
-                return [], []
-            for npc in npc_list:
-                removals.append(npc.coin_name)
+    def get_coin_changes(self, npc_list: Optional[List[NPC]] = None) -> BlockCoinChanges:
+        """
+        Returns the removals, additions and reward coins of the block. If the NPC list of the transactions generator
+        is given, the generator is not run again.
+        """
+        if npc_list is None:
+            removals, additions = self.tx_removals_and_additions()
+        else:
+            removals = [npc.coin_name for npc in npc_list]
+            additions = additions_for_npc(npc_list)
+        return BlockCoinChanges(removals, additions, reward_coins_list(self.transactions_info))
+
+
+def tx_removals_and_additions(generator: Optional[SerializedProgram]) -> Tuple[List[bytes32], List[Coin]]:
+    removals: List[bytes32] = []
+    additions: List[Coin] = []
+
+    if generator is not None:
+        # This should never throw here, block must be valid if it comes to here
+        err, npc_list, cost = get_name_puzzle_conditions(generator, False)
+        # build removals list
+        if npc_list is None:
+            return [], []
+        for npc in npc_list:
+            removals.append(npc.coin_name)
+
+        additions.extend(additions_for_npc(npc_list))
+
+    return removals, additions
+
+
+def reward_coins_list(transactions_info: Optional[TransactionsInfo]) -> List[Coin]:
+    """
+    Returns the reward coins included in a block, without duplicates, in the order of the block.
+    """
+    if transactions_info is None:
+        return []
+    return list(dict.fromkeys(transactions_info.reward_claims_incorporated))
+
+
+def encoded_transactions_filter(
+    removals_names: List[bytes32], addition_coins: List[Coin], reward_coins: Set[Coin]
+) -> bytes:
+    """
+    Returns the BIP158 filter of a transaction block, as included in its header block.
+    """
+    byte_array_tx: List[bytes32] = []
+
+    for coin in addition_coins:
+        byte_array_tx.append(bytearray(coin.puzzle_hash))
+    for name in removals_names:
+        byte_array_tx.append(bytearray(name))
 
-            additions.extend(additions_for_npc(npc_list))
+    for coin in reward_coins:
+        byte_array_tx.append(bytearray(coin.puzzle_hash))
 
-        return removals, additions
+    bip158: PyBIP158 = PyBIP158(byte_array_tx)
+    return bytes(bip158.GetEncoded())
 
 
 def additions_for_npc(npc_list: List[NPC]) -> List[Coin]:
@@ -0,0 +1,160 @@
+import io
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from src.types.blockchain_format.coin import Coin
+from src.types.blockchain_format.foliage import Foliage, FoliageTransactionBlock, TransactionsInfo
+from src.types.blockchain_format.program import SerializedProgram
+from src.types.blockchain_format.reward_chain_block import RewardChainBlock
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.types.end_of_slot_bundle import EndOfSubSlotBundle
+from src.types.block_coin_changes import BlockCoinChanges
+from src.types.full_block import (
+    FullBlock,
+    encoded_transactions_filter,
+    reward_coins_list,
+    tx_removals_and_additions,
+)
+from src.types.header_block import HeaderBlock
+from src.util.buffer_reader import BufferReader
+from src.util.hash import std_hash
+from src.util.ints import uint32
+from src.util.streamable import Streamable, stream_bytes
+
+FULL_BLOCK_FIELD_INDEX: Dict[str, int] = {f_name: i for i, (f_name, _, _) in enumerate(FullBlock.field_codecs())}
+TRANSACTIONS_INFO_INDEX = FULL_BLOCK_FIELD_INDEX["transactions_info"]
+TRANSACTIONS_GENERATOR_INDEX = FULL_BLOCK_FIELD_INDEX["transactions_generator"]
+
+
+class FullBlockView:
+    """
+    A read-only view over a serialized FullBlock, for callers that only need a few of its fields. The offsets of the
+    fields are recorded the first time the block is scanned up to them, and each field is only deserialized when it
+    is accessed. The blob must contain exactly one FullBlock, since the transactions generator (the last field) is
+    never scanned, it runs to the end of the blob.
+    """
+
+    def __init__(self, blob: bytes):
+        self.blob = blob
+        self.offsets: List[int] = [0]
+        self.values: Dict[int, Any] = {}
+
+    def field_range(self, index: int) -> Tuple[int, int]:
+        if index == TRANSACTIONS_GENERATOR_INDEX:
+            return self.field_range(index - 1)[1], len(self.blob)
+        if len(self.offsets) <= index + 1:
+            skip_functions = FullBlock.skip_functions()
+            f = BufferReader(self.blob, self.offsets[-1])
+            while len(self.offsets) <= index + 1:
+                skip_functions[len(self.offsets) - 1](f)
+                self.offsets.append(f.tell())
+        return self.offsets[index], self.offsets[index + 1]
+
+    def field_bytes(self, f_name: str) -> memoryview:
+        start, end = self.field_range(FULL_BLOCK_FIELD_INDEX[f_name])
+        return memoryview(self.blob)[start:end]
+
+    def get_field(self, f_name: str) -> Any:
+        index = FULL_BLOCK_FIELD_INDEX[f_name]
+        if index not in self.values:
+            start, _ = self.field_range(index)
+            parse_f = FullBlock.field_codecs()[index][1]
+            self.values[index] = parse_f(BufferReader(self.blob, start))
+        return self.values[index]
+
+    def get_nested_field(self, f_name: str, nested_cls: Type[Streamable], nested_f_name: str) -> Any:
+        """
+        Returns one field of a streamable field of the block, only parsing the fields that precede it.
+        """
+        index = FULL_BLOCK_FIELD_INDEX[f_name]
+        if index in self.values:
+            return getattr(self.values[index], nested_f_name)
+        f = BufferReader(self.blob, self.field_range(index)[0])
+        for (name, parse_f, _), skip_f in zip(nested_cls.field_codecs(), nested_cls.skip_functions()):
+            if name == nested_f_name:
+                return parse_f(f)
+            skip_f(f)
+        raise AttributeError(nested_f_name)
+
+    @property
+    def finished_sub_slots(self) -> List[EndOfSubSlotBundle]:
+        return self.get_field("finished_sub_slots")
+
+    @property
+    def reward_chain_block(self) -> RewardChainBlock:
+        return self.get_field("reward_chain_block")
+
+    @property
+    def foliage(self) -> Foliage:
+        return self.get_field("foliage")
+
+    @property
+    def foliage_transaction_block(self) -> Optional[FoliageTransactionBlock]:
+        return self.get_field("foliage_transaction_block")
+
+    @property
+    def transactions_info(self) -> Optional[TransactionsInfo]:
+        return self.get_field("transactions_info")
+
+    @property
+    def transactions_generator(self) -> Optional[SerializedProgram]:
+        if TRANSACTIONS_GENERATOR_INDEX not in self.values:
+            generator_bytes = self.field_bytes("transactions_generator")
+            if generator_bytes[0] == 0:
+                self.values[TRANSACTIONS_GENERATOR_INDEX] = None
+            elif generator_bytes[0] == 1:
+                self.values[TRANSACTIONS_GENERATOR_INDEX] = SerializedProgram.from_bytes(generator_bytes[1:])
+            else:
+                raise ValueError("Optional must be 0 or 1")
+        return self.values[TRANSACTIONS_GENERATOR_INDEX]
+
+    @property
+    def prev_header_hash(self) -> bytes32:
+        return self.get_nested_field("foliage", Foliage, "prev_block_hash")
+
+    @property
+    def height(self) -> uint32:
+        return self.get_nested_field("reward_chain_block", RewardChainBlock, "height")
+
+    @property
+    def header_hash(self) -> bytes32:
+        # The header hash is the hash of the serialized foliage, which is already in the blob
+        return std_hash(self.field_bytes("foliage"))
+
+    def is_transaction_block(self) -> bool:
+        return self.field_bytes("foliage_transaction_block")[0] == 1
+
+    def get_included_reward_coins(self) -> Set[Coin]:
+        if not self.is_transaction_block():
+            return set()
+        assert self.transactions_info is not None
+        return set(self.transactions_info.reward_claims_incorporated)
+
+    def tx_removals_and_additions(self) -> Tuple[List[bytes32], List[Coin]]:
+        return tx_removals_and_additions(self.transactions_generator)
+
+    def get_coin_changes(self) -> BlockCoinChanges:
+        removals, additions = self.tx_removals_and_additions()
+        return BlockCoinChanges(removals, additions, reward_coins_list(self.transactions_info))
+
+    def get_block_header(self, tx_filter: bool = True) -> HeaderBlock:
+        """
+        Builds the header block out of the serialized fields it shares with the full block, so the only field that is
+        decoded besides the header block itself is the transactions generator of transaction blocks, for the filter.
+        If tx_filter is False, the filter is left empty and the generator is not run at all.
+        """
+        if tx_filter and self.is_transaction_block():
+            removals_names, addition_coins = self.tx_removals_and_additions()
+            encoded_filter = encoded_transactions_filter(
+                removals_names, addition_coins, self.get_included_reward_coins()
+            )
+        else:
+            encoded_filter = b""
+        info_start, info_end = self.field_range(TRANSACTIONS_INFO_INDEX)
+        f = io.BytesIO()
+        f.write(memoryview(self.blob)[:info_start])
+        stream_bytes(encoded_filter, f)
+        f.write(memoryview(self.blob)[info_start:info_end])
+        return HeaderBlock.from_bytes(f.getvalue())
+
+    def full_block(self) -> FullBlock:
+        return FullBlock.from_bytes(self.blob)
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from concurrent.futures.process import BrokenProcessPool, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.types.blockchain_format.sized_bytes import bytes32
+
+log = logging.getLogger(__name__)
+
+
+class BatchMetrics:
+    def __init__(self):
+        self.processed = 0
+        self.deduplicated = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.max_queue_depth = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def add_batch(self, latencies: List[float]) -> None:
+        self.batches += 1
+        self.processed += len(latencies)
+        self.total_latency += sum(latencies)
+        self.max_latency = max([self.max_latency] + latencies)
+
+
+class BatchingExecutor:
+    """
+    Runs a function over batches of items in a pool of processes, without blocking the event loop. Items are queued,
+    and each worker sends all the waiting ones (up to batch_size) to its process in one call, so concurrent callers
+    share the overhead of the calls. An item that is already queued or being processed, with the same key, is not
+    processed again, its callers share the result. When the queue is full (queue_size, 0 for no limit), callers wait
+    for room. The function is called with args and the list of items, and returns one result per item, which
+    handle_result turns into the result of the callers of the item, or into their error by raising.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable[..., List[Any]],
+        handle_result: Callable[[Any, Any], Any],
+        args: Tuple = (),
+        num_workers: int = 1,
+        batch_size: int = 1,
+        queue_size: int = 0,
+    ):
+        self.name = name
+        self.function = function
+        self.handle_result = handle_result
+        self.args = args
+        self.num_workers = max(1, num_workers)
+        self.batch_size = max(1, batch_size)
+        self.queue_size = queue_size
+        self.pool = ProcessPoolExecutor(max_workers=self.num_workers)
+        self.in_flight: Dict[bytes32, asyncio.Future] = {}
+        self.metrics = BatchMetrics()
+        # Created on first use, in the event loop of the callers
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+
+    def _start(self) -> asyncio.Queue:
+        if self.queue is None:
+            self.queue = asyncio.Queue(self.queue_size)
+            self.workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+        return self.queue
+
+    async def submit(self, key: bytes32, item: Any, context: Any = None) -> Any:
+        """
+        Returns the result of the item, as given by handle_result(context, result). Item is sent to the processes, so
+        it must be picklable, context stays in this process.
+        """
+        future: Optional[asyncio.Future] = self.in_flight.get(key)
+        if future is not None:
+            self.metrics.deduplicated += 1
+        else:
+            queue = self._start()
+            future = asyncio.get_running_loop().create_future()
+            self.in_flight[key] = future
+            try:
+                await queue.put((key, item, context, time.time()))
+            except BaseException:
+                self.in_flight.pop(key, None)
+                future.cancel()
+                raise
+            self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, queue.qsize())
+        # A cancelled caller does not cancel the item for the other callers
+        return await asyncio.shield(future)
+
+    async def _worker(self) -> None:
+        assert self.queue is not None
+        while True:
+            batch: List[Tuple[bytes32, Any, Any, float]] = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            pool = self.pool
+            try:
+                results: List[Any] = await asyncio.get_running_loop().run_in_executor(
+                    pool, self.function, *self.args, [item for _, item, _, _ in batch]
+                )
+            except Exception as e:
+                # The items were not processed, so their callers get the error instead of a result
+                log.error(f"{self.name} of {len(batch)} items failed: {e}")
+                self.metrics.failed_batches += 1
+                for key, _, _, _ in batch:
+                    future = self.in_flight.pop(key, None)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                if isinstance(e, BrokenProcessPool) and pool is self.pool:
+                    # A process died, the next batches run in a new pool, the other workers may have replaced it already
+                    self.pool = ProcessPoolExecutor(max_workers=self.num_workers)
+                    pool.shutdown(wait=False)
+                continue
+            end_time = time.time()
+            for (key, _, context, _), result in zip(batch, results):
+                future = self.in_flight.pop(key, None)
+                try:
+                    value = self.handle_result(context, result)
+                except Exception as e:
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                    continue
+                if future is not None and not future.done():
+                    future.set_result(value)
+            self.metrics.add_batch([end_time - queued_time for _, _, _, queued_time in batch])
+            log.debug(f"{self.name} of {len(batch)} items done, {self.queue.qsize()} waiting")
+
+    def get_metrics(self) -> Dict:
+        processed = self.metrics.processed
+        return {
+            "workers": self.num_workers,
+            "queue_depth": 0 if self.queue is None else self.queue.qsize(),
+            "max_queue_depth": self.metrics.max_queue_depth,
+            "queue_size": self.queue_size,
+            "in_flight": len(self.in_flight),
+            "processed": processed,
+            "deduplicated": self.metrics.deduplicated,
+            "batches": self.metrics.batches,
+            "failed_batches": self.metrics.failed_batches,
+            "average_batch_size": processed / self.metrics.batches if self.metrics.batches > 0 else 0,
+            "average_latency": self.metrics.total_latency / processed if processed > 0 else 0,
+            "max_latency": self.metrics.max_latency,
+        }
+
+    def shut_down(self) -> None:
+        for worker in self.workers:
+            worker.cancel()
+        for future in self.in_flight.values():
+            future.cancel()
+        self.in_flight.clear()
+        self.pool.shutdown(wait=True)
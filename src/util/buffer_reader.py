@@ -0,0 +1,28 @@
+from typing import Union
+
+
+class BufferReader:
+    """
+    A read-only stream over a bytes-like object. read() returns memoryview slices of the underlying buffer instead of
+    copies, so parsers copy each leaf value at most once, when they build it. Starting at a non zero offset allows
+    parsing an object that lives inside a larger buffer (for example a block inside a message) without slicing it out.
+    """
+
+    def __init__(self, buf: Union[bytes, bytearray, memoryview], offset: int = 0):
+        self.view = memoryview(buf).cast("B")
+        self.offset = offset
+
+    def read(self, size: int = -1) -> memoryview:
+        start = self.offset
+        end = len(self.view) if size < 0 else min(start + size, len(self.view))
+        self.offset = end
+        return self.view[start:end]
+
+    def peek(self) -> memoryview:
+        """
+        Returns the unread part of the buffer, without advancing.
+        """
+        return self.view[self.offset :]
+
+    def tell(self) -> int:
+        return self.offset
@@ -28,7 +28,8 @@ def make_sized_bytes(size):
     def parse(cls, f: BinaryIO) -> Any:
         b = f.read(size)
         assert len(b) == size
-        return cls(b)
+        # The size is already checked, so build the value straight from the read buffer, copying it only once
+        return bytes.__new__(cls, b)  # type: ignore
 
     def stream(self, f):
         f.write(self)
@@ -0,0 +1,119 @@
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+import aiosqlite
+
+from src.full_node.block_store import BlockStore
+from src.full_node.coin_store import CoinStore
+from src.wallet.wallet_block_store import WalletBlockStore
+from src.wallet.wallet_coin_store import WalletCoinStore
+
+log = logging.getLogger(__name__)
+
+# Columns that were stored as hex text before version 29 of the databases, and are stored as blobs since
+HEX_COLUMNS: Dict[str, Set[str]] = {
+    "full_blocks": {"header_hash"},
+    "header_blocks": {"header_hash"},
+    "block_records": {"header_hash", "prev_hash", "weight", "total_iters"},
+    "coin_record": {"coin_name", "puzzle_hash", "coin_parent"},
+}
+
+
+def from_hex_column(value: Any) -> Any:
+    if isinstance(value, str):
+        return bytes.fromhex(value)
+    return value
+
+
+async def get_schema_names(connection: aiosqlite.Connection, object_type: str) -> List[str]:
+    """
+    Returns the names of the tables or indexes of the database, except the internal ones of sqlite.
+    """
+    cursor = await connection.execute(
+        "SELECT name from sqlite_master WHERE type=? AND name NOT LIKE 'sqlite_%'", (object_type,)
+    )
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return [row[0] for row in rows]
+
+
+async def copy_table(in_db: aiosqlite.Connection, out_db: aiosqlite.Connection, table: str, batch_size: int) -> int:
+    cursor = await in_db.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in await cursor.fetchall()]
+    await cursor.close()
+    hex_indexes = [i for i, column in enumerate(columns) if column in HEX_COLUMNS.get(table, set())]
+
+    insert_str = f'INSERT OR REPLACE INTO {table}({", ".join(columns)}) VALUES({"?, " * (len(columns) - 1)}?)'
+    copied = 0
+    cursor = await in_db.execute(f"SELECT {', '.join(columns)} from {table}")
+    while True:
+        rows = await cursor.fetchmany(batch_size)
+        if len(rows) == 0:
+            break
+        new_rows = []
+        for row in rows:
+            new_row = list(row)
+            for i in hex_indexes:
+                new_row[i] = from_hex_column(new_row[i])
+            new_rows.append(new_row)
+        out_cursor = await out_db.executemany(insert_str, new_rows)
+        await out_cursor.close()
+        copied += len(new_rows)
+    await cursor.close()
+    return copied
+
+
+async def migrate_db(in_path: Path, out_path: Path, batch_size: int = 10000) -> None:
+    """
+    Copies a full node or wallet database that stores hashes as hex text into a new database that stores them as
+    blobs. The tables of the block and coin stores are created by the stores themselves, the other tables are created
+    with the same schema as in the old database, and copied as they are.
+    """
+    if not in_path.exists():
+        raise ValueError(f"Database {in_path} does not exist")
+    if out_path.exists():
+        raise ValueError(f"Database {out_path} already exists, not overwriting it")
+
+    in_db = await aiosqlite.connect(in_path)
+    out_db = await aiosqlite.connect(out_path)
+    try:
+        in_tables = await get_schema_names(in_db, "table")
+        is_full_node_db = "full_blocks" in in_tables
+        if is_full_node_db:
+            await BlockStore.create(out_db)
+            await CoinStore.create(out_db)
+        else:
+            await WalletBlockStore.create(out_db)
+            await WalletCoinStore.create(out_db)
+
+        out_tables = await get_schema_names(out_db, "table")
+        out_indexes = await get_schema_names(out_db, "index")
+        cursor = await in_db.execute(
+            "SELECT type, name, sql from sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+        )
+        schema_rows = await cursor.fetchall()
+        await cursor.close()
+        for object_type, name, sql in schema_rows:
+            if object_type == "table" and name not in out_tables:
+                await out_db.execute(sql)
+
+        for table in in_tables:
+            log.info(f"Copying table {table}")
+            copied = await copy_table(in_db, out_db, table, batch_size)
+            await out_db.commit()
+            log.info(f"Copied {copied} rows of table {table}")
+
+        for object_type, name, sql in schema_rows:
+            if object_type == "index" and name not in out_indexes:
+                await out_db.execute(sql)
+        await out_db.commit()
+
+        if is_full_node_db and "header_blocks" not in in_tables:
+            # Databases created before header blocks were stored, the block store creates them when the table is missing
+            await out_db.execute("DROP TABLE header_blocks")
+            await out_db.commit()
+            await BlockStore.create(out_db)
+    finally:
+        await in_db.close()
+        await out_db.close()
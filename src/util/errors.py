@@ -133,6 +133,7 @@ class Err(Enum):
     NO_TRANSACTIONS_WHILE_SYNCING = 108
 
     INCOMPATIBLE_NETWORK_ID = 109
+    TOO_MANY_MEMPOOL_ANCESTORS = 110
 
 
 class ValidationError(Exception):
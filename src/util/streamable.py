@@ -6,7 +6,8 @@ import dataclasses
 import io
 import pprint
 from enum import Enum
-from typing import Any, BinaryIO, List, Type, get_type_hints, Dict, Tuple
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Type, Union, cast, get_type_hints
+from src.util.buffer_reader import BufferReader
 from src.util.byte_types import hexstr_to_bytes
 from src.types.blockchain_format.program import Program, SerializedProgram
 from src.util.hash import std_hash
@@ -120,6 +121,15 @@ def recurse_jsonify(d):
     return d
 
 
+# Field name, parse function and stream function for every field of a streamable class, in order.
+# These are resolved once per class, so (de)serialization does not have to inspect the type hints of every
+# field of every object.
+FIELD_CODECS_FOR_STREAMABLE_CLASS: Dict[Type, List[Tuple[str, Callable, Callable]]] = {}
+# Functions that move a stream past every field of a streamable class, without building the values. Only resolved for
+# classes that are actually skipped over.
+SKIP_FUNCTIONS_FOR_STREAMABLE_CLASS: Dict[Type, List[Callable]] = {}
+
+
 def streamable(cls: Any):
     """
     This is a decorator for class definitions. It applies the strictdataclass decorator,
@@ -147,126 +157,268 @@ def streamable(cls: Any):
     """
 
     cls1 = strictdataclass(cls)
-    return type(cls.__name__, (cls1, Streamable), {})
+    t = cast("Type[Streamable]", type(cls.__name__, (cls1, Streamable), {}))
+    try:
+        FIELD_CODECS_FOR_STREAMABLE_CLASS[t] = t.resolve_field_codecs()
+    except NameError:
+        # Annotations that refer to names which are not defined yet are resolved on first use instead
+        pass
+    return t
+
+
+def read_exactly(f: BinaryIO, size: int) -> Union[bytes, memoryview]:
+    # Streams such as BufferReader return memoryview slices, callers copy them only when building the leaf value
+    read_bytes = f.read(size)
+    assert read_bytes is not None and len(read_bytes) == size  # Checks for EOF
+    return read_bytes
+
+
+def parse_uint32(f: BinaryIO) -> uint32:
+    return uint32(int.from_bytes(read_exactly(f, 4), "big"))
+
+
+def parse_bool(f: BinaryIO) -> bool:
+    bool_byte = read_exactly(f, 1)
+    if bool_byte == b"\x00":
+        return False
+    elif bool_byte == b"\x01":
+        return True
+    else:
+        raise ValueError("Bool byte must be 0 or 1")
+
+
+def parse_optional(f: BinaryIO, parse_inner_type_f: Callable[[BinaryIO], Any]) -> Optional[Any]:
+    is_present_bytes = read_exactly(f, 1)
+    if is_present_bytes == b"\x00":
+        return None
+    elif is_present_bytes == b"\x01":
+        return parse_inner_type_f(f)
+    else:
+        raise ValueError("Optional must be 0 or 1")
+
+
+def parse_bytes(f: BinaryIO) -> bytes:
+    return bytes(read_exactly(f, parse_uint32(f)))
+
+
+def parse_list(f: BinaryIO, parse_inner_type_f: Callable[[BinaryIO], Any]) -> List[Any]:
+    return [parse_inner_type_f(f) for _ in range(parse_uint32(f))]
+
+
+def parse_tuple(f: BinaryIO, list_parse_inner_type_f: List[Callable[[BinaryIO], Any]]) -> Tuple[Any, ...]:
+    return tuple(parse_f(f) for parse_f in list_parse_inner_type_f)
+
+
+def parse_size_hints(f: BinaryIO, f_type: Type, bytes_to_read: int) -> Any:
+    return f_type.from_bytes(bytes(read_exactly(f, bytes_to_read)))
+
+
+def parse_str(f: BinaryIO) -> str:
+    return str(read_exactly(f, parse_uint32(f)), "utf-8")
+
+
+def skip_optional(f: BinaryIO, skip_inner_type_f: Callable[[BinaryIO], Any]) -> None:
+    if parse_bool(f):
+        skip_inner_type_f(f)
+
+
+def skip_list(f: BinaryIO, skip_inner_type_f: Callable[[BinaryIO], Any]) -> None:
+    for _ in range(parse_uint32(f)):
+        skip_inner_type_f(f)
+
+
+def skip_tuple(f: BinaryIO, list_skip_inner_type_f: List[Callable[[BinaryIO], Any]]) -> None:
+    for skip_f in list_skip_inner_type_f:
+        skip_f(f)
+
+
+def skip_bytes(f: BinaryIO) -> None:
+    read_exactly(f, parse_uint32(f))
+
+
+def stream_optional(stream_inner_type_f: Callable[[Any, BinaryIO], None], item: Any, f: BinaryIO) -> None:
+    if item is None:
+        f.write(b"\x00")
+    else:
+        f.write(b"\x01")
+        stream_inner_type_f(item, f)
+
+
+def stream_bytes(item: bytes, f: BinaryIO) -> None:
+    f.write(uint32(len(item)).to_bytes(4, "big"))
+    f.write(item)
+
+
+def stream_list(stream_inner_type_f: Callable[[Any, BinaryIO], None], item: Any, f: BinaryIO) -> None:
+    assert is_type_List(type(item))
+    f.write(uint32(len(item)).to_bytes(4, "big"))
+    for element in item:
+        stream_inner_type_f(element, f)
+
+
+def stream_tuple(list_stream_inner_type_f: List[Callable[[Any, BinaryIO], None]], item: Any, f: BinaryIO) -> None:
+    assert len(item) == len(list_stream_inner_type_f)
+    for i in range(len(item)):
+        list_stream_inner_type_f[i](item[i], f)
+
+
+def stream_str(item: str, f: BinaryIO) -> None:
+    str_bytes = item.encode("utf-8")
+    f.write(uint32(len(str_bytes)).to_bytes(4, "big"))
+    f.write(str_bytes)
+
+
+def stream_bool(item: bool, f: BinaryIO) -> None:
+    f.write(int(item).to_bytes(1, "big"))
 
 
 class Streamable:
     @classmethod
-    def parse_one_item(cls: Type[cls.__name__], f_type: Type, f: BinaryIO):  # type: ignore
+    def function_to_parse_one_item(cls, f_type: Type) -> Callable[[BinaryIO], Any]:
+        """
+        Returns a function that parses one item of type f_type, so the type only has to be inspected once.
+        """
         inner_type: Type
         if is_type_List(f_type):
             inner_type = get_args(f_type)[0]
-            full_list: List[inner_type] = []  # type: ignore
             # wjb assert inner_type != get_args(List)[0]  # type: ignore
-            list_size_bytes = f.read(4)
-            assert list_size_bytes is not None and len(list_size_bytes) == 4  # Checks for EOF
-            list_size: uint32 = uint32(int.from_bytes(list_size_bytes, "big"))
-            for list_index in range(list_size):
-                full_list.append(cls.parse_one_item(inner_type, f))  # type: ignore
-            return full_list
+            parse_inner_type_f = cls.function_to_parse_one_item(inner_type)
+            return lambda f: parse_list(f, parse_inner_type_f)
         if is_type_SpecificOptional(f_type):
             inner_type = get_args(f_type)[0]
-            is_present_bytes = f.read(1)
-            assert is_present_bytes is not None and len(is_present_bytes) == 1  # Checks for EOF
-            if is_present_bytes == bytes([0]):
-                return None
-            elif is_present_bytes == bytes([1]):
-                return cls.parse_one_item(inner_type, f)  # type: ignore
-            else:
-                raise ValueError("Optional must be 0 or 1")
+            parse_inner_type_f = cls.function_to_parse_one_item(inner_type)
+            return lambda f: parse_optional(f, parse_inner_type_f)
         if is_type_Tuple(f_type):
-            inner_types = get_args(f_type)
-            full_list = []
-            for inner_type in inner_types:
-                full_list.append(cls.parse_one_item(inner_type, f))  # type: ignore
-            return tuple(full_list)
+            list_parse_inner_type_f = [cls.function_to_parse_one_item(t) for t in get_args(f_type)]
+            return lambda f: parse_tuple(f, list_parse_inner_type_f)
         if f_type is bool:
-            bool_byte = f.read(1)
-            assert bool_byte is not None and len(bool_byte) == 1  # Checks for EOF
-            if bool_byte == bytes([0]):
-                return False
-            elif bool_byte == bytes([1]):
-                return True
-            else:
-                raise ValueError("Bool byte must be 0 or 1")
+            return parse_bool
         if f_type == bytes:
-            list_size_bytes = f.read(4)
-            assert list_size_bytes is not None and len(list_size_bytes) == 4  # Checks for EOF
-            list_size = uint32(int.from_bytes(list_size_bytes, "big"))
-            bytes_read = f.read(list_size)
-            assert bytes_read is not None and len(bytes_read) == list_size
-            return bytes_read
+            return parse_bytes
         if hasattr(f_type, "parse"):
-            return f_type.parse(f)
-        if hasattr(f_type, "from_bytes") and size_hints[f_type.__name__]:
+            return f_type.parse
+        if hasattr(f_type, "from_bytes") and f_type.__name__ in size_hints:
             bytes_to_read = size_hints[f_type.__name__]
-            bytes_read = f.read(bytes_to_read)
-            assert bytes_read is not None and len(bytes_read) == bytes_to_read
-            return f_type.from_bytes(bytes_read)
+            return lambda f: parse_size_hints(f, f_type, bytes_to_read)
         if f_type is str:
-            str_size_bytes = f.read(4)
-            assert str_size_bytes is not None and len(str_size_bytes) == 4  # Checks for EOF
-            str_size: uint32 = uint32(int.from_bytes(str_size_bytes, "big"))
-            str_read_bytes = f.read(str_size)
-            assert str_read_bytes is not None and len(str_read_bytes) == str_size  # Checks for EOF
-            return bytes.decode(str_read_bytes, "utf-8")
-        else:
+            return parse_str
+
+        def parse_unsupported(f: BinaryIO) -> Any:
             raise RuntimeError(f"Type {f_type} does not have parse")
 
-    @classmethod
-    def parse(cls: Type[cls.__name__], f: BinaryIO) -> cls.__name__:  # type: ignore
-        values = []
-        for _, f_type in get_type_hints(cls).items():
-            values.append(cls.parse_one_item(f_type, f))  # type: ignore
-        return cls(*values)
+        return parse_unsupported
 
-    def stream_one_item(self, f_type: Type, item, f: BinaryIO) -> None:
+    @classmethod
+    def function_to_stream_one_item(cls, f_type: Type) -> Callable[[Any, BinaryIO], None]:
+        """
+        Returns a function that streams one item of type f_type, so the type only has to be inspected once.
+        """
         inner_type: Type
         if is_type_List(f_type):
-            assert is_type_List(type(item))
-            f.write(uint32(len(item)).to_bytes(4, "big"))
             inner_type = get_args(f_type)[0]
             # wjb assert inner_type != get_args(List)[0]  # type: ignore
-            for element in item:
-                self.stream_one_item(inner_type, element, f)
-        elif is_type_SpecificOptional(f_type):
+            stream_inner_type_f = cls.function_to_stream_one_item(inner_type)
+            return lambda item, f: stream_list(stream_inner_type_f, item, f)
+        if is_type_SpecificOptional(f_type):
             inner_type = get_args(f_type)[0]
-            if item is None:
-                f.write(bytes([0]))
-            else:
-                f.write(bytes([1]))
-                self.stream_one_item(inner_type, item, f)
-        elif is_type_Tuple(f_type):
-            inner_types = get_args(f_type)
-            assert len(item) == len(inner_types)
-            for i in range(len(item)):
-                self.stream_one_item(inner_types[i], item[i], f)
-        elif f_type == bytes:
-            f.write(uint32(len(item)).to_bytes(4, "big"))
-            f.write(item)
-        elif hasattr(f_type, "stream"):
-            item.stream(f)
-        elif hasattr(f_type, "__bytes__"):
-            f.write(bytes(item))
-        elif f_type is str:
-            str_bytes = item.encode("utf-8")
-            f.write(uint32(len(str_bytes)).to_bytes(4, "big"))
-            f.write(str_bytes)
-        elif f_type is bool:
-            f.write(int(item).to_bytes(1, "big"))
-        else:
+            stream_inner_type_f = cls.function_to_stream_one_item(inner_type)
+            return lambda item, f: stream_optional(stream_inner_type_f, item, f)
+        if is_type_Tuple(f_type):
+            list_stream_inner_type_f = [cls.function_to_stream_one_item(t) for t in get_args(f_type)]
+            return lambda item, f: stream_tuple(list_stream_inner_type_f, item, f)
+        if f_type == bytes:
+            return stream_bytes
+        if hasattr(f_type, "stream"):
+            return lambda item, f: item.stream(f)
+        if hasattr(f_type, "__bytes__"):
+
+            def stream_bytes_of_item(item: Any, f: BinaryIO) -> None:
+                f.write(bytes(item))
+
+            return stream_bytes_of_item
+        if f_type is str:
+            return stream_str
+        if f_type is bool:
+            return stream_bool
+
+        def stream_unsupported(item: Any, f: BinaryIO) -> None:
             raise NotImplementedError(f"can't stream {item}, {f_type}")
 
+        return stream_unsupported
+
+    @classmethod
+    def function_to_skip_one_item(cls, f_type: Type) -> Callable[[BinaryIO], Any]:
+        """
+        Returns a function that moves a stream past one item of type f_type. Containers and streamable classes are
+        walked without building any values, other types are parsed and discarded.
+        """
+        if is_type_List(f_type):
+            skip_inner_type_f = cls.function_to_skip_one_item(get_args(f_type)[0])
+            return lambda f: skip_list(f, skip_inner_type_f)
+        if is_type_SpecificOptional(f_type):
+            skip_inner_type_f = cls.function_to_skip_one_item(get_args(f_type)[0])
+            return lambda f: skip_optional(f, skip_inner_type_f)
+        if is_type_Tuple(f_type):
+            list_skip_inner_type_f = [cls.function_to_skip_one_item(t) for t in get_args(f_type)]
+            return lambda f: skip_tuple(f, list_skip_inner_type_f)
+        if f_type == bytes or f_type is str:
+            return skip_bytes
+        if isinstance(f_type, type) and issubclass(f_type, Streamable):
+            return f_type.skip
+        return cls.function_to_parse_one_item(f_type)
+
+    @classmethod
+    def resolve_field_codecs(cls) -> List[Tuple[str, Callable, Callable]]:
+        return [
+            (f_name, cls.function_to_parse_one_item(f_type), cls.function_to_stream_one_item(f_type))
+            for f_name, f_type in get_type_hints(cls).items()
+        ]
+
+    @classmethod
+    def field_codecs(cls) -> List[Tuple[str, Callable, Callable]]:
+        codecs = FIELD_CODECS_FOR_STREAMABLE_CLASS.get(cls)
+        if codecs is None:
+            codecs = cls.resolve_field_codecs()
+            FIELD_CODECS_FOR_STREAMABLE_CLASS[cls] = codecs
+        return codecs
+
+    @classmethod
+    def skip_functions(cls) -> List[Callable]:
+        """
+        Returns one skip function per field, in the same order as field_codecs.
+        """
+        skip_functions = SKIP_FUNCTIONS_FOR_STREAMABLE_CLASS.get(cls)
+        if skip_functions is None:
+            skip_functions = [cls.function_to_skip_one_item(f_type) for f_type in get_type_hints(cls).values()]
+            SKIP_FUNCTIONS_FOR_STREAMABLE_CLASS[cls] = skip_functions
+        return skip_functions
+
+    @classmethod
+    def skip(cls, f: BinaryIO) -> None:
+        for skip_f in cls.skip_functions():
+            skip_f(f)
+
+    @classmethod
+    def parse_one_item(cls: Type[cls.__name__], f_type: Type, f: BinaryIO):  # type: ignore
+        return cls.function_to_parse_one_item(f_type)(f)
+
+    @classmethod
+    def parse(cls: Type[cls.__name__], f: BinaryIO) -> cls.__name__:  # type: ignore
+        return cls(*[parse_f(f) for _, parse_f, _ in cls.field_codecs()])
+
+    def stream_one_item(self, f_type: Type, item, f: BinaryIO) -> None:
+        self.function_to_stream_one_item(f_type)(item, f)
+
     def stream(self, f: BinaryIO) -> None:
-        for f_name, f_type in get_type_hints(self).items():  # type: ignore
-            self.stream_one_item(f_type, getattr(self, f_name), f)
+        for f_name, _, stream_f in self.field_codecs():
+            stream_f(getattr(self, f_name), f)
 
     def get_hash(self) -> bytes32:
         return bytes32(std_hash(bytes(self)))
 
     @classmethod
-    def from_bytes(cls: Any, blob: bytes) -> Any:
-        f = io.BytesIO(blob)
+    def from_bytes(cls: Any, blob: Union[bytes, memoryview]) -> Any:
+        f = BufferReader(blob)
         return cls.parse(f)
 
     def __bytes__(self: Any) -> bytes:
@@ -1,6 +1,6 @@
 import sys
 import dataclasses
-from typing import Any, List, Type, Union, get_type_hints, Tuple, Optional
+from typing import Any, Dict, List, Type, Union, get_type_hints, Tuple, Optional
 
 
 if sys.version_info < (3, 8):
@@ -17,6 +17,10 @@ else:
     from typing import get_args, get_origin
 
 
+# Type hints of every strictdataclass, resolved on first construction instead of on every construction
+TYPE_HINTS_FOR_STRICTDATACLASS: Dict[Type, Dict[str, Type]] = {}
+
+
 def is_type_List(f_type: Type) -> bool:
     return (get_origin(f_type) is not None and get_origin(f_type) == list) or f_type == list
 
@@ -81,7 +85,10 @@ def strictdataclass(cls: Any):
             return item
 
         def __post_init__(self):
-            fields = get_type_hints(self)
+            fields = TYPE_HINTS_FOR_STRICTDATACLASS.get(type(self))
+            if fields is None:
+                fields = get_type_hints(self)
+                TYPE_HINTS_FOR_STRICTDATACLASS[type(self)] = fields
             data = self.__dict__
             for (f_name, f_type) in fields.items():
                 if f_name not in data:
@@ -23,7 +23,7 @@ class WalletBlockStore:
         self.db = connection
 
         await self.db.execute(
-            "CREATE TABLE IF NOT EXISTS header_blocks(header_hash text PRIMARY KEY, height int,"
+            "CREATE TABLE IF NOT EXISTS header_blocks(header_hash blob PRIMARY KEY, height int,"
             " timestamp int, block blob)"
         )
 
@@ -36,7 +36,7 @@ class WalletBlockStore:
         # Block records
         await self.db.execute(
             "CREATE TABLE IF NOT EXISTS block_records(header_hash "
-            "text PRIMARY KEY, prev_hash text, height bigint, weight bigint, total_iters text,"
+            "blob PRIMARY KEY, prev_hash blob, height bigint, weight blob, total_iters blob,"
             "block blob, sub_epoch_summary blob, is_peak tinyint)"
         )
 
@@ -67,7 +67,7 @@ class WalletBlockStore:
         cursor = await self.db.execute(
             "INSERT OR REPLACE INTO header_blocks VALUES(?, ?, ?, ?)",
             (
-                header_block_record.header_hash.hex(),
+                header_block_record.header_hash,
                 header_block_record.height,
                 timestamp,
                 bytes(header_block_record),
@@ -78,11 +78,11 @@ class WalletBlockStore:
         cursor_2 = await self.db.execute(
             "INSERT OR REPLACE INTO block_records VALUES(?, ?, ?, ?, ?, ?, ?,?)",
             (
-                header_block_record.header.header_hash.hex(),
-                header_block_record.header.prev_header_hash.hex(),
+                header_block_record.header.header_hash,
+                header_block_record.header.prev_header_hash,
                 header_block_record.header.height,
-                header_block_record.header.weight.to_bytes(128 // 8, "big", signed=False).hex(),
-                header_block_record.header.total_iters.to_bytes(128 // 8, "big", signed=False).hex(),
+                header_block_record.header.weight.to_bytes(128 // 8, "big", signed=False),
+                header_block_record.header.total_iters.to_bytes(128 // 8, "big", signed=False),
                 bytes(block_record),
                 None
                 if block_record.sub_epoch_summary_included is None
@@ -96,7 +96,7 @@ class WalletBlockStore:
 
     async def get_header_block(self, header_hash: bytes32) -> Optional[HeaderBlock]:
         """Gets a block record from the database, if present"""
-        cursor = await self.db.execute("SELECT block from header_blocks WHERE header_hash=?", (header_hash.hex(),))
+        cursor = await self.db.execute("SELECT block from header_blocks WHERE header_hash=?", (header_hash,))
         row = await cursor.fetchone()
         await cursor.close()
         if row is not None:
@@ -118,7 +118,7 @@ class WalletBlockStore:
 
     async def get_header_block_record(self, header_hash: bytes32) -> Optional[HeaderBlockRecord]:
         """Gets a block record from the database, if present"""
-        cursor = await self.db.execute("SELECT block from header_blocks WHERE header_hash=?", (header_hash.hex(),))
+        cursor = await self.db.execute("SELECT block from header_blocks WHERE header_hash=?", (header_hash,))
         row = await cursor.fetchone()
         await cursor.close()
         if row is not None:
@@ -130,7 +130,7 @@ class WalletBlockStore:
     async def get_block_record(self, header_hash: bytes32) -> Optional[BlockRecord]:
         cursor = await self.db.execute(
             "SELECT block from block_records WHERE header_hash=?",
-            (header_hash.hex(),),
+            (header_hash,),
         )
         row = await cursor.fetchone()
         await cursor.close()
@@ -152,7 +152,7 @@ class WalletBlockStore:
         peak: Optional[bytes32] = None
         for row in rows:
             header_hash_bytes, block_record_bytes, is_peak = row
-            header_hash = bytes.fromhex(header_hash_bytes)
+            header_hash = bytes32(header_hash_bytes)
             ret[header_hash] = BlockRecord.from_bytes(block_record_bytes)
             if is_peak:
                 assert peak is None  # Sanity check, only one peak
@@ -164,7 +164,7 @@ class WalletBlockStore:
         await cursor_1.close()
         cursor_2 = await self.db.execute(
             "UPDATE block_records SET is_peak=1 WHERE header_hash=?",
-            (header_hash.hex(),),
+            (header_hash,),
         )
         await cursor_2.close()
         await self.db.commit()
@@ -183,7 +183,7 @@ class WalletBlockStore:
         if row is None:
             return {}, None
         header_hash_bytes, peak_height = row
-        peak: bytes32 = bytes32(bytes.fromhex(header_hash_bytes))
+        peak: bytes32 = bytes32(header_hash_bytes)
 
         formatted_str = f"SELECT header_hash, block from block_records WHERE height >= {peak_height - blocks_n}"
         cursor = await self.db.execute(formatted_str)
@@ -192,7 +192,7 @@ class WalletBlockStore:
         ret: Dict[bytes32, BlockRecord] = {}
         for row in rows:
             header_hash_bytes, block_record_bytes = row
-            header_hash = bytes.fromhex(header_hash_bytes)
+            header_hash = bytes32(header_hash_bytes)
             ret[header_hash] = BlockRecord.from_bytes(block_record_bytes)
         return ret, peak
 
@@ -210,7 +210,7 @@ class WalletBlockStore:
         ret: Dict[bytes32, HeaderBlock] = {}
         for row in rows:
             header_hash_bytes, block_record_bytes = row
-            header_hash = bytes.fromhex(header_hash_bytes)
+            header_hash = bytes32(header_hash_bytes)
             ret[header_hash] = HeaderBlock.from_bytes(block_record_bytes)
 
         return ret
@@ -233,7 +233,7 @@ class WalletBlockStore:
         ret: Dict[bytes32, BlockRecord] = {}
         for row in rows:
             header_hash_bytes, block_record_bytes = row
-            header_hash = bytes.fromhex(header_hash_bytes)
+            header_hash = bytes32(header_hash_bytes)
             ret[header_hash] = BlockRecord.from_bytes(block_record_bytes)
 
         return ret
@@ -250,7 +250,7 @@ class WalletBlockStore:
         if row is None:
             return {}, {}
 
-        peak: bytes32 = bytes.fromhex(row[0])
+        peak: bytes32 = bytes32(row[0])
         cursor = await self.db.execute("SELECT header_hash,prev_hash,height,sub_epoch_summary from block_records")
         rows = await cursor.fetchall()
         await cursor.close()
@@ -259,10 +259,10 @@ class WalletBlockStore:
         hash_to_summary: Dict[bytes32, SubEpochSummary] = {}
 
         for row in rows:
-            hash_to_prev_hash[bytes.fromhex(row[0])] = bytes.fromhex(row[1])
-            hash_to_height[bytes.fromhex(row[0])] = row[2]
+            hash_to_prev_hash[bytes32(row[0])] = bytes32(row[1])
+            hash_to_height[bytes32(row[0])] = row[2]
             if row[3] is not None:
-                hash_to_summary[bytes.fromhex(row[0])] = SubEpochSummary.from_bytes(row[3])
+                hash_to_summary[bytes32(row[0])] = SubEpochSummary.from_bytes(row[3])
 
         height_to_hash: Dict[uint32, bytes32] = {}
         sub_epoch_summaries: Dict[uint32, SubEpochSummary] = {}
@@ -1,11 +1,11 @@
 import asyncio
 import dataclasses
 import logging
-from concurrent.futures.process import ProcessPoolExecutor
 from enum import Enum
 import multiprocessing
 from typing import Dict, List, Optional, Tuple, Callable, Any, Set
 
+from src.consensus.ancestor_index import AncestorIndex
 from src.consensus.blockchain_interface import BlockchainInterface
 from src.consensus.constants import ConsensusConstants
 from src.consensus.difficulty_adjustment import (
@@ -14,7 +14,11 @@ from src.consensus.difficulty_adjustment import (
     get_sub_slot_iters_and_difficulty,
 )
 from src.consensus.full_block_to_block_record import block_to_block_record
-from src.consensus.multiprocess_validation import PreValidationResult, pre_validate_blocks_multiprocessing
+from src.consensus.multiprocess_validation import (
+    PreValidationPool,
+    PreValidationResult,
+    pre_validate_blocks_multiprocessing,
+)
 from src.types.header_block import HeaderBlock
 from src.types.blockchain_format.sized_bytes import bytes32
 from src.consensus.block_record import BlockRecord
@@ -58,6 +62,8 @@ class WalletBlockchain(BlockchainInterface):
     __height_to_hash: Dict[uint32, bytes32]
     # all hashes of blocks in block_record by height, used for garbage collection
     __heights_in_cache: Dict[uint32, Set[bytes32]]
+    # Skip pointers of the blocks in block_record, to find their ancestors in O(log n)
+    ancestor_index: AncestorIndex
     # All sub-epoch summaries that have been included in the blockchain from the beginning until and including the peak
     # (height_included, SubEpochSummary). Note: ONLY for the blocks in the path to the peak
     __sub_epoch_summaries: Dict[uint32, SubEpochSummary] = {}
@@ -66,7 +72,7 @@ class WalletBlockchain(BlockchainInterface):
     # Store
     block_store: WalletBlockStore
     # Used to verify blocks in parallel
-    pool: ProcessPoolExecutor
+    pool: PreValidationPool
 
     coins_of_interest_received: Any
     reorg_rollback: Any
@@ -96,10 +102,10 @@ class WalletBlockchain(BlockchainInterface):
         if cpu_count > 61:
             cpu_count = 61  # Windows Server 2016 has an issue https://bugs.python.org/issue26903
         num_workers = max(cpu_count - 2, 1)
-        self.pool = ProcessPoolExecutor(max_workers=num_workers)
-        log.info(f"Started {num_workers} processes for block validation")
         self.constants = consensus_constants
         self.constants_json = recurse_jsonify(dataclasses.asdict(self.constants))
+        self.pool = PreValidationPool(self.constants_json, num_workers)
+        log.info(f"Started {num_workers} processes for block validation")
         self.block_store = block_store
         self._shut_down = False
         self.coins_of_interest_received = coins_of_interest_received
@@ -110,7 +116,7 @@ class WalletBlockchain(BlockchainInterface):
 
     def shut_down(self):
         self._shut_down = True
-        self.pool.shutdown(wait=True)
+        self.pool.shut_down()
 
     async def _load_chain_from_store(self) -> None:
         """
@@ -121,8 +127,10 @@ class WalletBlockchain(BlockchainInterface):
         self.__sub_epoch_summaries = sub_epoch_summaries
         self.__block_records = {}
         self.__heights_in_cache = {}
+        self.ancestor_index = AncestorIndex()
         blocks, peak = await self.block_store.get_block_records_close_to_peak(self.constants.BLOCKS_CACHE_SIZE)
-        for block_record in blocks.values():
+        # Ordered by height, so the previous block of each block is indexed before it
+        for block_record in sorted(blocks.values(), key=lambda b: b.height):
             self.add_block_record(block_record)
 
         if len(blocks) == 0:
@@ -281,7 +289,7 @@ class WalletBlockchain(BlockchainInterface):
             if fork_point_with_peak is not None:
                 fork_h: int = fork_point_with_peak
             else:
-                fork_h = find_fork_point_in_chain(self, block_record, peak)
+                fork_h = await find_fork_point_in_chain(self, block_record, peak)
 
             # Rollback to fork
             self.log.debug(f"fork_h: {fork_h}, SB: {block_record.height}, peak: {peak.height}")
@@ -366,7 +374,7 @@ class WalletBlockchain(BlockchainInterface):
         self,
         blocks: List[HeaderBlock],
     ) -> Optional[List[PreValidationResult]]:
-        return await pre_validate_blocks_multiprocessing(self.constants, self.constants_json, self, blocks, self.pool)
+        return await pre_validate_blocks_multiprocessing(self.constants, self, blocks, self.pool)
 
     def contains_block(self, header_hash: bytes32) -> bool:
         """
@@ -428,6 +436,7 @@ class WalletBlockchain(BlockchainInterface):
         while blocks_to_remove is not None and height >= 0:
             for header_hash in blocks_to_remove:
                 del self.__block_records[header_hash]
+                self.ancestor_index.remove(header_hash)
             del self.__heights_in_cache[uint32(height)]  # remove height from heights in cache
 
             height -= 1
@@ -463,12 +472,23 @@ class WalletBlockchain(BlockchainInterface):
         sbr = self.block_record(header_hash)
         del self.__block_records[header_hash]
         self.__heights_in_cache[sbr.height].remove(header_hash)
+        self.ancestor_index.remove(header_hash)
 
     def add_block_record(self, block_record: BlockRecord):
         self.__block_records[block_record.header_hash] = block_record
         if block_record.height not in self.__heights_in_cache.keys():
             self.__heights_in_cache[block_record.height] = set()
         self.__heights_in_cache[block_record.height].add(block_record.header_hash)
+        self.ancestor_index.add(self, block_record)
+
+    def get_ancestor(self, header_hash: bytes32, height: uint32) -> BlockRecord:
+        return self.ancestor_index.get_ancestor(self, self.block_record(header_hash), height)
+
+    def try_get_ancestor(self, header_hash: bytes32, height: uint32) -> Optional[BlockRecord]:
+        block_record: Optional[BlockRecord] = self.try_block_record(header_hash)
+        if block_record is None:
+            return None
+        return self.ancestor_index.try_get_ancestor(self, block_record, height)
 
     async def get_header_block(self, header_hash: bytes32) -> Optional[HeaderBlock]:
         return await self.block_store.get_header_block(header_hash)
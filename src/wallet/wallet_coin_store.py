@@ -26,13 +26,13 @@ class WalletCoinStore:
         await self.db_connection.execute(
             (
                 "CREATE TABLE IF NOT EXISTS coin_record("
-                "coin_name text PRIMARY KEY,"
+                "coin_name blob PRIMARY KEY,"
                 " confirmed_height bigint,"
                 " spent_height bigint,"
                 " spent int,"
                 " coinbase int,"
-                " puzzle_hash text,"
-                " coin_parent text,"
+                " puzzle_hash blob,"
+                " coin_parent blob,"
                 " amount blob,"
                 " wallet_type int,"
                 " wallet_id int)"
@@ -81,13 +81,13 @@ class WalletCoinStore:
             cursor = await self.db_connection.execute(
                 "INSERT OR REPLACE INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
                 (
-                    record.coin.name().hex(),
+                    record.coin.name(),
                     record.confirmed_block_height,
                     record.spent_block_height,
                     int(record.spent),
                     int(record.coinbase),
-                    str(record.coin.puzzle_hash.hex()),
-                    str(record.coin.parent_coin_info.hex()),
+                    record.coin.puzzle_hash,
+                    record.coin.parent_coin_info,
                     bytes(record.coin.amount),
                     record.wallet_type,
                     record.wallet_id,
@@ -120,11 +120,11 @@ class WalletCoinStore:
         """ Returns CoinRecord with specified coin id. """
         if coin_name in self.coin_record_cache:
             return self.coin_record_cache[coin_name]
-        cursor = await self.db_connection.execute("SELECT * from coin_record WHERE coin_name=?", (coin_name.hex(),))
+        cursor = await self.db_connection.execute("SELECT * from coin_record WHERE coin_name=?", (coin_name,))
         row = await cursor.fetchone()
         await cursor.close()
         if row is not None:
-            coin = Coin(bytes32(bytes.fromhex(row[6])), bytes32(bytes.fromhex(row[5])), uint64.from_bytes(row[7]))
+            coin = Coin(bytes32(row[6]), bytes32(row[5]), uint64.from_bytes(row[7]))
             return WalletCoinRecord(coin, row[1], row[2], row[3], row[4], WalletType(row[8]), row[9])
         return None
 
@@ -178,7 +178,7 @@ class WalletCoinStore:
             await cursor.close()
             cache_dict = {}
             for row in rows:
-                coin = Coin(bytes32(bytes.fromhex(row[6])), bytes32(bytes.fromhex(row[5])), uint64.from_bytes(row[7]))
+                coin = Coin(bytes32(row[6]), bytes32(row[5]), uint64.from_bytes(row[7]))
                 coin_record = WalletCoinRecord(coin, row[1], row[2], row[3], row[4], WalletType(row[8]), row[9])
                 coin_set.add(coin_record)
                 cache_dict[coin.name()] = coin_record
@@ -194,7 +194,7 @@ class WalletCoinStore:
         rows = await cursor.fetchall()
         await cursor.close()
         for row in rows:
-            coin = Coin(bytes32(bytes.fromhex(row[6])), bytes32(bytes.fromhex(row[5])), uint64.from_bytes(row[7]))
+            coin = Coin(bytes32(row[6]), bytes32(row[5]), uint64.from_bytes(row[7]))
             coins.add(WalletCoinRecord(coin, row[1], row[2], row[3], row[4], WalletType(row[8]), row[9]))
         return coins
 
@@ -202,23 +202,23 @@ class WalletCoinStore:
     async def get_coin_records_by_puzzle_hash(self, puzzle_hash: bytes32) -> List[WalletCoinRecord]:
         """Returns a list of all coin records with the given puzzle hash"""
         coins = set()
-        cursor = await self.db_connection.execute("SELECT * from coin_record WHERE puzzle_hash=?", (puzzle_hash.hex(),))
+        cursor = await self.db_connection.execute("SELECT * from coin_record WHERE puzzle_hash=?", (puzzle_hash,))
         rows = await cursor.fetchall()
         await cursor.close()
         for row in rows:
-            coin = Coin(bytes32(bytes.fromhex(row[6])), bytes32(bytes.fromhex(row[5])), uint64.from_bytes(row[7]))
+            coin = Coin(bytes32(row[6]), bytes32(row[5]), uint64.from_bytes(row[7]))
             coins.add(WalletCoinRecord(coin, row[1], row[2], row[3], row[4], WalletType(row[8]), row[9]))
         return list(coins)
 
     async def get_coin_record_by_coin_id(self, coin_id: bytes32) -> Optional[WalletCoinRecord]:
         """Returns a coin records with the given name, if it exists"""
-        cursor = await self.db_connection.execute("SELECT * from coin_record WHERE coin_name=?", (coin_id.hex(),))
+        cursor = await self.db_connection.execute("SELECT * from coin_record WHERE coin_name=?", (coin_id,))
         row = await cursor.fetchone()
         await cursor.close()
         if row is None:
             return None
 
-        coin = Coin(bytes32(bytes.fromhex(row[6])), bytes32(bytes.fromhex(row[5])), uint64.from_bytes(row[7]))
+        coin = Coin(bytes32(row[6]), bytes32(row[5]), uint64.from_bytes(row[7]))
         coin_record = WalletCoinRecord(coin, row[1], row[2], row[3], row[4], WalletType(row[8]), row[9])
         return coin_record
 
@@ -713,7 +713,7 @@ class WalletStateManager:
             fork_h: int = fork_point_with_peak
         elif new_block.prev_header_hash != self.constants.GENESIS_CHALLENGE and self.peak is not None:
             # TODO: handle returning of -1
-            fork_h = find_fork_point_in_chain(
+            fork_h = await find_fork_point_in_chain(
                 self.blockchain,
                 self.blockchain.block_record(self.peak.header_hash),
                 new_block,
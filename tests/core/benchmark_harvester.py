@@ -0,0 +1,123 @@
+import asyncio
+import random
+import time
+from pathlib import Path
+from secrets import token_bytes
+from typing import List
+
+from blspy import AugSchemeMPL, G1Element
+
+from src.consensus.default_constants import DEFAULT_CONSTANTS
+from src.harvester.harvester import Harvester
+from src.harvester.harvester_api import HarvesterAPI
+from src.plotting.plot_tools import PlotInfo
+from src.protocols import harvester_protocol
+from src.types.blockchain_format.proof_of_space import ProofOfSpace
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.hash import std_hash
+from src.util.ints import uint8, uint64
+
+NUM_PLOTS = [1000, 10000, 50000]
+NUM_DEVICES = 8
+NUM_SIGNAGE_POINTS = 20
+PLOT_SIZE = 32
+
+
+class StandInProver:
+    """
+    Stands for a DiskProver, without a plot file. Every challenge has one quality, which takes lookup_time to read,
+    and its full proof twice as long.
+    """
+
+    def __init__(self, plot_id: bytes32, lookup_time: float):
+        self.plot_id = plot_id
+        self.lookup_time = lookup_time
+
+    def get_id(self) -> bytes32:
+        return self.plot_id
+
+    def get_size(self) -> uint8:
+        return uint8(PLOT_SIZE)
+
+    def get_qualities_for_challenge(self, challenge: bytes32) -> List[bytes32]:
+        time.sleep(self.lookup_time)
+        return [std_hash(self.plot_id + challenge)]
+
+    def get_full_proof(self, challenge: bytes32, index: int) -> bytes:
+        time.sleep(2 * self.lookup_time)
+        return token_bytes(8 * PLOT_SIZE)
+
+
+class StandInPeer:
+    def __init__(self):
+        self.messages = 0
+
+    async def send_message(self, message) -> None:
+        self.messages += 1
+
+
+def synthetic_plots(harvester: Harvester, num_plots: int) -> None:
+    farmer_public_key: G1Element = AugSchemeMPL.key_gen(token_bytes(32)).get_g1()
+    pool_public_key: G1Element = AugSchemeMPL.key_gen(token_bytes(32)).get_g1()
+    # Plots share a few local keys, only their plot ids change what the harvester does
+    local_sks = [AugSchemeMPL.key_gen(token_bytes(32)) for _ in range(16)]
+    plot_public_keys = [ProofOfSpace.generate_plot_public_key(sk.get_g1(), farmer_public_key) for sk in local_sks]
+    harvester.farmer_public_keys = [farmer_public_key]
+    harvester.pool_public_keys = [pool_public_key]
+    harvester.provers = {}
+    for index in range(num_plots):
+        key_index = index % len(local_sks)
+        plot_id = bytes32(token_bytes(32))
+        # The plots of device 0 are on a slow disk
+        lookup_time = 0.001 if index % NUM_DEVICES != 0 else 0.01
+        harvester.provers[Path(f"/plots/{index}.plot")] = PlotInfo(
+            StandInProver(plot_id, lookup_time),
+            pool_public_key,
+            None,
+            farmer_public_key,
+            plot_public_keys[key_index],
+            local_sks[key_index],
+            106 * 1024 ** 3,
+            time.time(),
+            index % NUM_DEVICES,
+            plot_id,
+            uint8(PLOT_SIZE),
+        )
+    harvester._update_plot_ids()
+
+
+async def run_benchmark() -> None:
+    harvester = Harvester(Path("/tmp"), {"num_threads": 30}, DEFAULT_CONSTANTS)
+    await harvester._start()
+    harvester_api = HarvesterAPI(harvester)
+    for num_plots in NUM_PLOTS:
+        synthetic_plots(harvester, num_plots)
+        # Plots are not refreshed during the benchmark
+        harvester.last_load_time = time.time()
+        peer = StandInPeer()
+        total_time = 0.0
+        for _ in range(NUM_SIGNAGE_POINTS):
+            new_challenge = harvester_protocol.NewSignagePointHarvester(
+                bytes32(token_bytes(32)),
+                uint64(random.randint(1, 2 ** 20)),
+                uint64(DEFAULT_CONSTANTS.SUB_SLOT_ITERS_STARTING),
+                uint8(0),
+                bytes32(token_bytes(32)),
+            )
+            start = time.time()
+            await harvester_api.new_signage_point_harvester(new_challenge, peer)
+            total_time += time.time() - start
+        print(
+            f"{num_plots:6} plots   {total_time / NUM_SIGNAGE_POINTS * 1e3:8.1f} ms per signage point   "
+            f"{peer.messages} messages"
+        )
+    harvester._close()
+    await harvester._await_closed()
+
+
+if __name__ == "__main__":
+    """
+    Measures the time the harvester takes to answer a signage point, from the plot filter to the proofs, for synthetic
+    plots with stand-in provers on several disks, one of them slow.
+    """
+    asyncio.run(run_benchmark())
@@ -0,0 +1,139 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from src.consensus.ancestor_index import AncestorIndex
+from src.consensus.blockchain_interface import BlockchainInterface
+from src.consensus.default_constants import DEFAULT_CONSTANTS
+from src.consensus.find_fork_point import find_fork_point_in_chain
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.hash import std_hash
+from src.util.ints import uint32
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+@dataclass(frozen=True)
+class StandInBlockRecord:
+    # The fields of a BlockRecord that the ancestor index reads
+    header_hash: bytes32
+    prev_hash: bytes32
+    height: uint32
+
+
+class EvictingChain(BlockchainInterface):
+    """
+    Keeps the block records of the last cache_size heights below the peak, and their skip pointers, like Blockchain,
+    and all of them in db.
+    """
+
+    def __init__(self, cache_size: int):
+        self.cache_size = cache_size
+        # Stand in for the BlockRecords of a Blockchain
+        self.records: Dict[bytes32, Any] = {}
+        self.db: Dict[bytes32, Any] = {}
+        self.heights: Dict[uint32, List[bytes32]] = {}
+        self.main_chain: List[bytes32] = []
+        self.peak_height: Optional[uint32] = None
+        self.ancestor_index = AncestorIndex()
+
+    def get_peak_height(self) -> Optional[uint32]:
+        return self.peak_height
+
+    def block_record(self, header_hash: bytes32):
+        return self.records[header_hash]
+
+    def height_to_hash(self, height: uint32) -> Optional[bytes32]:
+        return self.main_chain[height]
+
+    def height_to_block_record(self, height: uint32):
+        return self.records[self.main_chain[height]]
+
+    def contains_block(self, header_hash: bytes32) -> bool:
+        return header_hash in self.records
+
+    async def get_block_record_from_db(self, header_hash: bytes32):
+        return self.db.get(header_hash)
+
+    def get_ancestor(self, header_hash: bytes32, height: uint32):
+        return self.ancestor_index.get_ancestor(self, self.records[header_hash], height)
+
+    def try_get_ancestor(self, header_hash: bytes32, height: uint32):
+        return self.ancestor_index.try_get_ancestor(self, self.records[header_hash], height)
+
+    def add_block_record(self, block_record) -> None:
+        self.records[block_record.header_hash] = block_record
+        self.db[block_record.header_hash] = block_record
+        self.heights.setdefault(block_record.height, []).append(block_record.header_hash)
+        self.ancestor_index.add(self, block_record)
+
+    def extend(self, prev_hash: bytes32, height: int, seed: bytes, peak: bool) -> StandInBlockRecord:
+        block_record = StandInBlockRecord(std_hash(seed + prev_hash), prev_hash, uint32(height))
+        self.add_block_record(block_record)
+        if peak:
+            self.main_chain.append(block_record.header_hash)
+            self.peak_height = uint32(height)
+            # Like clean_block_records
+            for header_hash in self.heights.pop(uint32(height - self.cache_size), []):
+                del self.records[header_hash]
+                self.ancestor_index.remove(header_hash)
+        return block_record
+
+
+class TestAncestorIndex:
+    @pytest.mark.asyncio
+    async def test_chain_longer_than_cache(self):
+        cache_size = DEFAULT_CONSTANTS.BLOCKS_CACHE_SIZE
+        chain = EvictingChain(cache_size)
+        peak = chain.extend(bytes32(bytes(32)), 0, b"main", True)
+        for height in range(1, 2 * cache_size + 200):
+            peak = chain.extend(peak.header_hash, height, b"main", True)
+        assert not chain.contains_block(chain.height_to_hash(uint32(0)))
+
+        # A fork of the main chain, whose blocks are not in the heights of the peak
+        fork_height = peak.height - 300
+        orphan = chain.height_to_block_record(uint32(fork_height))
+        for height in range(fork_height + 1, fork_height + 150):
+            orphan = chain.extend(orphan.header_hash, height, b"orphan", False)
+        for height in range(peak.height - cache_size + 1, fork_height + 1):
+            assert chain.get_ancestor(orphan.header_hash, uint32(height)) == chain.height_to_block_record(height)
+        assert chain.try_get_ancestor(orphan.header_hash, uint32(peak.height - cache_size - 1)) is None
+        assert await find_fork_point_in_chain(chain, peak, orphan) == fork_height
+        assert await find_fork_point_in_chain(chain, orphan, peak) == fork_height
+
+        # Rebuilt from the block records in the cache, before the peak is known, like _load_chain_from_store
+        reloaded = EvictingChain(cache_size)
+        reloaded.main_chain = chain.main_chain
+        for block_record in sorted(chain.records.values(), key=lambda b: b.height):
+            reloaded.add_block_record(block_record)
+        reloaded.peak_height = peak.height
+        assert len(reloaded.ancestor_index) > 0
+        for height in range(peak.height - cache_size + 1, fork_height + 1):
+            assert reloaded.get_ancestor(orphan.header_hash, uint32(height)) == chain.height_to_block_record(height)
+        assert await find_fork_point_in_chain(reloaded, peak, orphan) == fork_height
+
+    @pytest.mark.asyncio
+    async def test_fork_below_cache(self):
+        cache_size = 100
+        chain = EvictingChain(cache_size)
+        peak = chain.extend(bytes32(bytes(32)), 0, b"main", True)
+        for height in range(1, 300):
+            peak = chain.extend(peak.header_hash, height, b"main", True)
+        fork_height = peak.height - 50
+        orphan = chain.height_to_block_record(uint32(fork_height))
+        for height in range(fork_height + 1, fork_height + 120):
+            orphan = chain.extend(orphan.header_hash, height, b"orphan", False)
+        for height in range(peak.height + 1, peak.height + 100):
+            peak = chain.extend(peak.header_hash, height, b"main", True)
+
+        # The fork point and the lowest blocks of the orphan chain were removed from the cache
+        assert not chain.contains_block(chain.height_to_hash(uint32(fork_height)))
+        assert chain.try_get_ancestor(orphan.header_hash, uint32(fork_height + 1)) is None
+        assert await find_fork_point_in_chain(chain, peak, orphan) == fork_height
+        assert await find_fork_point_in_chain(chain, orphan, peak) == fork_height
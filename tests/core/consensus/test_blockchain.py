@@ -9,7 +9,10 @@ from secrets import token_bytes
 import pytest
 from blspy import AugSchemeMPL, G2Element
 
+from src.consensus.ancestor_index import get_skip_height
+from src.consensus.block_body_validation import _get_fork_coin_deltas
 from src.consensus.blockchain import ReceiveBlockResult
+from src.consensus.find_fork_point import find_fork_point_in_chain
 from src.types.blockchain_format.classgroup import ClassgroupElement
 from src.types.blockchain_format.sized_bytes import bytes32
 from src.types.end_of_slot_bundle import EndOfSubSlotBundle
@@ -20,7 +23,7 @@ from src.types.blockchain_format.vdf import VDFInfo, VDFProof
 from src.util.block_tools import get_vdf_info_and_proof
 from src.util.errors import Err
 from src.util.hash import std_hash
-from src.util.ints import uint64, uint8
+from src.util.ints import uint32, uint64, uint8
 from src.util.wallet_tools import WalletTool
 from tests.recursive_replace import recursive_replace
 from tests.setup_nodes import test_constants, bt
@@ -1535,6 +1538,39 @@ class TestReorgs:
             assert error_code is None
         assert b.get_peak().height == 16
 
+    @pytest.mark.asyncio
+    async def test_get_ancestor(self, empty_blockchain):
+        b = empty_blockchain
+        blocks = bt.get_consecutive_blocks(40)
+        for block in blocks:
+            assert (await b.receive_block(block))[0] == ReceiveBlockResult.NEW_PEAK
+
+        # A lighter chain, which is not in the heights of the peak, so its ancestors are found with the skip pointers
+        orphan_blocks = bt.get_consecutive_blocks(25, blocks[:5], seed=b"2")
+        for block in orphan_blocks[5:]:
+            assert (await b.receive_block(block))[0] == ReceiveBlockResult.ADDED_AS_ORPHAN
+        assert b.get_peak().height == 39
+        assert len(b.ancestor_index) > 0
+
+        orphan_tip = orphan_blocks[-1]
+        for height in range(orphan_tip.height + 1):
+            ancestor = b.get_ancestor(orphan_tip.header_hash, uint32(height))
+            assert ancestor.header_hash == orphan_blocks[height].header_hash
+        for height in range(b.get_peak().height + 1):
+            assert b.get_ancestor(blocks[-1].header_hash, uint32(height)).header_hash == blocks[height].header_hash
+
+        peak = b.get_peak()
+        orphan_record = b.block_record(orphan_tip.header_hash)
+        assert await find_fork_point_in_chain(b, peak, orphan_record) == 4
+        assert await find_fork_point_in_chain(b, orphan_record, peak) == 4
+        assert await find_fork_point_in_chain(b, peak, b.block_record(blocks[20].header_hash)) == 20
+        orphan_header = orphan_blocks[-1].get_block_header(orphan_blocks[-1].get_coin_changes())
+        assert await find_fork_point_in_chain(b, peak, orphan_header) == 4
+
+        assert [get_skip_height(height) for height in range(1, 9)] == [0, 0, 1, 0, 1, 4, 1, 0]
+        for height in range(2, 1000):
+            assert get_skip_height(height) < height
+
     @pytest.mark.asyncio
     async def test_long_reorg(self, empty_blockchain, default_10000_blocks):
         # Reorg longer than a difficulty adjustment
@@ -1666,6 +1702,31 @@ class TestReorgs:
             result, error_code, _ = await b.receive_block(block)
             assert error_code is None
 
+    @pytest.mark.asyncio
+    async def test_fork_coin_deltas(self, empty_blockchain):
+        b = empty_blockchain
+        blocks = bt.get_consecutive_blocks(25, guarantee_transaction_block=True)
+        for block in blocks:
+            assert (await b.receive_block(block))[0] == ReceiveBlockResult.NEW_PEAK
+
+        blocks_fork = bt.get_consecutive_blocks(10, blocks[:5], seed=b"2", guarantee_transaction_block=True)
+        for block in blocks_fork[5:]:
+            result, error_code, _ = await b.receive_block(block)
+            assert error_code is None and result == ReceiveBlockResult.ADDED_AS_ORPHAN
+
+        # Only the first blocks of the fork read the blocks back to the fork point
+        assert b.fork_coin_deltas.hits >= len(blocks_fork) - 5 - 2
+        tip = blocks_fork[-1]
+        cached = b.fork_coin_deltas.get(tip.header_hash, 4)
+        assert cached is not None
+        rebuilt = await _get_fork_coin_deltas(b, b.block_store, tip.header_hash, uint32(tip.height + 1), 4)
+        assert cached.additions_since_fork == rebuilt.additions_since_fork
+        assert cached.coinbases_since_fork == rebuilt.coinbases_since_fork
+        assert len(cached.additions_since_fork) > 0
+
+        # Relative to another fork point, the deltas are not used
+        assert b.fork_coin_deltas.get(tip.header_hash, 3) is None
+
 
 class TestPreValidation:
     @pytest.mark.asyncio
@@ -1680,6 +1741,39 @@ class TestPreValidation:
         assert res[0].error is None
         assert res[1].error is not None
 
+    @pytest.mark.asyncio
+    async def test_pre_validation_body(self, empty_blockchain):
+        b = empty_blockchain
+        wallet_a = WalletTool()
+        coinbase_puzzlehash = wallet_a.get_new_puzzlehash()
+        blocks = bt.get_consecutive_blocks(
+            12, farmer_reward_puzzle_hash=coinbase_puzzlehash, guarantee_transaction_block=True
+        )
+        spend_coin = None
+        for coin in list(blocks[10].get_included_reward_coins()):
+            if coin.puzzle_hash == coinbase_puzzlehash:
+                spend_coin = coin
+        spend_bundle = wallet_a.generate_signed_transaction(1000, wallet_a.get_new_puzzlehash(), spend_coin)
+        blocks = bt.get_consecutive_blocks(1, blocks, transaction_data=spend_bundle, guarantee_transaction_block=True)
+        assert blocks[-1].transactions_generator is not None
+
+        # The transactions info does not match the foliage anymore
+        block_bad = recursive_replace(blocks[-1], "transactions_info.aggregated_signature", G2Element.infinity())
+        res = await b.pre_validate_blocks_multiprocessing(blocks[:-1] + [block_bad], validate_signatures=True)
+        assert res[-1].error is not None
+
+        res = await b.pre_validate_blocks_multiprocessing(blocks, validate_signatures=True)
+        for block, result in zip(blocks, res):
+            assert result.error is None
+            assert result.body_validated == block.is_transaction_block()
+            assert result.signature_validated == block.is_transaction_block()
+            assert (await b.receive_block(block, result))[0] == ReceiveBlockResult.NEW_PEAK
+        assert b.get_peak().height == blocks[-1].height
+
+        # Without validate_signatures, the signatures are left to validate_block_body
+        res = await b.pre_validate_blocks_multiprocessing(blocks[-1:])
+        assert res[0].body_validated and not res[0].signature_validated
+
     @pytest.mark.asyncio
     async def test_pre_validation(self, empty_blockchain, default_1000_blocks):
         blocks = default_1000_blocks[:100]
@@ -1710,6 +1804,9 @@ class TestPreValidation:
                     f"new slot? {len(block.finished_sub_slots)}, time {end_rb - start_rb}"
                 )
         end = time.time()
+        # The workers keep the block records they were sent, so each one is sent at most once to each worker
+        assert empty_blockchain.pool.block_records_sent <= len(blocks) * empty_blockchain.pool.num_workers
+        assert empty_blockchain.pool.block_time is not None
         log.info(f"Total time: {end - start} seconds")
         log.info(f"Average pv: {sum(times_pv)/(len(blocks)/n_at_a_time)}")
         log.info(f"Average rb: {sum(times_rb)/(len(blocks))}")
@@ -0,0 +1,95 @@
+import asyncio
+from typing import List, Tuple
+
+import pytest
+from blspy import AugSchemeMPL, G1Element, G2Element, PrivateKey
+
+from src.consensus.signature_verification import SignatureVerifier, VerifiedSignatureCache, pair_key
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+def sign(seed: int, num_messages: int) -> Tuple[List[G1Element], List[bytes], G2Element]:
+    sk: PrivateKey = AugSchemeMPL.key_gen(bytes([seed] * 32))
+    msgs = [bytes([seed, i]) for i in range(num_messages)]
+    return [sk.get_g1()] * num_messages, msgs, AugSchemeMPL.aggregate([AugSchemeMPL.sign(sk, msg) for msg in msgs])
+
+
+class TestSignatureVerification:
+    @pytest.mark.asyncio
+    async def test_verify(self):
+        verifier = SignatureVerifier(num_workers=2, batch_size=4)
+        try:
+            signatures = [sign(i, 3) for i in range(1, 11)]
+            _, _, other_signature = sign(20, 1)
+            invalid = (signatures[0][0], signatures[0][1], other_signature)
+            results = await asyncio.gather(*[verifier.verify(*s) for s in signatures + [invalid]])
+            assert results == [True] * len(signatures) + [False]
+            metrics = verifier.get_metrics()
+            assert metrics["verified"] == len(signatures) + 1 and metrics["failed"] == 1
+            assert metrics["batches"] < metrics["verified"]
+            assert metrics["cache_size"] == len(signatures)
+
+            assert await verifier.verify([], [], G2Element.infinity())
+            assert not await verifier.verify([], [], other_signature)
+        finally:
+            verifier.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_aggregate_of_verified_signatures(self):
+        verifier = SignatureVerifier(num_workers=1)
+        try:
+            pks_1, msgs_1, signature_1 = sign(1, 2)
+            pks_2, msgs_2, signature_2 = sign(2, 3)
+            assert await verifier.verify(pks_1, msgs_1, signature_1)
+            assert await verifier.verify(pks_2, msgs_2, signature_2)
+
+            # Like a block made of two spend bundles of the mempool, in another order
+            pks = pks_2 + pks_1
+            msgs = msgs_2 + msgs_1
+            assert await verifier.verify(pks, msgs, AugSchemeMPL.aggregate([signature_1, signature_2]))
+            metrics = verifier.get_metrics()
+            assert metrics["verified"] == 2 and metrics["cache_hits"] == 1
+
+            # Not the aggregate of the verified signatures
+            assert not await verifier.verify(pks, msgs, signature_1)
+            # Some of the pairs were not verified
+            pks_3, msgs_3, signature_3 = sign(3, 1)
+            assert await verifier.verify(
+                pks + pks_3, msgs + msgs_3, AugSchemeMPL.aggregate([signature_1, signature_2, signature_3])
+            )
+            assert verifier.get_metrics()["verified"] == 4
+        finally:
+            verifier.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_executor_failure(self):
+        verifier = SignatureVerifier(num_workers=1)
+        try:
+            pks, msgs, signature = sign(1, 2)
+            verifier.executor.pool.shutdown(wait=True)
+            # Not reported as invalid, since it was not checked
+            with pytest.raises(RuntimeError):
+                await verifier.verify(pks, msgs, signature)
+            metrics = verifier.get_metrics()
+            assert metrics["verified"] == 0 and metrics["failed"] == 0 and metrics["in_flight"] == 0
+            assert metrics["cache_size"] == 0
+        finally:
+            verifier.shut_down()
+
+    def test_cache_eviction(self):
+        cache = VerifiedSignatureCache(2)
+        entries = []
+        for seed in range(1, 4):
+            pks, msgs, signature = sign(seed, 2)
+            pair_keys = [pair_key(pk, msg) for pk, msg in zip(pks, msgs)]
+            cache.add(pair_keys, signature)
+            entries.append((pair_keys, signature))
+        assert len(cache) == 2 and cache.evictions == 1
+        assert not cache.is_verified(*entries[0])
+        assert cache.is_verified(*entries[1]) and cache.is_verified(*entries[2])
+        assert all(key not in cache.entries_by_pair for key in entries[0][0])
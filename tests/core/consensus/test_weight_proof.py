@@ -84,7 +84,7 @@ async def load_blocks_dont_validate(
         )
         block_records[block.header_hash] = block_record
         height_to_hash[block.height] = block.header_hash
-        header_cache[block.header_hash] = block.get_block_header()
+        header_cache[block.header_hash] = block.get_block_header(block.get_coin_changes())
         if block_record.sub_epoch_summary_included is not None:
             sub_epoch_summaries[block.height] = block_record.sub_epoch_summary_included
         prev_block = block
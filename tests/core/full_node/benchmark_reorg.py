@@ -0,0 +1,87 @@
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import aiosqlite
+
+from src.full_node.coin_store import CoinStore
+from src.types.block_coin_changes import BlockCoinChanges
+from src.types.blockchain_format.coin import Coin
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.util.ints import uint32, uint64
+
+NUM_BLOCKS = 5000
+COINS_PER_BLOCK = 20
+SPENDS_PER_BLOCK = 10
+REORG_DEPTHS = [1, 10, 100, 500]
+NUM_RUNS = 3
+
+
+def rand_hash() -> bytes32:
+    return bytes32(random.getrandbits(256).to_bytes(32, "big"))
+
+
+def synthetic_chain() -> List[BlockCoinChanges]:
+    """
+    The coin changes of a chain where every block creates COINS_PER_BLOCK coins, two of them rewards, and spends
+    SPENDS_PER_BLOCK of the unspent coins of the previous blocks.
+    """
+    chain: List[BlockCoinChanges] = []
+    unspent: List[bytes32] = []
+    for height in range(NUM_BLOCKS):
+        coins = [Coin(rand_hash(), rand_hash(), uint64(random.randint(1, 2 ** 40))) for _ in range(COINS_PER_BLOCK)]
+        random.shuffle(unspent)
+        removals = unspent[:SPENDS_PER_BLOCK] if height > 0 else []
+        unspent = unspent[len(removals) :] + [coin.name() for coin in coins]
+        reward_coins = coins[:2] if height > 0 else []
+        chain.append(BlockCoinChanges(removals, coins[len(reward_coins) :], reward_coins))
+    return chain
+
+
+async def reorg(coin_store: CoinStore, chain: List[BlockCoinChanges], depth: int) -> float:
+    """
+    Rolls back the last depth blocks, and applies them again, in one transaction like Blockchain does.
+    """
+    fork_height = len(chain) - 1 - depth
+    start = time.time()
+    await coin_store.coin_record_db.execute("BEGIN TRANSACTION")
+    await coin_store.rollback_to_block(fork_height)
+    for height in range(fork_height + 1, len(chain)):
+        await coin_store.apply_coin_changes(uint32(height), uint64(height), chain[height])
+    await coin_store.coin_record_db.commit()
+    return time.time() - start
+
+
+async def run_benchmark(directory: Path) -> None:
+    chain = synthetic_chain()
+    db = await aiosqlite.connect(directory / "coins.sqlite")
+    coin_store = await CoinStore.create(db)
+    for height, coin_changes in enumerate(chain):
+        await coin_store.apply_coin_changes(uint32(height), uint64(height), coin_changes)
+    await db.commit()
+    num_coins = len(await coin_store.get_unspent_coin_records())
+    print(f"{NUM_BLOCKS} blocks, {NUM_BLOCKS * COINS_PER_BLOCK} coins, {num_coins} unspent")
+
+    for depth in REORG_DEPTHS:
+        journal_time = float("inf")
+        scan_time = float("inf")
+        for _ in range(NUM_RUNS):
+            journal_time = min(journal_time, await reorg(coin_store, chain, depth))
+            # Without the journal, the rollback scans the heights above the fork
+            coin_store.undo_journal.reset(NUM_BLOCKS)
+            scan_time = min(scan_time, await reorg(coin_store, chain, depth))
+            assert len(await coin_store.get_unspent_coin_records()) == num_coins
+        print(f"reorg depth {depth:4}   journal: {journal_time * 1e3:8.1f} ms   scan: {scan_time * 1e3:8.1f} ms")
+    await db.close()
+
+
+if __name__ == "__main__":
+    """
+    Measures the latency of reorgs of the coin store at several depths on a synthetic chain, rolling back with the
+    undo journal and with the scans of the whole heights above the fork.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run_benchmark(Path(directory)))
@@ -52,6 +52,16 @@ class TestBlockStore:
                 assert block == await store.get_full_block(block.header_hash)
                 assert block == await store.get_full_block(block.header_hash)
                 assert block_record == (await store.get_block_record(block_record_hh))
+
+                block_view = await store.get_full_block_view(block.header_hash)
+                assert block_view.header_hash == block.header_hash
+                assert block_view.prev_header_hash == block.prev_header_hash
+                assert block_view.height == block.height
+                assert block_view.is_transaction_block() == block.is_transaction_block()
+                assert block_view.transactions_generator == block.transactions_generator
+                assert block_view.get_block_header() == block.get_block_header(block.get_coin_changes())
+                assert block_view.full_block() == block
+
                 await store.set_peak(block_record.header_hash)
                 await store.set_peak(block_record.header_hash)
 
@@ -59,6 +69,35 @@ class TestBlockStore:
             assert len(await store.get_full_blocks_at([0])) == 1
             assert len(await store.get_full_blocks_at([100])) == 0
 
+            # Header blocks are built from the stored blocks
+            header_blocks = await store.get_header_blocks_in_range(0, len(blocks) - 1)
+            assert header_blocks == {
+                block.header_hash: block.get_block_header(block.get_coin_changes()) for block in blocks
+            }
+            header_hashes = [block.header_hash for block in reversed(blocks)]
+            assert await store.get_header_blocks_by_hash(header_hashes) == [
+                header_blocks[header_hash] for header_hash in header_hashes
+            ]
+            for block in blocks:
+                assert await store.get_header_block(block.header_hash) == header_blocks[block.header_hash]
+
+            # Databases without stored header blocks are migrated when the store is created
+            await connection.execute("DROP TABLE header_blocks")
+            await connection.commit()
+            store = await BlockStore.create(connection)
+            assert await store.get_header_blocks_in_range(0, len(blocks) - 1) == header_blocks
+
+            # Coin changes are stored for transaction blocks, and read back without running the generators
+            cursor = await connection.execute("SELECT COUNT(*) from block_coin_changes")
+            assert (await cursor.fetchone())[0] == len([block for block in blocks if block.is_transaction_block()])
+            await cursor.close()
+            for block in blocks:
+                assert await store.get_coin_changes(block) == block.get_coin_changes()
+                block_view = await store.get_full_block_view(block.header_hash)
+                assert await store.get_coin_changes(block_view) == block.get_coin_changes()
+                if block.is_transaction_block():
+                    assert set(block.get_coin_changes().reward_coins) == block.get_included_reward_coins()
+
             # Get blocks
             block_record_records = await store.get_block_records()
             assert len(block_record_records[0]) == len(blocks)
@@ -0,0 +1,74 @@
+from typing import List
+
+from blspy import G2Element
+
+from src.consensus.cost_calculator import CostResult
+from src.full_node.block_template import count_ancestors, select_mempool_items
+from src.full_node.mempool import Mempool
+from src.types.blockchain_format.coin import Coin
+from src.types.mempool_item import MempoolItem
+from src.types.spend_bundle import SpendBundle
+from src.util.hash import std_hash
+from src.util.ints import uint64
+
+
+def make_item(mempool: Mempool, seed: int, removals: List[Coin], fee: int, cost: int) -> MempoolItem:
+    addition = Coin(std_hash(seed.to_bytes(4, "big")), std_hash(b"puzzle_hash"), uint64(seed))
+    item = MempoolItem(
+        SpendBundle([], G2Element.infinity()),
+        fee / cost,
+        uint64(fee),
+        CostResult(None, [], uint64(cost)),
+        std_hash(seed.to_bytes(4, "big") + bytes([0])),
+        [addition],
+        removals,
+    )
+    mempool.add_to_pool(item, [addition], {coin.name(): coin for coin in removals})
+    return item
+
+
+def confirmed_coin(seed: int) -> Coin:
+    return Coin(std_hash(seed.to_bytes(4, "big") + bytes([1])), std_hash(b"puzzle_hash"), uint64(1000))
+
+
+class TestBlockTemplate:
+    def test_fee_rate_order(self):
+        mempool = Mempool.create(100)
+        cheap = make_item(mempool, 1, [confirmed_coin(1)], 10, 100)
+        expensive = make_item(mempool, 2, [confirmed_coin(2)], 1000, 100)
+        medium = make_item(mempool, 3, [confirmed_coin(3)], 100, 100)
+        assert select_mempool_items(mempool, 1000, 10 ** 6) == [expensive, medium, cheap]
+        # Items that do not fit are skipped, and the next ones are still included
+        large = make_item(mempool, 4, [confirmed_coin(4)], 900, 150)
+        assert select_mempool_items(mempool, 240, 10 ** 6) == [expensive, medium]
+        assert select_mempool_items(mempool, 260, 10 ** 6) == [expensive, large]
+        assert select_mempool_items(mempool, 1000, 1100) == [expensive, medium]
+
+    def test_dependent_spends(self):
+        mempool = Mempool.create(100)
+        parent = make_item(mempool, 1, [confirmed_coin(1)], 0, 100)
+        other = make_item(mempool, 2, [confirmed_coin(2)], 100, 100)
+        # The high fee of the child pays for its parent
+        child = make_item(mempool, 3, parent.additions, 1000, 100)
+        assert select_mempool_items(mempool, 1000, 10 ** 6) == [parent, child, other]
+        # Children are never included without their parents
+        assert select_mempool_items(mempool, 150, 10 ** 6) == [other]
+
+        # Removing an item removes the items that spend its coins
+        mempool.remove_spend(parent)
+        assert child.name not in mempool.spends
+        assert select_mempool_items(mempool, 1000, 10 ** 6) == [other]
+
+    def test_long_chain_of_dependent_spends(self):
+        # Longer than the recursion limit, although the mempool manager does not add chains that long
+        mempool = Mempool.create(10000)
+        chain = [make_item(mempool, 1, [confirmed_coin(1)], 100, 100)]
+        for seed in range(2, 1100):
+            chain.append(make_item(mempool, seed, chain[-1].additions, 100, 100))
+        assert count_ancestors(mempool, [chain[-1]]) == len(chain)
+        assert select_mempool_items(mempool, 10 ** 6, 10 ** 6) == chain
+
+        mempool.remove_spend(chain[0])
+        assert len(mempool.spends) == 0
+        assert len(mempool.additions) == 0
+        assert len(mempool.removals) == 0
@@ -8,12 +8,16 @@ import pytest
 from src.consensus.block_rewards import calculate_pool_reward, calculate_base_farmer_reward
 from src.consensus.blockchain import Blockchain, ReceiveBlockResult
 from src.consensus.coinbase import create_pool_coin, create_farmer_coin
-from src.full_node.coin_store import CoinStore
+from src.full_node.coin_record_cache import CoinRecordCache
+from src.full_node.coin_store import MAX_COINS_PER_UPDATE, CoinStore
 from src.full_node.block_store import BlockStore
+from src.types.block_coin_changes import BlockCoinChanges
 from src.types.blockchain_format.coin import Coin
+from src.types.blockchain_format.sized_bytes import bytes32
 from src.types.coin_record import CoinRecord
 from src.types.full_block import FullBlock
-from src.util.ints import uint64
+from src.util.hash import std_hash
+from src.util.ints import uint32, uint64
 from tests.setup_nodes import test_constants, bt
 from src.util.wallet_tools import WalletTool
 
@@ -149,6 +153,118 @@ class TestCoinStore:
         await connection.close()
         Path("fndb_test.db").unlink()
 
+    @pytest.mark.asyncio
+    async def test_set_spent_many(self):
+        db_path = Path("fndb_test.db")
+        if db_path.exists():
+            db_path.unlink()
+        connection = await aiosqlite.connect(db_path)
+        coin_store = await CoinStore.create(connection, cache_size=uint32(10))
+
+        # More coins than fit in a single UPDATE, and more than the cache holds
+        num_coins = 2 * MAX_COINS_PER_UPDATE + 5
+        coins = [Coin(std_hash(i.to_bytes(4, "big")), bytes32([0] * 32), uint64(i)) for i in range(num_coins)]
+        records = [CoinRecord(coin, uint32(1), uint32(0), False, False, uint64(0)) for coin in coins]
+        await coin_store._add_coin_records(records)
+        await coin_store._set_spent_coins([coin.name() for coin in coins[1:]], uint32(2))
+
+        record = await coin_store.get_coin_record(coins[0].name())
+        assert not record.spent
+        for coin in coins[1:]:
+            record = await coin_store.get_coin_record(coin.name())
+            assert record.spent
+            assert record.spent_block_index == 2
+        assert len(await coin_store.get_unspent_coin_records()) == 1
+        assert len(await coin_store.get_coins_added_at_height(uint32(1))) == num_coins
+        assert len(await coin_store.get_coins_added_at_height(uint32(2))) == 0
+        removed = await coin_store.get_coins_removed_at_height(uint32(2))
+        assert set(record.name for record in removed) == set(coin.name() for coin in coins[1:])
+
+        await coin_store.rollback_to_block(1)
+        assert len(await coin_store.get_unspent_coin_records()) == num_coins
+        for coin in coins:
+            assert not (await coin_store.get_coin_record(coin.name())).spent
+
+        await connection.close()
+        Path("fndb_test.db").unlink()
+
+    @pytest.mark.asyncio
+    async def test_undo_journal(self):
+        db_path = Path("fndb_test.db")
+        if db_path.exists():
+            db_path.unlink()
+        connection = await aiosqlite.connect(db_path)
+        coin_store = await CoinStore.create(connection, undo_journal_heights=uint32(5))
+
+        def coin(i: int) -> Coin:
+            return Coin(std_hash(i.to_bytes(4, "big")), bytes32([0] * 32), uint64(i))
+
+        # Every block creates three coins, and spends one of the coins of the previous block
+        num_blocks = 10
+        for height in range(num_blocks):
+            removals = [coin(3 * (height - 1)).name()] if height > 0 else []
+            additions = [coin(3 * height + i) for i in range(3)]
+            reward_coins = additions[1:] if height > 0 else []
+            coin_changes = BlockCoinChanges(removals, additions[: 3 - len(reward_coins)], reward_coins)
+            await coin_store.apply_coin_changes(uint32(height), uint64(0), coin_changes)
+        assert coin_store.undo_journal.start == num_blocks - 5
+        assert not coin_store.undo_journal.covers(3)
+
+        async def check(fork_height: int):
+            for i in range(3 * num_blocks):
+                record = await coin_store.get_coin_record(coin(i).name())
+                if i // 3 > fork_height:
+                    assert record is None
+                else:
+                    assert record is not None
+                    assert record.spent == (i % 3 == 0 and i // 3 < fork_height)
+
+        # Within the journal, only the rows of the coins of the rolled back heights are touched
+        assert coin_store.undo_journal.covers(7)
+        await coin_store.rollback_to_block(7)
+        await check(7)
+        coin_store.coin_record_cache = CoinRecordCache(10)
+        await check(7)
+
+        # Beyond the journal, the rows above the height are scanned
+        await coin_store.rollback_to_block(2)
+        coin_store.coin_record_cache = CoinRecordCache(10)
+        await check(2)
+        assert coin_store.undo_journal.covers(2)
+
+        # A new coin store only journals the heights above the ones it has
+        coin_store = await CoinStore.create(connection)
+        assert coin_store.undo_journal.start == 3
+
+        await connection.close()
+        Path("fndb_test.db").unlink()
+
+    def test_coin_record_cache(self):
+        cache = CoinRecordCache(3)
+        coins = [Coin(std_hash(i.to_bytes(4, "big")), bytes32([0] * 32), uint64(i)) for i in range(5)]
+        records = [CoinRecord(coin, uint32(i), uint32(0), False, False, uint64(0)) for i, coin in enumerate(coins)]
+        for record in records[:3]:
+            cache.put(record.name, record)
+        assert cache.get(coins[0].name()) == records[0]
+
+        # The least recently used record is evicted
+        cache.put(records[3].name, records[3])
+        assert cache.get(coins[1].name()) is None
+        assert len(cache) == 3
+        assert cache.get_metrics() == {"size": 3, "capacity": 3, "hits": 1, "misses": 1, "evictions": 1}
+
+        spent = CoinRecord(coins[0], uint32(0), uint32(3), True, False, uint64(0))
+        cache.put(spent.name, spent)
+        cache.rollback(2)
+        assert cache.peek(coins[0].name()) == records[0]
+        assert cache.peek(coins[2].name()) == records[2]
+        assert cache.peek(coins[3].name()) is None
+        assert set(cache.names_by_height.keys()) == {0, 2}
+
+        cache.clear()
+        assert len(cache) == 0 and len(cache.names_by_height) == 0
+        assert cache.get(coins[0].name()) is None
+
     @pytest.mark.asyncio
     async def test_rollback(self):
         blocks = bt.get_consecutive_blocks(20)
@@ -253,6 +369,39 @@ class TestCoinStore:
         Path("blockchain_test.db").unlink()
         b.shut_down()
 
+    @pytest.mark.asyncio
+    async def test_failed_peak_update(self):
+        blocks = bt.get_consecutive_blocks(10)
+        blocks = bt.get_consecutive_blocks(1, block_list_input=blocks, guarantee_transaction_block=True)
+        db_path = Path("blockchain_test.db")
+        if db_path.exists():
+            db_path.unlink()
+        connection = await aiosqlite.connect(db_path)
+        coin_store = await CoinStore.create(connection)
+        store = await BlockStore.create(connection)
+        b: Blockchain = await Blockchain.create(coin_store, store, test_constants)
+        try:
+            for block in blocks[:-1]:
+                await b.receive_block(block)
+            peak_height = b.get_peak().height
+
+            async def set_peak(header_hash: bytes32) -> None:
+                raise RuntimeError("Failed to set the peak")
+
+            # The coins of the block are stored and cached, then the transaction is rolled back
+            store.set_peak = set_peak
+            with pytest.raises(RuntimeError):
+                await b.receive_block(blocks[-1])
+            assert b.get_peak().height == peak_height
+            coins = blocks[-1].get_included_reward_coins()
+            assert len(coins) > 0
+            for coin in coins:
+                assert await coin_store.get_coin_record(coin.name()) is None
+        finally:
+            await connection.close()
+            Path("blockchain_test.db").unlink()
+            b.shut_down()
+
     @pytest.mark.asyncio
     async def test_get_puzzle_hash(self):
         num_blocks = 20
@@ -4,6 +4,7 @@ from typing import Dict, List
 
 import pytest
 
+from src.full_node.block_template import MAX_MEMPOOL_ANCESTORS
 from src.protocols import full_node_protocol
 from src.types.blockchain_format.coin import Coin
 from src.types.coin_solution import CoinSolution
@@ -744,6 +745,134 @@ class TestMempool:
         sb = full_node_1.full_node.mempool_manager.get_spendbundle(spend_bundle_combined.name())
         assert sb is None
 
+    @pytest.mark.asyncio
+    async def test_dependent_spend(self, two_nodes):
+        reward_ph = WALLET_A.get_new_puzzlehash()
+        full_node_1, full_node_2, server_1, server_2 = two_nodes
+        blocks = await full_node_1.get_all_full_blocks()
+        start_height = blocks[-1].height
+        blocks = bt.get_consecutive_blocks(
+            3,
+            block_list_input=blocks,
+            guarantee_transaction_block=True,
+            farmer_reward_puzzle_hash=reward_ph,
+            pool_reward_puzzle_hash=reward_ph,
+        )
+        peer = await connect_and_get_peer(server_1, server_2)
+
+        for block in blocks:
+            await full_node_1.full_node.respond_block(full_node_protocol.RespondBlock(block))
+
+        await time_out_assert(60, node_height_at_least, True, full_node_1, start_height + 3)
+        mempool_manager = full_node_1.full_node.mempool_manager
+        child_ph = WALLET_A.get_new_puzzlehash()
+        spend_bundle1 = generate_test_spend_bundle(
+            list(blocks[-1].get_included_reward_coins())[0], new_puzzle_hash=child_ph
+        )
+        await full_node_1.respond_transaction(full_node_protocol.RespondTransaction(spend_bundle1), peer)
+
+        # Spends a coin created by the other spend bundle, with a higher fee
+        child_coin = [coin for coin in spend_bundle1.additions() if coin.puzzle_hash == child_ph][0]
+        spend_bundle2 = generate_test_spend_bundle(child_coin, fee=uint64(10), amount=uint64(100))
+        await full_node_1.respond_transaction(full_node_protocol.RespondTransaction(spend_bundle2), peer)
+        assert mempool_manager.get_spendbundle(spend_bundle1.name()) == spend_bundle1
+        assert mempool_manager.get_spendbundle(spend_bundle2.name()) == spend_bundle2
+
+        # Both are included in the next block, the parent first
+        template = await mempool_manager.create_bundle_from_mempool(blocks[-1].header_hash)
+        assert template is not None
+        coin_solutions = template[0].coin_solutions
+        assert coin_solutions.index(spend_bundle1.coin_solutions[0]) < coin_solutions.index(
+            spend_bundle2.coin_solutions[0]
+        )
+        # The template is reused until the mempool changes
+        assert (await mempool_manager.create_bundle_from_mempool(blocks[-1].header_hash)) is template
+
+        # Removing the parent removes the child
+        mempool_manager.mempool.remove_spend(mempool_manager.get_mempool_item(spend_bundle1.name()))
+        assert mempool_manager.get_spendbundle(spend_bundle2.name()) is None
+        template = await mempool_manager.create_bundle_from_mempool(blocks[-1].header_hash)
+        assert template is None or spend_bundle2.coin_solutions[0] not in template[0].coin_solutions
+
+    @pytest.mark.asyncio
+    async def test_too_many_mempool_ancestors(self, two_nodes):
+        reward_ph = WALLET_A.get_new_puzzlehash()
+        full_node_1, full_node_2, server_1, server_2 = two_nodes
+        blocks = await full_node_1.get_all_full_blocks()
+        start_height = blocks[-1].height
+        blocks = bt.get_consecutive_blocks(
+            3,
+            block_list_input=blocks,
+            guarantee_transaction_block=True,
+            farmer_reward_puzzle_hash=reward_ph,
+            pool_reward_puzzle_hash=reward_ph,
+        )
+        peer = await connect_and_get_peer(server_1, server_2)
+
+        for block in blocks:
+            await full_node_1.full_node.respond_block(full_node_protocol.RespondBlock(block))
+
+        await time_out_assert(60, node_height_at_least, True, full_node_1, start_height + 3)
+        mempool_manager = full_node_1.full_node.mempool_manager
+        # A chain of spend bundles, each spending a coin created by the previous one
+        coin = list(blocks[-1].get_included_reward_coins())[0]
+        spend_bundles: List[SpendBundle] = []
+        for _ in range(MAX_MEMPOOL_ANCESTORS + 2):
+            child_ph = WALLET_A.get_new_puzzlehash()
+            spend_bundle = generate_test_spend_bundle(coin, new_puzzle_hash=child_ph)
+            await full_node_1.respond_transaction(full_node_protocol.RespondTransaction(spend_bundle), peer)
+            spend_bundles.append(spend_bundle)
+            coin = [coin for coin in spend_bundle.additions() if coin.puzzle_hash == child_ph][0]
+
+        for spend_bundle in spend_bundles[: MAX_MEMPOOL_ANCESTORS + 1]:
+            assert mempool_manager.get_spendbundle(spend_bundle.name()) == spend_bundle
+        assert mempool_manager.get_spendbundle(spend_bundles[-1].name()) is None
+
+    @pytest.mark.asyncio
+    async def test_new_peak_removes_spent_items(self, two_nodes):
+        reward_ph = WALLET_A.get_new_puzzlehash()
+        full_node_1, full_node_2, server_1, server_2 = two_nodes
+        blocks = await full_node_1.get_all_full_blocks()
+        start_height = blocks[-1].height
+        blocks = bt.get_consecutive_blocks(
+            3,
+            block_list_input=blocks,
+            guarantee_transaction_block=True,
+            farmer_reward_puzzle_hash=reward_ph,
+            pool_reward_puzzle_hash=reward_ph,
+        )
+        peer = await connect_and_get_peer(server_1, server_2)
+
+        for block in blocks:
+            await full_node_1.full_node.respond_block(full_node_protocol.RespondBlock(block))
+
+        await time_out_assert(60, node_height_at_least, True, full_node_1, start_height + 3)
+        mempool_manager = full_node_1.full_node.mempool_manager
+        coin_1, coin_2 = list(blocks[-1].get_included_reward_coins())[:2]
+        child_ph = WALLET_A.get_new_puzzlehash()
+        included = generate_test_spend_bundle(coin_1, new_puzzle_hash=child_ph)
+        child_coin = [coin for coin in included.additions() if coin.puzzle_hash == child_ph][0]
+        child = generate_test_spend_bundle(child_coin, amount=uint64(100))
+        conflicting = generate_test_spend_bundle(coin_2)
+        for spend_bundle in [included, child, conflicting]:
+            await full_node_1.respond_transaction(full_node_protocol.RespondTransaction(spend_bundle), peer)
+            assert mempool_manager.get_spendbundle(spend_bundle.name()) == spend_bundle
+
+        # The block spends coin_2 to another puzzle hash than the mempool item
+        block_bundle = SpendBundle.aggregate(
+            [included, generate_test_spend_bundle(coin_2, new_puzzle_hash=BURN_PUZZLE_HASH_2)]
+        )
+        blocks = bt.get_consecutive_blocks(
+            1, block_list_input=blocks, guarantee_transaction_block=True, transaction_data=block_bundle
+        )
+        await full_node_1.full_node.respond_block(full_node_protocol.RespondBlock(blocks[-1]))
+        assert full_node_1.full_node.blockchain.get_peak().header_hash == blocks[-1].header_hash
+
+        assert mempool_manager.get_spendbundle(included.name()) is None
+        assert mempool_manager.get_spendbundle(conflicting.name()) is None
+        # The coin spent by the child now exists
+        assert mempool_manager.get_spendbundle(child.name()) == child
+
     @pytest.mark.asyncio
     async def test_agg_sig_condition(self, two_nodes):
         reward_ph = WALLET_A.get_new_puzzlehash()
@@ -0,0 +1,127 @@
+import asyncio
+from pathlib import Path
+from typing import List, Tuple
+
+import aiosqlite
+import pytest
+
+from src.consensus.blockchain import Blockchain, ReceiveBlockResult
+from src.full_node.block_store import BlockStore
+from src.full_node.coin_store import CoinStore
+from src.full_node.snapshot import export_snapshot, import_snapshot
+from src.types.blockchain_format.coin import Coin
+from src.util.wallet_tools import WalletTool
+from tests.setup_nodes import test_constants, bt
+
+WALLET_A = WalletTool()
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+def remove_files(*paths: Path):
+    for path in paths:
+        if path.exists():
+            path.unlink()
+
+
+def snapshot_paths() -> Tuple[Path, Path, Path]:
+    return Path("snapshot_src.db"), Path("snapshot.bin"), Path("snapshot_dst.db")
+
+
+class TestSnapshot:
+    @pytest.mark.asyncio
+    async def test_export_import(self):
+        reward_ph = WALLET_A.get_new_puzzlehash()
+        blocks = bt.get_consecutive_blocks(
+            10,
+            [],
+            farmer_reward_puzzle_hash=reward_ph,
+            pool_reward_puzzle_hash=reward_ph,
+            guarantee_transaction_block=True,
+        )
+        coins_to_spend: List[Coin] = [
+            coin for coin in blocks[-1].get_included_reward_coins() if coin.puzzle_hash == reward_ph
+        ]
+        spend_bundle = WALLET_A.generate_signed_transaction(1000, WALLET_A.get_new_puzzlehash(), coins_to_spend[0])
+        blocks = bt.get_consecutive_blocks(5, blocks, transaction_data=spend_bundle, guarantee_transaction_block=True)
+        snapshot_blocks = blocks
+        blocks = bt.get_consecutive_blocks(5, blocks, guarantee_transaction_block=True)
+
+        db_path, snapshot_path, restored_db_path = snapshot_paths()
+        remove_files(db_path, snapshot_path, restored_db_path)
+        connection = await aiosqlite.connect(db_path)
+        coin_store = await CoinStore.create(connection)
+        block_store = await BlockStore.create(connection)
+        b: Blockchain = await Blockchain.create(coin_store, block_store, test_constants)
+        for block in snapshot_blocks:
+            result, err, _ = await b.receive_block(block)
+            assert err is None and result == ReceiveBlockResult.NEW_PEAK
+        height = b.get_peak().height
+        expected_coins = set(await coin_store.get_unspent_coin_records())
+        assert coins_to_spend[0] not in set(record.coin for record in expected_coins)
+
+        # The snapshot is taken below the peak
+        for block in blocks[len(snapshot_blocks) :]:
+            await b.receive_block(block)
+        header = await export_snapshot(connection, snapshot_path, test_constants, height)
+        assert header.height == height and header.peak_hash == snapshot_blocks[-1].header_hash
+        b.shut_down()
+        await connection.close()
+
+        connection = await aiosqlite.connect(restored_db_path)
+        try:
+            with pytest.raises(ValueError):
+                await import_snapshot(connection, snapshot_path, bytes([1] * 32))
+            await import_snapshot(connection, snapshot_path, test_constants.GENESIS_CHALLENGE)
+            with pytest.raises(ValueError):
+                await import_snapshot(connection, snapshot_path, test_constants.GENESIS_CHALLENGE)
+
+            coin_store = await CoinStore.create(connection)
+            block_store = await BlockStore.create(connection)
+            assert set(await coin_store.get_unspent_coin_records()) == expected_coins
+            b = await Blockchain.create(coin_store, block_store, test_constants)
+            assert b.get_peak().header_hash == snapshot_blocks[-1].header_hash
+            assert (await b.get_full_peak()) == snapshot_blocks[-1]
+            # The header blocks of the recent chain of weight proofs are restored, with or without their full blocks
+            header_blocks = await block_store.get_header_blocks_in_range(0, height)
+            assert set(header_blocks.keys()) == set(block.header_hash for block in snapshot_blocks)
+
+            # The chain continues from the snapshot
+            for block in blocks[len(snapshot_blocks) :]:
+                result, err, _ = await b.receive_block(block)
+                assert err is None and result == ReceiveBlockResult.NEW_PEAK
+            assert b.get_peak().header_hash == blocks[-1].header_hash
+            b.shut_down()
+        finally:
+            await connection.close()
+            remove_files(db_path, snapshot_path, restored_db_path)
+
+    @pytest.mark.asyncio
+    async def test_corrupted_snapshot(self):
+        blocks = bt.get_consecutive_blocks(5)
+        db_path, snapshot_path, restored_db_path = snapshot_paths()
+        remove_files(db_path, snapshot_path, restored_db_path)
+        connection = await aiosqlite.connect(db_path)
+        b: Blockchain = await Blockchain.create(
+            await CoinStore.create(connection), await BlockStore.create(connection), test_constants
+        )
+        for block in blocks:
+            await b.receive_block(block)
+        await export_snapshot(connection, snapshot_path, test_constants)
+        b.shut_down()
+        await connection.close()
+
+        data = bytearray(snapshot_path.read_bytes())
+        data[len(data) // 2] ^= 1
+        snapshot_path.write_bytes(bytes(data))
+        connection = await aiosqlite.connect(restored_db_path)
+        try:
+            with pytest.raises(ValueError):
+                await import_snapshot(connection, snapshot_path, test_constants.GENESIS_CHALLENGE)
+        finally:
+            await connection.close()
+            remove_files(db_path, snapshot_path, restored_db_path)
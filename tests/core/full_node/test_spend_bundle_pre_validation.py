@@ -0,0 +1,119 @@
+import asyncio
+import dataclasses
+from concurrent.futures.process import BrokenProcessPool
+from typing import List
+
+import pytest
+from blspy import G2Element
+from clvm_tools import binutils
+
+from src.consensus.cost_calculator import CostResult
+from src.full_node.spend_bundle_pre_validation import SpendBundlePreValidator, validate_transactions_multiprocess
+from src.types.blockchain_format.coin import Coin
+from src.types.blockchain_format.program import Program
+from src.types.coin_solution import CoinSolution
+from src.types.spend_bundle import SpendBundle
+from src.util.hash import std_hash
+from src.util.ints import uint64
+from src.util.streamable import recurse_jsonify
+from src.util.wallet_tools import WalletTool
+from tests.setup_nodes import test_constants
+
+WALLET_A = WalletTool()
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+def make_spend_bundles(count: int) -> List[SpendBundle]:
+    puzzle_hash = WALLET_A.get_new_puzzlehash()
+    return [
+        WALLET_A.generate_signed_transaction(
+            uint64(1000), WALLET_A.get_new_puzzlehash(), Coin(std_hash(bytes([i])), puzzle_hash, uint64(10000))
+        )
+        for i in range(count)
+    ]
+
+
+class TestSpendBundlePreValidation:
+    @pytest.mark.asyncio
+    async def test_validate(self):
+        constants_json = recurse_jsonify(dataclasses.asdict(test_constants))
+        spend_bundles = make_spend_bundles(10)
+        expected = [
+            CostResult.from_bytes(result)
+            for result, _ in validate_transactions_multiprocess(constants_json, [bytes(sb) for sb in spend_bundles])
+        ]
+        pre_validator = SpendBundlePreValidator(constants_json, num_workers=2, batch_size=4)
+        try:
+            # The first spend bundle is sent twice, and only validated once
+            results = await asyncio.gather(*[pre_validator.validate(sb) for sb in spend_bundles + spend_bundles[:1]])
+            assert results == expected + expected[:1]
+            metrics = pre_validator.get_metrics()
+            assert metrics["validated"] == len(spend_bundles)
+            assert metrics["deduplicated"] == 1
+            assert metrics["batches"] < len(spend_bundles)
+            assert metrics["queue_depth"] == 0 and metrics["in_flight"] == 0
+            assert metrics["max_latency"] > 0
+
+            # Validated again once the previous validation is done
+            assert (await pre_validator.validate(spend_bundles[0])) == expected[0]
+            assert pre_validator.get_metrics()["validated"] == len(spend_bundles) + 1
+        finally:
+            pre_validator.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_invalid_spend_bundle(self):
+        constants_json = recurse_jsonify(dataclasses.asdict(test_constants))
+        valid = make_spend_bundles(1)[0]
+        coin = Coin(std_hash(b"invalid"), std_hash(b"puzzle_hash"), uint64(1000))
+        # The puzzle raises
+        solution = Program.to([binutils.assemble("(x)"), []])
+        invalid = SpendBundle([CoinSolution(coin, solution)], G2Element.infinity())
+        pre_validator = SpendBundlePreValidator(constants_json, num_workers=1, batch_size=4)
+        try:
+            results = await asyncio.gather(
+                pre_validator.validate(invalid), pre_validator.validate(valid), return_exceptions=True
+            )
+            # Only the invalid spend bundle of the batch fails
+            assert isinstance(results[0], ValueError)
+            assert isinstance(results[1], CostResult) and results[1].error is None
+            assert pre_validator.get_metrics()["failed"] == 1
+        finally:
+            pre_validator.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_backpressure(self):
+        constants_json = recurse_jsonify(dataclasses.asdict(test_constants))
+        spend_bundles = make_spend_bundles(20)
+        pre_validator = SpendBundlePreValidator(constants_json, num_workers=1, batch_size=2, queue_size=3)
+        try:
+            results = await asyncio.gather(*[pre_validator.validate(sb) for sb in spend_bundles])
+            assert len(results) == len(spend_bundles)
+            assert pre_validator.get_metrics()["max_queue_depth"] <= 3
+        finally:
+            pre_validator.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_broken_pool(self):
+        constants_json = recurse_jsonify(dataclasses.asdict(test_constants))
+        spend_bundles = make_spend_bundles(3)
+        pre_validator = SpendBundlePreValidator(constants_json, num_workers=1)
+        try:
+            assert isinstance(await pre_validator.validate(spend_bundles[0]), CostResult)
+            pool = pre_validator.executor.pool
+            for process in pool._processes.values():
+                process.kill()
+            while not pool._broken:
+                await asyncio.sleep(0.1)
+            with pytest.raises(BrokenProcessPool):
+                await pre_validator.validate(spend_bundles[1])
+            # The pool is replaced
+            assert pre_validator.executor.pool is not pool
+            assert pre_validator.get_metrics()["failed_batches"] == 1
+            assert isinstance(await pre_validator.validate(spend_bundles[2]), CostResult)
+        finally:
+            pre_validator.shut_down()
@@ -0,0 +1,125 @@
+# flake8: noqa: F811, F401
+import asyncio
+import random
+from dataclasses import replace
+from typing import List, Optional, Set
+
+import pytest
+
+from src.consensus.blockchain import ReceiveBlockResult
+from src.consensus.multiprocess_validation import PreValidationResult
+from src.full_node.sync_pipeline import PendingBlockRecords, SyncPipeline
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.types.full_block import FullBlock
+from src.util.ints import uint32
+from tests.core.fixtures import empty_blockchain, default_400_blocks
+
+BATCH_SIZE = 32
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+def make_fetch(blocks: List[FullBlock], fetched: List[int], max_height: Optional[int] = None):
+    async def fetch_batch(start: uint32, end: uint32):
+        if max_height is not None and end > max_height:
+            return None
+        fetched.append(start)
+        return "peer", blocks[start : end + 1]
+
+    return fetch_batch
+
+
+def make_add(blockchain, failing_heights: Set[int]):
+    async def add_batch(peer, blocks: List[FullBlock], results: Optional[List[PreValidationResult]]) -> bool:
+        assert peer == "peer" and results is not None
+        if blocks[0].height in failing_heights:
+            failing_heights.remove(blocks[0].height)
+            return False
+        for block, result in zip(blocks, results):
+            assert result.error is None
+            added, error, _ = await blockchain.receive_block(block, result)
+            assert error is None
+            assert added in (ReceiveBlockResult.NEW_PEAK, ReceiveBlockResult.ALREADY_HAVE_BLOCK)
+        return True
+
+    return add_batch
+
+
+class TestSyncPipeline:
+    @pytest.mark.asyncio
+    async def test_sync(self, empty_blockchain, default_400_blocks):
+        blocks = default_400_blocks
+        fetched: List[int] = []
+        pipeline = SyncPipeline(empty_blockchain, make_fetch(blocks, fetched), make_add(empty_blockchain, set()))
+        assert await pipeline.run(0, len(blocks) - 1, BATCH_SIZE)
+        assert empty_blockchain.get_peak().header_hash == blocks[-1].header_hash
+        assert fetched == list(range(0, len(blocks) - 1, BATCH_SIZE))
+        metrics = pipeline.stats.get_metrics()
+        for stage in ["fetch", "pre_validate", "add"]:
+            assert metrics["stages"][stage]["batches"] == len(fetched)
+        assert len(pipeline.pending.records) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_fetched_again(self, empty_blockchain, default_400_blocks):
+        blocks = default_400_blocks
+        fetched: List[int] = []
+        failing_height = 3 * BATCH_SIZE
+        pipeline = SyncPipeline(
+            empty_blockchain, make_fetch(blocks, fetched), make_add(empty_blockchain, {failing_height})
+        )
+        assert await pipeline.run(0, len(blocks) - 1, BATCH_SIZE)
+        assert empty_blockchain.get_peak().header_hash == blocks[-1].header_hash
+        assert fetched.count(failing_height) == 2
+
+    @pytest.mark.asyncio
+    async def test_fetch_failure(self, empty_blockchain, default_400_blocks):
+        blocks = default_400_blocks
+        fetched: List[int] = []
+        pipeline = SyncPipeline(empty_blockchain, make_fetch(blocks, fetched, 200), make_add(empty_blockchain, set()))
+        assert not await pipeline.run(0, len(blocks) - 1, BATCH_SIZE)
+        # The batches fetched before the failure are added
+        assert empty_blockchain.get_peak().height == fetched[-1] + BATCH_SIZE
+
+    @pytest.mark.asyncio
+    async def test_concurrent_fetch(self, empty_blockchain, default_400_blocks):
+        blocks = default_400_blocks
+        fetched: List[int] = []
+        fetch = make_fetch(blocks, fetched)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def slow_fetch(start: uint32, end: uint32):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            # Batches arrive out of order
+            await asyncio.sleep(random.random() / 10)
+            in_flight -= 1
+            return await fetch(start, end)
+
+        pipeline = SyncPipeline(empty_blockchain, slow_fetch, make_add(empty_blockchain, set()), fetch_concurrency=4)
+        assert await pipeline.run(0, len(blocks) - 1, BATCH_SIZE)
+        assert empty_blockchain.get_peak().header_hash == blocks[-1].header_hash
+        assert max_in_flight == 4
+
+    @pytest.mark.asyncio
+    async def test_pending_heights(self, empty_blockchain, default_400_blocks):
+        blocks = default_400_blocks[:10]
+        for block in blocks:
+            await empty_blockchain.receive_block(block)
+        pending = PendingBlockRecords(empty_blockchain)
+        # A pending block of another chain, at a height the blockchain already has
+        record = replace(empty_blockchain.block_record(blocks[5].header_hash), header_hash=bytes32([1] * 32))
+        pending.add_block_record(record)
+        assert pending.height_to_hash(uint32(5)) == record.header_hash
+        assert pending.height_to_block_record(uint32(5)) == record
+        assert pending.height_to_hash(uint32(4)) == blocks[4].header_hash
+        pending.remove_added([blocks[5]])
+        assert pending.height_to_hash(uint32(5)) == record.header_hash
+        assert pending.contains_height(uint32(10)) is False
+        pending.add_block_record(replace(record, height=uint32(10)))
+        assert pending.contains_height(uint32(10))
@@ -1,7 +1,7 @@
 import asyncio
 
 import pytest
-from src.full_node.sync_store import SyncStore
+from src.full_node.sync_store import MAX_SYNC_FAILURES, MAX_SYNC_REQUESTS_PER_PEER, PeerSyncStats, SyncStore
 from src.util.hash import std_hash
 
 
@@ -65,3 +65,39 @@ class TestStore:
         store.peer_has_block(std_hash(b"block30"), peer_ids[0], 700, 30, True)
         assert store.get_peak_of_each_peer()[peer_ids[0]][2] == 700
         assert store.get_heaviest_peak()[2] == 700
+
+    @pytest.mark.asyncio
+    async def test_peer_sync_stats(self):
+        store = await SyncStore.create()
+        peer_ids = [std_hash(bytes([a])) for a in range(3)]
+
+        request_start = store.sync_request_started(peer_ids[0], 1000)
+        assert store.peer_sync_stats[peer_ids[0]].in_flight == 1
+        store.sync_request_done(peer_ids[0], request_start, 5000)
+        stats = store.get_peer_sync_stats()[peer_ids[0]]
+        assert stats["in_flight"] == 0 and stats["requests"] == 1 and stats["latency"] is not None
+        # Peers that were not measured yet are tried first
+        assert store.choose_sync_peer(peer_ids) != peer_ids[0]
+
+        for peer_id, speed in zip(peer_ids, [1000.0, 5000.0, 900.0]):
+            store.peer_sync_stats[peer_id] = PeerSyncStats()
+            store.peer_sync_stats[peer_id].bytes_per_second = speed
+        assert store.choose_sync_peer(peer_ids) == peer_ids[1]
+        # Busy peers are only chosen when the others are busy too
+        for _ in range(MAX_SYNC_REQUESTS_PER_PEER):
+            store.sync_request_started(peer_ids[1], 0)
+        assert store.choose_sync_peer(peer_ids) == peer_ids[0]
+        # Slow peers are only chosen when the others are busy
+        store.sync_request_started(peer_ids[0], 0)
+        store.sync_request_started(peer_ids[0], 0)
+        assert store.choose_sync_peer(peer_ids) == peer_ids[0]
+        store.sync_request_started(peer_ids[0], 0)
+        assert store.choose_sync_peer(peer_ids) == peer_ids[2]
+
+        for _ in range(MAX_SYNC_FAILURES):
+            store.sync_request_failed(peer_ids[2])
+        assert store.choose_sync_peer([peer_ids[2]]) is None
+        store.peer_disconnected(peer_ids[1])
+        assert peer_ids[1] not in store.get_peer_sync_stats()
+        await store.clear_sync_info()
+        assert store.get_peer_sync_stats() == {}
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+from typing import List
+
+import pytest
+
+from src.harvester.disk_scheduler import FULL_PROOF_LOOKUP, QUALITY_LOOKUP, DiskQueue, DiskScheduler
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    loop = asyncio.get_event_loop()
+    yield loop
+
+
+async def wait_for_waiting(queue: DiskQueue, count: int) -> None:
+    while len(queue.waiting) < count:
+        await asyncio.sleep(0.01)
+
+
+class TestDiskScheduler:
+    @pytest.mark.asyncio
+    async def test_priorities(self):
+        queue = DiskQueue(0, 1, 10)
+        event = threading.Event()
+        order: List[str] = []
+
+        def lookup(name: str) -> str:
+            if name == "first":
+                event.wait()
+            order.append(name)
+            return name
+
+        try:
+            first = asyncio.create_task(queue.run(QUALITY_LOOKUP, lookup, "first"))
+            await asyncio.sleep(0.01)
+            others = []
+            for priority, name in [
+                (FULL_PROOF_LOOKUP, "proof-1"),
+                (QUALITY_LOOKUP, "quality-1"),
+                (FULL_PROOF_LOOKUP, "proof-2"),
+                (QUALITY_LOOKUP, "quality-2"),
+            ]:
+                others.append(asyncio.create_task(queue.run(priority, lookup, name)))
+            await wait_for_waiting(queue, 4)
+            assert queue.running == 1
+            event.set()
+            assert await asyncio.gather(first, *others) == ["first", "proof-1", "quality-1", "proof-2", "quality-2"]
+            # The quality lookups run before the full proofs, and lookups of the same kind in order
+            assert order == ["first", "quality-1", "quality-2", "proof-1", "proof-2"]
+            assert queue.running == 0 and len(queue.waiting) == 0
+            metrics = queue.get_metrics()
+            assert metrics["quality_lookups"]["count"] == 3 and metrics["full_proof_lookups"]["count"] == 2
+        finally:
+            event.set()
+            queue.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_lookups(self):
+        queue = DiskQueue(0, 1, 10)
+        event = threading.Event()
+        try:
+            first = asyncio.create_task(queue.run(QUALITY_LOOKUP, event.wait))
+            await asyncio.sleep(0.01)
+            second = asyncio.create_task(queue.run(QUALITY_LOOKUP, lambda: "second"))
+            third = asyncio.create_task(queue.run(QUALITY_LOOKUP, lambda: "third"))
+            fourth = asyncio.create_task(queue.run(QUALITY_LOOKUP, lambda: "fourth"))
+            await wait_for_waiting(queue, 3)
+
+            # A waiting lookup that is cancelled does not take a thread
+            third.cancel()
+            release = queue._release
+
+            def release_and_cancel() -> None:
+                # The thread is handed over to the second lookup, which is cancelled before it runs, so it hands the
+                # thread over to the next one
+                queue._release = release
+                release()
+                second.cancel()
+
+            queue._release = release_and_cancel
+            event.set()
+            await first
+            assert await asyncio.wait_for(fourth, 5) == "fourth"
+            for task in [second, third]:
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+            assert queue.running == 0 and len(queue.waiting) == 0
+        finally:
+            event.set()
+            queue.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_queue_per_device(self):
+        scheduler = DiskScheduler(1)
+        event = threading.Event()
+        try:
+            # A slow lookup does not hold the lookups of the other devices
+            slow = asyncio.create_task(scheduler.run(1, QUALITY_LOOKUP, event.wait))
+            await asyncio.sleep(0.01)
+            assert await scheduler.run(2, QUALITY_LOOKUP, lambda: "fast") == "fast"
+            assert not slow.done()
+            event.set()
+            await slow
+            assert sorted(metrics["device"] for metrics in scheduler.get_metrics()) == [1, 2]
+        finally:
+            event.set()
+            scheduler.shut_down()
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from src.harvester.harvester_metrics import HarvesterMetrics, LatencyHistogram
+
+
+class TestHarvesterMetrics:
+    def test_latency_histogram(self):
+        histogram = LatencyHistogram([0.1, 1, 10])
+        for latency in [0.05, 0.1, 0.5, 5, 20, 30]:
+            histogram.add(latency)
+        # The upper bounds are included in their bucket, and the last bucket has the larger latencies
+        assert histogram.counts == [2, 1, 1, 2]
+        assert histogram.to_json_dict() == {
+            "buckets": [0.1, 1, 10],
+            "counts": [2, 1, 1, 2],
+            "count": 6,
+            "sum": 0.05 + 0.1 + 0.5 + 5 + 20 + 30,
+        }
+
+    def test_plot_lookups(self):
+        metrics = HarvesterMetrics(5)
+        plot_1, plot_2 = Path("plot-1.plot"), Path("plot-2.plot")
+        assert not metrics.add_plot_lookup(plot_1, 1, [1, 1], 4)
+        # Slow plot lookups, one of them after the deadline
+        assert not metrics.add_plot_lookup(plot_1, 4, [2], 4.5)
+        assert metrics.add_plot_lookup(plot_2, 6, [], 7)
+        assert metrics.add_plot_lookup(plot_2, 7, [], 8)
+        metrics.add_signage_point(0.2, 8)
+
+        json_dict = metrics.to_json_dict()
+        assert json_dict["signage_points"] == 1 and json_dict["plot_lookups"] == 4
+        assert json_dict["missed_deadlines"] == 2
+        assert json_dict["quality_lookup_time"]["count"] == 4
+        assert json_dict["full_proof_time"]["count"] == 3
+        assert list(json_dict["slow_lookups"].items()) == [(str(plot_2), 2), (str(plot_1), 1)]
+
+        # Removed plots are not reported anymore
+        metrics.remove_plots([plot_2, Path("plot-3.plot")])
+        assert metrics.to_json_dict()["slow_lookups"] == {str(plot_1): 1}
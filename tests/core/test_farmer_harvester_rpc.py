@@ -10,7 +10,8 @@ from src.rpc.harvester_rpc_client import HarvesterRpcClient
 from src.rpc.rpc_server import start_rpc_server
 from src.util.hash import std_hash
 from src.util.ints import uint16, uint64, uint8
-from src.plotting.plot_tools import stream_plot_info_pk, stream_plot_info_ph
+from src.plotting.plot_metadata_cache import LazyDiskProver, PlotMetadataCache
+from src.plotting.plot_tools import load_plot_batch, stream_plot_info_pk, stream_plot_info_ph
 from src.rpc.farmer_rpc_api import FarmerRpcApi
 from src.rpc.harvester_rpc_api import HarvesterRpcApi
 
@@ -96,6 +97,26 @@ class TestRpc:
             res = await client_2.get_plots()
             num_plots = len(res["plots"])
             assert num_plots > 0
+
+            async def have_quality_lookups():
+                disk_metrics = await client_2.get_disk_metrics()
+                return sum(metrics["quality_lookups"]["count"] for metrics in disk_metrics) > 0
+
+            await time_out_assert(5, have_quality_lookups, True)
+            disk_metrics = await client_2.get_disk_metrics()
+            assert sum(metrics["plots"] for metrics in disk_metrics) == num_plots
+            for metrics in disk_metrics:
+                assert metrics["quality_lookups"]["p99"] >= metrics["quality_lookups"]["p50"]
+
+            async def have_signage_point_metrics():
+                return (await client_2.get_harvester_metrics())["signage_points"] > 0
+
+            await time_out_assert(5, have_signage_point_metrics, True)
+            harvester_metrics = await client_2.get_harvester_metrics()
+            assert harvester_metrics["plot_lookups"] > 0
+            assert harvester_metrics["quality_lookup_time"]["count"] == harvester_metrics["plot_lookups"]
+            assert sum(harvester_metrics["filter_time"]["counts"]) == harvester_metrics["signage_points"]
+            assert harvester_metrics["missed_deadlines"] == 0
             plot_dir = get_plot_dir() / "subdir"
             plot_dir.mkdir(parents=True, exist_ok=True)
 
@@ -166,6 +187,16 @@ class TestRpc:
             res_2 = await client_2.get_plots()
             assert len(res_2["plots"]) == num_plots + 2
 
+            # The new plots are saved in the plot metadata cache, and farmed from it without opening them
+            saved_cache = PlotMetadataCache(harvester.plot_metadata_cache.path)
+            saved_cache.load()
+            assert len(saved_cache) == len(harvester.plot_metadata_cache) >= num_plots + 2
+            plot_path = (plot_dir / filename).resolve()
+            _, cached_provers, _, _ = load_plot_batch([plot_path], {}, {}, None, None, False, set(), saved_cache)
+            assert isinstance(cached_provers[plot_path].prover, LazyDiskProver)
+            assert cached_provers[plot_path].prover.get_id() == harvester.provers[plot_path].prover.get_id()
+            assert cached_provers[plot_path].plot_public_key == harvester.provers[plot_path].plot_public_key
+
             await client_2.delete_plot(str(plot_dir / filename))
             await client_2.delete_plot(str(plot_dir / filename_2))
             res_3 = await client_2.get_plots()
@@ -99,6 +99,16 @@ class TestRpc:
             additions, removals = await client.get_additions_and_removals(blocks[-1].header_hash)
             assert len(additions) >= 2 and len(removals) == 0
 
+            metrics = await client.get_coin_cache_metrics()
+            assert metrics["size"] > 0 and metrics["size"] <= metrics["capacity"]
+            assert metrics["hits"] >= len(additions)
+
+            metrics = await client.get_tx_pre_validation_metrics()
+            assert metrics["queue_depth"] == 0 and metrics["in_flight"] == 0
+
+            metrics = await client.get_signature_verification_metrics()
+            assert metrics["queue_depth"] == 0 and metrics["failed"] == 0
+
             assert len(await client.get_connections()) == 0
 
             await client.open_connection(self_hostname, server_2._port)
@@ -21,3 +21,23 @@ class TestProofOfSpace:
                 success_count += 1
 
         assert abs((success_count * target_filter / num_trials) - 1) < 0.35
+
+    def test_passes_plot_filter_batch(self):
+        """
+        Tests that the batch plot filter passes the same plots as passes_plot_filter.
+        """
+        challenge_hash = token_bytes(32)
+        sp_output = token_bytes(32)
+        plot_ids = [token_bytes(32) for _ in range(5000)]
+        for constants in (DEFAULT_CONSTANTS, DEFAULT_CONSTANTS.replace(NUMBER_ZERO_BITS_PLOT_FILTER=4)):
+            expected = [
+                index
+                for index, plot_id in enumerate(plot_ids)
+                if ProofOfSpace.passes_plot_filter(constants, plot_id, challenge_hash, sp_output)
+            ]
+            assert len(expected) > 0
+            assert (
+                ProofOfSpace.passes_plot_filter_batch(constants, b"".join(plot_ids), challenge_hash, sp_output)
+                == expected
+            )
+        assert ProofOfSpace.passes_plot_filter_batch(DEFAULT_CONSTANTS, b"", challenge_hash, sp_output) == []
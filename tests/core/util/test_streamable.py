@@ -4,8 +4,10 @@ from typing import List, Optional
 from pytest import raises
 
 from src.types.weight_proof import SubEpochChallengeSegment
-from src.util.ints import uint32, uint8
+from src.util.buffer_reader import BufferReader
+from src.util.ints import uint32, uint8, uint64
 from src.types.blockchain_format.coin import Coin
+from src.types.blockchain_format.program import Program, SerializedProgram
 from src.types.blockchain_format.sized_bytes import bytes32
 from src.types.full_block import FullBlock
 from src.util.streamable import Streamable, streamable
@@ -160,6 +162,47 @@ class TestStreamable(unittest.TestCase):
         TestClassBool.from_bytes(bytes([0]))
         TestClassBool.from_bytes(bytes([1]))
 
+    def test_parse_from_buffer(self):
+        @dataclass(frozen=True)
+        @streamable
+        class TestClassBuffer(Streamable):
+            a: uint32
+            b: bytes32
+            c: bytes
+            d: str
+            e: List[Coin]
+
+        coin = Coin(bytes32([1] * 32), bytes32([2] * 32), uint64(3))
+        first = TestClassBuffer(uint32(1), bytes32([3] * 32), b"abc", "def", [coin])
+        second = TestClassBuffer(uint32(2), bytes32([4] * 32), b"", "", [])
+        blob = b"prefix" + bytes(first) + bytes(second)
+
+        # Parses objects that live inside a larger buffer, without slicing them out first
+        f = BufferReader(blob, len(b"prefix"))
+        assert TestClassBuffer.parse(f) == first
+        assert f.tell() == len(b"prefix") + len(bytes(first))
+        assert TestClassBuffer.parse(f) == second
+        assert f.tell() == len(blob)
+
+        parsed = TestClassBuffer.from_bytes(memoryview(blob)[len(b"prefix") :])
+        assert parsed == first
+        assert type(parsed.b) is bytes32 and type(parsed.c) is bytes and type(parsed.d) is str
+
+        with raises(AssertionError):
+            TestClassBuffer.parse(BufferReader(blob, len(blob) - 2))
+
+    def test_parse_serialized_program_from_buffer(self):
+        program = SerializedProgram.from_bytes(bytes(Program.to([1, b"abc", [2, 3]])))
+        blob = b"\x00" + bytes(program) + b"\x01"
+
+        f = BufferReader(blob, 1)
+        assert SerializedProgram.parse(f) == program
+        assert f.tell() == len(blob) - 1
+        assert Program.parse(BufferReader(blob, 1)) == Program.from_bytes(bytes(program))
+
+        with raises(ValueError):
+            SerializedProgram.parse(BufferReader(blob[:-2], 1))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,188 @@
+import asyncio
+import dataclasses
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from src.consensus.block_record import BlockRecord
+from src.full_node.block_store import BlockStore
+from src.full_node.coin_store import CoinStore
+from src.types.blockchain_format.coin import Coin
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.types.coin_record import CoinRecord
+from src.util.ints import uint32, uint64
+from tests.util.benchmark_streamable import make_block_record
+
+NUM_BLOCKS = 20000
+COINS_PER_BLOCK = 10
+NUM_LOOKUPS = 5000
+BLOCKS_CLOSE_TO_PEAK = 4000
+# Best of, since the first run also warms up the page cache of the OS
+NUM_STARTUPS = 3
+
+
+def rand_hash() -> bytes32:
+    return bytes32(random.getrandbits(256).to_bytes(32, "big"))
+
+
+def synthetic_chain() -> Tuple[List[BlockRecord], List[CoinRecord]]:
+    block_records: List[BlockRecord] = []
+    coin_records: List[CoinRecord] = []
+    prev_hash = rand_hash()
+    for height in range(NUM_BLOCKS):
+        header_hash = rand_hash()
+        block_record = make_block_record(height)
+        block_records.append(dataclasses.replace(block_record, header_hash=header_hash, prev_hash=prev_hash))
+        prev_hash = header_hash
+        for _ in range(COINS_PER_BLOCK):
+            coin = Coin(rand_hash(), rand_hash(), uint64(random.randint(1, 2 ** 40)))
+            coin_records.append(CoinRecord(coin, uint32(height), uint32(0), False, False, uint64(height)))
+    return block_records, coin_records
+
+
+async def create_hex_db(path: Path, block_records: List[BlockRecord], coin_records: List[CoinRecord]) -> None:
+    """
+    The schema and rows of version 28 of the full node database, which stored hashes as hex text.
+    """
+    db = await aiosqlite.connect(path)
+    await db.execute(
+        "CREATE TABLE block_records(header_hash text PRIMARY KEY, prev_hash text, height bigint,"
+        "block blob, sub_epoch_summary blob, is_peak tinyint, is_block tinyint)"
+    )
+    await db.execute("CREATE INDEX height on block_records(height)")
+    await db.execute("CREATE INDEX hh on block_records(header_hash)")
+    await db.execute("CREATE INDEX peak on block_records(is_peak)")
+    await db.execute(
+        "CREATE TABLE coin_record(coin_name text PRIMARY KEY, confirmed_index bigint, spent_index bigint,"
+        " spent int, coinbase int, puzzle_hash text, coin_parent text, amount blob, timestamp bigint)"
+    )
+    await db.execute("CREATE INDEX coin_confirmed_index on coin_record(confirmed_index)")
+    await db.execute("CREATE INDEX coin_spent_index on coin_record(spent_index)")
+    await db.execute("CREATE INDEX coin_puzzle_hash on coin_record(puzzle_hash)")
+    await db.executemany(
+        "INSERT INTO block_records VALUES(?, ?, ?, ?, ?, ?, ?)",
+        [
+            (br.header_hash.hex(), br.prev_hash.hex(), br.height, bytes(br), None, br.height == NUM_BLOCKS - 1, False)
+            for br in block_records
+        ],
+    )
+    await db.executemany(
+        "INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                cr.coin.name().hex(),
+                cr.confirmed_block_index,
+                cr.spent_block_index,
+                int(cr.spent),
+                int(cr.coinbase),
+                cr.coin.puzzle_hash.hex(),
+                cr.coin.parent_coin_info.hex(),
+                bytes(cr.coin.amount),
+                cr.timestamp,
+            )
+            for cr in coin_records
+        ],
+    )
+    await db.commit()
+    await db.close()
+
+
+async def create_blob_db(path: Path, block_records: List[BlockRecord], coin_records: List[CoinRecord]) -> None:
+    db = await aiosqlite.connect(path)
+    await BlockStore.create(db)
+    coin_store = await CoinStore.create(db)
+    await db.executemany(
+        "INSERT INTO block_records VALUES(?, ?, ?, ?, ?, ?, ?)",
+        [
+            (br.header_hash, br.prev_hash, br.height, bytes(br), None, br.height == NUM_BLOCKS - 1, False)
+            for br in block_records
+        ],
+    )
+    for cr in coin_records:
+        await coin_store._add_coin_record(cr)
+    await db.commit()
+    await db.close()
+
+
+async def hex_get_coin_record(db: aiosqlite.Connection, coin_name: bytes32) -> Optional[CoinRecord]:
+    cursor = await db.execute("SELECT * from coin_record WHERE coin_name=?", (coin_name.hex(),))
+    row = await cursor.fetchone()
+    await cursor.close()
+    if row is not None:
+        coin = Coin(bytes32(bytes.fromhex(row[6])), bytes32(bytes.fromhex(row[5])), uint64.from_bytes(row[7]))
+        return CoinRecord(coin, row[1], row[2], row[3], row[4], row[8])
+    return None
+
+
+async def hex_get_block_records_close_to_peak(
+    db: aiosqlite.Connection, blocks_n: int
+) -> Tuple[Dict[bytes32, BlockRecord], Optional[bytes32]]:
+    cursor = await db.execute("SELECT * from block_records WHERE is_peak = 1")
+    peak_row = await cursor.fetchone()
+    await cursor.close()
+    if peak_row is None:
+        return {}, None
+    cursor = await db.execute(f"SELECT header_hash, block from block_records WHERE height >= {peak_row[2] - blocks_n}")
+    rows = await cursor.fetchall()
+    await cursor.close()
+    ret: Dict[bytes32, BlockRecord] = {}
+    for row in rows:
+        ret[bytes32(bytes.fromhex(row[0]))] = BlockRecord.from_bytes(row[1])
+    return ret, bytes32(bytes.fromhex(peak_row[0]))
+
+
+async def run_benchmark(directory: Path) -> None:
+    block_records, coin_records = synthetic_chain()
+    coin_names = [cr.coin.name() for cr in random.sample(coin_records, NUM_LOOKUPS)]
+    hex_path = directory / "hex.sqlite"
+    blob_path = directory / "blob.sqlite"
+    await create_hex_db(hex_path, block_records, coin_records)
+    await create_blob_db(blob_path, block_records, coin_records)
+
+    print(f"{NUM_BLOCKS} blocks, {len(coin_records)} coins")
+    hex_size, blob_size = os.path.getsize(hex_path), os.path.getsize(blob_path)
+    print(f"DB size                          hex: {hex_size / 1e6:8.2f} MB  blob: {blob_size / 1e6:8.2f} MB")
+
+    db = await aiosqlite.connect(hex_path)
+    start = time.time()
+    for coin_name in coin_names:
+        assert await hex_get_coin_record(db, coin_name) is not None
+    hex_lookup = (time.time() - start) / NUM_LOOKUPS
+    hex_startup = float("inf")
+    for _ in range(NUM_STARTUPS):
+        start = time.time()
+        records, _ = await hex_get_block_records_close_to_peak(db, BLOCKS_CLOSE_TO_PEAK)
+        hex_startup = min(hex_startup, time.time() - start)
+    await db.close()
+
+    db = await aiosqlite.connect(blob_path)
+    block_store = await BlockStore.create(db)
+    coin_store = await CoinStore.create(db)
+    start = time.time()
+    for coin_name in coin_names:
+        assert await coin_store.get_coin_record(coin_name) is not None
+    blob_lookup = (time.time() - start) / NUM_LOOKUPS
+    blob_startup = float("inf")
+    for _ in range(NUM_STARTUPS):
+        start = time.time()
+        blob_records, _ = await block_store.get_block_records_close_to_peak(BLOCKS_CLOSE_TO_PEAK)
+        blob_startup = min(blob_startup, time.time() - start)
+    await db.close()
+    assert blob_records == records
+
+    print(f"get_coin_record                  hex: {hex_lookup * 1e6:8.1f} us  blob: {blob_lookup * 1e6:8.1f} us")
+    print(f"get_block_records_close_to_peak  hex: {hex_startup * 1e3:8.1f} ms  blob: {blob_startup * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    """
+    Compares the version 28 full node database, which stores hashes as hex text, against the current one, which stores
+    them as blobs, on a synthetic chain: size on disk, coin lookups and the block records loaded at startup.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run_benchmark(Path(directory)))
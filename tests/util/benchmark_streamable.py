@@ -0,0 +1,174 @@
+import io
+import time
+from typing import Any, BinaryIO, Callable, List, get_type_hints
+
+from src.consensus.block_record import BlockRecord
+from src.types.blockchain_format.classgroup import ClassgroupElement
+from src.types.blockchain_format.coin import Coin
+from src.types.blockchain_format.sized_bytes import bytes32
+from src.types.full_block import FullBlock
+from src.util.ints import uint8, uint32, uint64, uint128
+from src.util.streamable import Streamable, size_hints
+from src.util.type_checking import is_type_List, is_type_SpecificOptional, is_type_Tuple, get_args
+from tests.setup_nodes import bt
+
+NUM_ITERS = 200
+
+
+def interpreted_parse(cls: Any, f: BinaryIO) -> Any:
+    """
+    Reference decoder that inspects the type hints of every field of every object, like Streamable.parse
+    did before the per-class codecs were resolved at decoration time.
+    """
+    return cls(*[interpreted_parse_one_item(f_type, f) for f_type in get_type_hints(cls).values()])
+
+
+def interpreted_parse_one_item(f_type: Any, f: BinaryIO) -> Any:
+    if is_type_List(f_type):
+        list_size = int.from_bytes(f.read(4), "big")
+        return [interpreted_parse_one_item(get_args(f_type)[0], f) for _ in range(list_size)]
+    if is_type_SpecificOptional(f_type):
+        if f.read(1) == bytes([0]):
+            return None
+        return interpreted_parse_one_item(get_args(f_type)[0], f)
+    if is_type_Tuple(f_type):
+        return tuple(interpreted_parse_one_item(inner_type, f) for inner_type in get_args(f_type))
+    if f_type is bool:
+        return f.read(1) == bytes([1])
+    if f_type == bytes:
+        return f.read(int.from_bytes(f.read(4), "big"))
+    if isinstance(f_type, type) and issubclass(f_type, Streamable):
+        return interpreted_parse(f_type, f)
+    if hasattr(f_type, "parse"):
+        return f_type.parse(f)
+    if hasattr(f_type, "from_bytes") and f_type.__name__ in size_hints:
+        return f_type.from_bytes(f.read(size_hints[f_type.__name__]))
+    if f_type is str:
+        return f.read(int.from_bytes(f.read(4), "big")).decode("utf-8")
+    raise RuntimeError(f"Type {f_type} does not have parse")
+
+
+def interpreted_stream(item: Any, f: BinaryIO) -> None:
+    for f_name, f_type in get_type_hints(item).items():
+        interpreted_stream_one_item(f_type, getattr(item, f_name), f)
+
+
+def interpreted_stream_one_item(f_type: Any, item: Any, f: BinaryIO) -> None:
+    if is_type_List(f_type):
+        f.write(uint32(len(item)).to_bytes(4, "big"))
+        for element in item:
+            interpreted_stream_one_item(get_args(f_type)[0], element, f)
+    elif is_type_SpecificOptional(f_type):
+        if item is None:
+            f.write(bytes([0]))
+        else:
+            f.write(bytes([1]))
+            interpreted_stream_one_item(get_args(f_type)[0], item, f)
+    elif is_type_Tuple(f_type):
+        for inner_type, element in zip(get_args(f_type), item):
+            interpreted_stream_one_item(inner_type, element, f)
+    elif f_type == bytes:
+        f.write(uint32(len(item)).to_bytes(4, "big"))
+        f.write(item)
+    elif isinstance(item, Streamable):
+        interpreted_stream(item, f)
+    elif hasattr(f_type, "stream"):
+        item.stream(f)
+    elif hasattr(f_type, "__bytes__"):
+        f.write(bytes(item))
+    elif f_type is str:
+        str_bytes = item.encode("utf-8")
+        f.write(uint32(len(str_bytes)).to_bytes(4, "big"))
+        f.write(str_bytes)
+    elif f_type is bool:
+        f.write(int(item).to_bytes(1, "big"))
+    else:
+        raise NotImplementedError(f"can't stream {item}, {f_type}")
+
+
+def make_block_record(i: int) -> BlockRecord:
+    hashes = [bytes32(bytes([i % 256]) * 32) for _ in range(3)]
+    return BlockRecord(
+        hashes[0],
+        hashes[1],
+        uint32(i),
+        uint128(i * 1000),
+        uint128(i * 100000),
+        uint8(i % 64),
+        ClassgroupElement.get_default_element(),
+        ClassgroupElement.get_default_element(),
+        hashes[2],
+        hashes[0],
+        uint64(2 ** 27),
+        hashes[1],
+        hashes[2],
+        uint64(i),
+        uint8(16),
+        False,
+        uint32(i),
+        uint64(i),
+        hashes[0],
+        uint64(0),
+        [Coin(hashes[0], hashes[1], uint64(1750000000000)), Coin(hashes[1], hashes[2], uint64(250000000000))],
+        hashes,
+        None,
+        hashes,
+        None,
+    )
+
+
+def benchmark(name: str, objects: List[Any], decode: Callable[[bytes], Any], encode: Callable[[Any], bytes]) -> None:
+    blobs = [bytes(o) for o in objects]
+    total_bytes = sum(len(b) for b in blobs) * NUM_ITERS
+
+    start = time.time()
+    for _ in range(NUM_ITERS):
+        for blob in blobs:
+            decode(blob)
+    decode_time = time.time() - start
+
+    start = time.time()
+    for _ in range(NUM_ITERS):
+        for o in objects:
+            encode(o)
+    encode_time = time.time() - start
+
+    count = len(objects) * NUM_ITERS
+    print(
+        f"{name:<36} decode: {count / decode_time:10.1f} obj/s {total_bytes / decode_time / 1e6:8.2f} MB/s   "
+        f"encode: {count / encode_time:10.1f} obj/s {total_bytes / encode_time / 1e6:8.2f} MB/s"
+    )
+
+
+def interpreted_bytes(item: Any) -> bytes:
+    f = io.BytesIO()
+    interpreted_stream(item, f)
+    return f.getvalue()
+
+
+if __name__ == "__main__":
+    """
+    Compares (de)serialization throughput of the per-class codecs built by @streamable against a decoder
+    that walks the type hints of every object, for FullBlock and BlockRecord.
+    """
+    blocks: List[FullBlock] = bt.get_consecutive_blocks(20)
+    block_records: List[BlockRecord] = [make_block_record(i) for i in range(20)]
+
+    for block in blocks:
+        assert interpreted_parse(FullBlock, io.BytesIO(bytes(block))) == block
+        assert interpreted_bytes(block) == bytes(block)
+
+    benchmark(
+        "FullBlock (before: interpreted)",
+        blocks,
+        lambda b: interpreted_parse(FullBlock, io.BytesIO(b)),
+        interpreted_bytes,
+    )
+    benchmark("FullBlock (after: per-class codecs)", blocks, FullBlock.from_bytes, bytes)
+    benchmark(
+        "BlockRecord (before: interpreted)",
+        block_records,
+        lambda b: interpreted_parse(BlockRecord, io.BytesIO(b)),
+        interpreted_bytes,
+    )
+    benchmark("BlockRecord (after: per-class codecs)", block_records, BlockRecord.from_bytes, bytes)